@@ -2,12 +2,12 @@
 import os
 import sys
 import json
-import tqdm
-import struct
 import socket
 
 from collections import Counter
 
+from tcp_framing_utils import *
+
 # Get the absolute path of the script's directory
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -39,8 +39,6 @@ if not os.path.exists(output_dir):
     print(f"Error: Output directory '{output_dir}' does not exist.")
     sys.exit(1)
     
-# Set buffer size for TCP
-BUFFER_SIZE = 65536
 
 # Debug logs for validation
 print(f"Using input JSON: {EVALUATOR_INPUT_PATH}")
@@ -172,15 +170,10 @@ def run_evaluator():
     # This is used to stop the recv() process
     # send the evaluator json to the predictor server
     try:
-        # Length prefixing
-        # Send Evaluator JSON length as a 4-byte integer
+        # Length prefixing (4-byte length, or 8-byte length for frames of 4 GiB or more)
         jsonResult_bytes = jsonResult.encode("utf-8")
-        jsonResults_total_bytes = len(jsonResult_bytes)
-
-        connection.sendall(struct.pack('>I', jsonResults_total_bytes))
-        print(f"Sent evaluator request length {jsonResults_total_bytes} bytes")
-
-        connection.sendall(jsonResult_bytes)
+        send_frame(connection, jsonResult_bytes)
+        print(f"Sent evaluator request of {len(jsonResult_bytes)} bytes")
 
     except socket.error as e:
         print ("server_error: Error sending evaluator_file: %s" % e)
@@ -188,70 +181,38 @@ def run_evaluator():
 
 # ---------------------- %%%%%%%---------------
     # receive message from the server
-    json_data_recv = b''
-    while True:
-        # Before receiving JSON from Predictor
-        # Receive length of the incoming JSON message (4-byte integer)
-        # Can change to 8-byte integer by changing .recv(4) to .recv(8)
-        # and replacing format string '>I' to '>Q'
-        # Step 1
-        try:
-            msg_length = connection.recv(4)
-            if not msg_length:
-                print("Failed to receive message length. Closing connection.")
-                connection.close()
-                break # Exit the loop if no message length is received
-
-            # Unpack message length from 4 bytes
-            msglen = struct.unpack('>I', msg_length)[0]
-            print(f"Expecting {msglen} bytes of data from the Predictor.")
-            # Can comment out print commands other than for errors
-            
-            # Initialize the progress bar
-            progress = tqdm.tqdm(range(msglen), unit="B", 
-                                 desc="Receiving Predictor Response",
-                                 unit_scale=True, unit_divisor=1024)
-
-            #Step 2
-            # Now we want to receive the actual JSON in packets
-            
-            while len(json_data_recv) < msglen:
-                packet = connection.recv(BUFFER_SIZE)
-                if not packet:
-                    print("Connection closed unexpectedly.")
-                    break
-                json_data_recv += packet
-                progress.update(len(packet))
-                #print(f"Received packet of {len(packet)} bytes, total received: {len(data)} bytes")
-           
-            # Close the progress bar when done
-            progress.close()
-            
-            # Decode and display the received data if all of it is received
-            if len(json_data_recv) == msglen:
-                print("Predictor return received completely!")
-                break
-            else:
-                print("Data received was incomplete or corrupted.")
-                break
-
-
-        except socket.error as e:
-            print ("server_error: Error receiving predictions: %s" % e)
-            sys.exit(1)
+    # The announced length is used to receive the JSON into one preallocated buffer
+    try:
+        json_data_recv = recv_frame(connection, desc="Receiving Predictor Response")
+    except (ConnectionError, socket.error) as e:
+        print ("server_error: Error receiving predictions: %s" % e)
+        sys.exit(1)
+
+    if json_data_recv is None:
+        print("Failed to receive message length. Closing connection.")
+        connection.close()
+        sys.exit(1)
+    print("Predictor return received completely!")
 
     # Parse and save Predictor response
     try:
-        predictor_response_full = json_data_recv
-        predictor_json = predictor_response_full.decode("utf-8")
-        predictor_json = json.loads(predictor_json)
+        # Parse straight from the receive buffer (JSON or binary tensor payload)
+        predictor_json = decode_message(json_data_recv)
         
         output_file = os.path.join(output_dir, os.path.basename(RETURN_FILE_PATH))
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(predictor_json, f, ensure_ascii=False, indent=4)
-        print(f"Predictions saved to {output_file}")
+        if predictor_json.get(STREAM_KEY) == "header":
+            # Streamed response ("response_streaming": true in the input JSON):
+            # write each batch frame to disk as it arrives (reassemble with load_stream)
+            stream_file, last_frame = save_stream(connection, predictor_json, output_file,
+                                                  desc="Receiving Predictor Response")
+            print(f"Predictions saved to {stream_file}")
+            if last_frame.get(STREAM_KEY) != "trailer":
+                print(f"Predictor stopped the stream: {last_frame}")
+        else:
+            save_message(predictor_json, output_file, ensure_ascii=False, indent=4)
+            print(f"Predictions saved to {output_file}")
         
-    except (json.JSONDecodeError, IOError) as e:
+    except (json.JSONDecodeError, IOError, ValueError, ConnectionError) as e:
         print(f"Error saving predictions: {e}")
         sys.exit(1)
 
@@ -25,8 +25,8 @@ else:
 # Add the directory containing `api_preprocessing_utils.py` to the Python path
 sys.path.append(UTILS_DIR)
 
-# Import the process_sequence function
-from api_preprocessing_utils import process_sequence
+# Import the batch preprocessing function
+from api_preprocessing_utils import process_sequences_batch
 
 # Define the model directory
 MODEL_DIR = os.path.join(BASE_DIR, 'dream_rnn_k562_model_weight')
@@ -88,57 +88,136 @@ def load_dream_rnn():
     model.eval()
     return model
 
+# Resident model shared by every request served by this process
+_model_rnn = None
+
+def get_dream_rnn():
+    """
+    Return the resident DREAM-RNN model, loading the weights on first use.
+
+    The predictor server calls this once at startup so that every evaluator
+    connection and every prediction task reuses the same in-memory model.
+
+    Returns:
+        model_rnn (PrixFixeNet): Pre-trained DREAM-RNN model in eval mode.
+    """
+    global _model_rnn
+    if _model_rnn is None:
+        print("Loading pre-trained model weights for DREAM-RNN")
+        _model_rnn = load_dream_rnn()
+    return _model_rnn
+
 # Hardcoded Upstream and Downstream Adapter Sequences for K562 and HepG2:
 TARGET_LENGTH = 200
 upstream_adapter_seq = "AGGACCGGATCAACT"
 downstream_adapter_seq = "CATTGCGTGAACCGA"
 
+# Number of sequences per forward pass; override with DREAM_RNN_BATCH_SIZE
+BATCH_SIZE = int(os.environ.get("DREAM_RNN_BATCH_SIZE", 1024))
+
+# Batch Encoding Function
+def encode_dream_rnn_batch(sequences, include_rev):
+    """
+    Encode all sequences into a single preallocated DREAM-RNN input array.
+
+    Args:
+        sequences (dict): Dictionary of sequence IDs and their corresponding sequences.
+        include_rev (bool): Whether to set the reverse complement channel for
+                            sequence IDs containing "Reversed".
+
+    Returns:
+        seq_ids (list): Sequence IDs in the same order as the rows of `encoded_batch`.
+        encoded_batch (np.ndarray): float32 array of shape (N, 5, SEQ_SIZE), with the
+                                    one-hot encoding in channels 0-3 and the
+                                    reverse complement flag in channel 4.
+    """
+    # Pad, add adapters and one-hot encode every sequence in one pass
+    seq_ids, encoded_seqs = process_sequences_batch(sequences, TARGET_LENGTH, SEQ_SIZE,
+                                                    upstream_adapter_seq, downstream_adapter_seq)
+
+    encoded_batch = np.zeros((len(seq_ids), 5, SEQ_SIZE), dtype=np.float32)
+    encoded_batch[:, :4, :] = encoded_seqs.transpose(0, 2, 1)
+
+    # Include reverse complement information on sequence ID
+    # (default to no reverse complement info)
+    if include_rev:
+        rev_rows = [i for i, seq_id in enumerate(seq_ids) if "Reversed" in seq_id]
+        encoded_batch[rev_rows, 4, :] = 1
+
+    return seq_ids, encoded_batch
+
+def unique_input_rows(encoded_batch):
+    """
+    Find the distinct model inputs of an encoded batch.
+
+    Different sequence IDs often map to the same final input (duplicated
+    controls, repeated scrambles), which then only needs to be predicted once.
+
+    Args:
+        encoded_batch (np.ndarray): Encoded inputs from `encode_dream_rnn_batch`.
+
+    Returns:
+        unique_rows (list): Row of the first occurrence of every distinct input.
+        input_of_row (np.ndarray): For every row, the index of its input in `unique_rows`.
+    """
+    first_seen = {}
+    unique_rows = []
+    input_of_row = np.empty(len(encoded_batch), dtype=np.int64)
+    for row, encoded_seq in enumerate(encoded_batch):
+        key = encoded_seq.tobytes()
+        if key not in first_seen:
+            first_seen[key] = len(unique_rows)
+            unique_rows.append(row)
+        input_of_row[row] = first_seen[key]
+    return unique_rows, input_of_row
+
 # Prediction Function
-def predict_dream_rnn(sequences, include_rev):
-    
+def predict_dream_rnn(sequences, include_rev, model_rnn=None, batch_size=None):
     """
     Predict expression values using the DREAM-RNN model.
 
+    Sequences are encoded once into a (N, 5, SEQ_SIZE) array, duplicated
+    inputs are dropped, and the distinct inputs are run through the model in
+    mini-batches of `batch_size` sequences. Every sequence ID gets the
+    prediction of its input.
+
     Args:
         sequences (dict): Dictionary of sequence IDs and their corresponding sequences.
         include_rev (bool): Whether to include the reverse complement flag in the input.
+        model_rnn (PrixFixeNet, optional): Already loaded model. Defaults to the
+                                           resident model from `get_dream_rnn()`.
+        batch_size (int, optional): Sequences per forward pass. Defaults to BATCH_SIZE.
 
     Returns:
         predictions (dict): Dictionary of sequence IDs and their predicted expression values.
     """
-    print("Loading pre-trained model weights for DREAM-RNN")
-    model_rnn = load_dream_rnn()
-    
-    predictions = {}
-    # Wrap the iteration with tqdm for a progress bar
-    for seq_id, seq in tqdm.tqdm(sequences.items(),
-                                 desc="Predictions in progress", unit="sequence"):
-        # Process sequence for padding
-        encoded_seq = process_sequence(seq, TARGET_LENGTH, SEQ_SIZE,
-                     upstream_adapter_seq, downstream_adapter_seq)
-        
-        # Include reverse complement information on sequence ID
-        if include_rev:
-            rev_flag = 1 if "Reversed" in seq_id else 0
-            rev_value = [rev_flag] * len(encoded_seq)
-        else:
-            rev_value = [0] * len(encoded_seq) # Default to no reverse complement info
-            
-        # Combine one-hot encoding with reverse flag
-        encoded_seq_with_rev = [list(encoded_base) + [rev] for encoded_base,
-                                rev in zip(encoded_seq, rev_value)]
-    
-        # Predict expression values using the model
-        # Convert to tensor for prediction
-        seq_tensor = torch.tensor(
-            np.array(encoded_seq_with_rev).reshape(1, SEQ_SIZE, 5).transpose(0, 2, 1),
-            device=device,
-            dtype=torch.float32
-        )
-        
-        pred = model_rnn(seq_tensor)
-        predictions[seq_id] = pred.detach().cpu().flatten().tolist()
-    
+    if model_rnn is None:
+        model_rnn = get_dream_rnn()
+    if batch_size is None:
+        batch_size = BATCH_SIZE
+
+    seq_ids, encoded_batch = encode_dream_rnn_batch(sequences, include_rev)
+
+    # Run the model once per distinct input
+    unique_rows, input_of_row = unique_input_rows(encoded_batch)
+    if len(unique_rows) < len(seq_ids):
+        print(f"Predicting {len(unique_rows)} unique inputs for {len(seq_ids)} sequence IDs")
+        encoded_batch = encoded_batch[unique_rows]
+
+    unique_preds = []
+    with torch.inference_mode():
+        # Wrap the iteration with tqdm for a progress bar
+        for start in tqdm.tqdm(range(0, len(encoded_batch), batch_size),
+                               desc="Predictions in progress", unit="batch"):
+            seq_tensor = torch.from_numpy(
+                encoded_batch[start:start + batch_size]
+            ).to(device, non_blocking=True)
+
+            preds = model_rnn(seq_tensor).cpu().numpy().reshape(len(seq_tensor), -1)
+            unique_preds.extend(pred.tolist() for pred in preds)
+
+    # Fan the predictions back out to every sequence ID
+    predictions = {seq_id: unique_preds[input_of_row[row]] for row, seq_id in enumerate(seq_ids)}
     return predictions
 
 # Training function has been removed, given the scope of this API
@@ -1,4 +1,5 @@
 # api_preprocessing_utils.py
+import numpy as np
 
 ## model specific checks that cause a "prediction_request_failed" error
 def check_seqs_specifications(sequences, json_return_error_model):
@@ -64,6 +65,38 @@ def add_adapters(seq, upstream_adapter, downstream_adapter):
     seq_with_adapters = upstream_adapter + seq + downstream_adapter
     return seq_with_adapters
 
+def left_padding_length(seq_len, target_length):
+    """
+    Number of 'N's that `pad_sequence` adds to the left of a sequence.
+
+    Args:
+        seq_len (int): Length of the (truncated) sequence.
+        target_length (int): Length of the sequence before adding adapters.
+
+    Returns:
+        int: Number of left padding positions (all padding goes to the left).
+    """
+    return max(target_length - seq_len, 0)
+
+# One-hot lookup table indexed by the ASCII byte of each base ('A', 'G', 'C', 'T'
+# in that column order). Every other byte, including 'N', maps to all zeros.
+ONE_HOT_TABLE = np.zeros((256, 4), dtype=np.uint8)
+for base_index, base in enumerate("AGCT"):
+    ONE_HOT_TABLE[ord(base), base_index] = 1
+
+def sequence_to_bytes(seq):
+    """
+    View a sequence as a uint8 array of ASCII codes without copying per base.
+
+    Args:
+        seq (str): DNA sequence.
+
+    Returns:
+        np.ndarray: uint8 array of length len(seq). Non-ASCII characters are
+                    replaced by '?' and therefore encode as all zeros.
+    """
+    return np.frombuffer(seq.encode("ascii", "replace"), dtype=np.uint8)
+
 # One-hot encode sequences
 def one_hot_encode(seq):
     """
@@ -73,14 +106,25 @@ def one_hot_encode(seq):
         seq (str): Sequence consisting of 'A', 'T', 'G', 'C', and 'N'.
 
     Returns:
-        list: A one-hot encoded list for the sequence.
+        np.ndarray: uint8 array of shape (len(seq), 4) with the one-hot encoding.
+    """
+    return np.take(ONE_HOT_TABLE, sequence_to_bytes(seq), axis=0)
+
+def one_hot_encode_batch(seqs):
+    """
+    One-hot encode a list of equal length sequences in a single lookup.
+
+    Args:
+        seqs (list): Sequences (str) that all have the same length.
+
+    Returns:
+        np.ndarray: uint8 array of shape (len(seqs), seq_len, 4).
     """
-    mapping = {'A': [1, 0, 0, 0],
-               'G': [0, 1, 0, 0],
-               'C': [0, 0, 1, 0],
-               'T': [0, 0, 0, 1],
-               'N': [0, 0, 0, 0]}
-    return [mapping.get(base, [0, 0, 0, 0]) for base in seq]
+    if not seqs:
+        return np.zeros((0, 0, 4), dtype=np.uint8)
+    seq_len = len(seqs[0])
+    seq_bytes = sequence_to_bytes("".join(seqs)).reshape(len(seqs), seq_len)
+    return np.take(ONE_HOT_TABLE, seq_bytes, axis=0)
 
 # Full preprocessing pipeline for a sequence
 def process_sequence(seq, target_length, seq_size,
@@ -96,7 +140,7 @@ def process_sequence(seq, target_length, seq_size,
         downstream_adapter (str): Downstream adapter sequence to append.
 
     Returns:
-        list: A one-hot encoded list with padding and adapters applied.
+        np.ndarray: A (seq_size, 4) one-hot encoded array with padding and adapters applied.
     """
     # Step 1: Pad the sequence
     padded_seq = pad_sequence(seq, target_length)
@@ -107,4 +151,52 @@ def process_sequence(seq, target_length, seq_size,
     # Step 3: One-hot encode the sequence
     encoded_seq = one_hot_encode(seq_with_adapters)
     
-    return encoded_seq
\ No newline at end of file
+    return encoded_seq
+
+# Full preprocessing pipeline for a dictionary of sequences
+def process_sequences_batch(sequences, target_length, seq_size,
+                            upstream_adapter, downstream_adapter):
+    """
+    Pad, add adapters and one-hot encode a whole dictionary of sequences into
+    one contiguous array, equivalent to `process_sequence` on every sequence.
+
+    Adapters are encoded once and broadcast to every row, and padding is left
+    as zeros, so no padded/adapted strings are built.
+
+    Args:
+        sequences (dict): Dictionary of sequence IDs and their corresponding sequences.
+        target_length (int): Length of the sequence before adding adapters (200 for Dream-RNN).
+        seq_size (int): Model-specific final sequence size (230 for Dream-RNN)
+        upstream_adapter (str): Upstream adapter sequence to prepend.
+        downstream_adapter (str): Downstream adapter sequence to append.
+
+    Returns:
+        seq_ids (list): Sequence IDs in the same order as the rows of `encoded_seqs`.
+        encoded_seqs (np.ndarray): uint8 array of shape (N, seq_size, 4).
+    """
+    if len(upstream_adapter) + target_length + len(downstream_adapter) != seq_size:
+        raise ValueError(f"Adapters plus target length {target_length} do not add up to {seq_size}")
+
+    seq_ids = list(sequences.keys())
+    encoded_seqs = np.zeros((len(seq_ids), seq_size, 4), dtype=np.uint8)
+
+    # Adapters are identical for every sequence
+    insert_start = len(upstream_adapter)
+    insert_end = insert_start + target_length
+    encoded_seqs[:, :insert_start] = one_hot_encode(upstream_adapter)
+    encoded_seqs[:, insert_end:] = one_hot_encode(downstream_adapter)
+
+    # Truncate long sequences the same way as `pad_sequence`
+    inserts = [sequences[seq_id][:target_length] for seq_id in seq_ids]
+    insert_lengths = np.fromiter(map(len, inserts), dtype=np.int64, count=len(inserts))
+
+    if len(inserts) and (insert_lengths == insert_lengths[0]).all():
+        # Fast path: all inserts have the same length, encode them in one lookup
+        start = insert_start + left_padding_length(int(insert_lengths[0]), target_length)
+        encoded_seqs[:, start:start + insert_lengths[0]] = one_hot_encode_batch(inserts)
+    else:
+        for i, insert in enumerate(inserts):
+            start = insert_start + left_padding_length(len(insert), target_length)
+            encoded_seqs[i, start:start + len(insert)] = one_hot_encode(insert)
+
+    return seq_ids, encoded_seqs
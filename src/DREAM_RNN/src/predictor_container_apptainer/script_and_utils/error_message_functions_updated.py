@@ -250,3 +250,40 @@ def check_key_values_downstream_flank(downstream_seq, json_return_error):
             json_return_error['bad_prediction_request'].append("'downstream_seq' value should be a string")
 
     return(json_return_error)
+
+
+def check_key_values_response_encoding(response_encoding, json_return_error):
+    response_encoding_options = ["json", "binary"]
+
+    if response_encoding not in response_encoding_options:
+        json_return_error['bad_prediction_request'].append("response_encoding requested is not recognized. Please choose from ['json', 'binary']")
+
+    return(json_return_error)
+
+
+def check_key_values_response_streaming(response_streaming, json_return_error):
+
+    if isinstance(response_streaming, bool) == True:
+        pass
+    else:
+        json_return_error['bad_prediction_request'].append("'response_streaming' value should be a boolean")
+
+    return(json_return_error)
+
+def check_key_values_response_batch_size(response_batch_size, json_return_error):
+
+    if isinstance(response_batch_size, int) == True and isinstance(response_batch_size, bool) == False and response_batch_size > 0:
+        pass
+    else:
+        json_return_error['bad_prediction_request'].append("'response_batch_size' value should be a positive integer")
+
+    return(json_return_error)
+
+def check_key_values_request_streaming(request_streaming, json_return_error):
+
+    if isinstance(request_streaming, bool) == True:
+        pass
+    else:
+        json_return_error['bad_prediction_request'].append("'request_streaming' value should be a boolean")
+
+    return(json_return_error)
@@ -2,12 +2,13 @@
 import os
 import sys
 import json
-import tqdm
-import struct
 import socket
 
 from error_message_functions_updated import *
 from api_preprocessing_utils import *
+from tcp_framing_utils import *
+from predictor_server_utils import *
+from prediction_cache import *
 
 # Get the absolute path of the script's directory
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -32,242 +33,427 @@ if DREAM_DIR not in sys.path:
 # Import from the dreamRNN_predict script
 from dreamRNN_predict import *
 
-# Set buffer size for TCP
-BUFFER_SIZE = 65536
-
-def run_predictor():
-
-    evaluator_ip = sys.argv[1]
-    evaluator_port = int(sys.argv[2])
-    # cell_type_matcher_ip = sys.argv[3]
-    # cell_type_matcher_port = sys.argv[4]
+# Predictions reused across requests (and restarts, with PREDICTOR_CACHE_DIR)
+prediction_cache = PredictionCache("dream_rnn_k562", [f"{MODEL_DIR}/model_best.pth"])
+
+def predict_dream_rnn_items(items, model_rnn):
+    """
+    Predict one shared batch of (seq_id, sequence) items from any number of requests.
+
+    Sequence IDs may repeat across requests, so every item gets its own key.
+    The key keeps the original ID because `predict_dream_rnn` reads the
+    reverse complement flag from it.
+
+    Args:
+        items (list): (seq_id, sequence) pairs.
+        model_rnn (torch.nn.Module): Resident DREAM-RNN model.
+
+    Returns:
+        list: One prediction per item, in order.
+    """
+    batch = {f"{i}:{seq_id}": sequence for i, (seq_id, sequence) in enumerate(items)}
+    predictions = predict_dream_rnn(batch, include_rev=True, model_rnn=model_rnn)
+    return [predictions[key] for key in batch]
+
+def predict_cached(batcher, sequences, cache_stats=None):
+    """
+    Predict sequences in shared batches, reusing cached predictions.
+
+    DREAM-RNN pads and flanks every sequence the same way, so a prediction
+    is addressed by the sequence and its reverse complement flag.
+
+    Args:
+        batcher (DynamicBatcher): Shared batches on the resident DREAM-RNN model.
+        sequences (dict): {seq_id: sequence} to predict.
+        cache_stats (dict, optional): Hit/miss counters of the request, updated in place.
+
+    Returns:
+        dict: {seq_id: prediction}, in the order of `sequences`.
+    """
+    if not prediction_cache.enabled:
+        return batcher.predict_dict(sequences)
+    keys = {seq_id: prediction_cache.key(sequence, ("K562",), "point",
+                                         "Reversed" if "Reversed" in seq_id else "")
+            for seq_id, sequence in sequences.items()}
+    predictions = {}
+    missing = {}
+    for seq_id, sequence in sequences.items():
+        cached = prediction_cache.get(keys[seq_id])
+        if cached is None:
+            missing[seq_id] = sequence
+        else:
+            predictions[seq_id] = cached.tolist()
+    if missing:
+        for seq_id, prediction in batcher.predict_dict(missing).items():
+            prediction_cache.put(keys[seq_id], prediction)
+            predictions[seq_id] = prediction
+    if cache_stats is not None:
+        cache_stats['hits'] += len(sequences) - len(missing)
+        cache_stats['misses'] += len(missing)
+    return {seq_id: predictions[seq_id] for seq_id in sequences}
+
+def cache_metadata(cache_stats):
+    """Response metadata reporting the cache hits and misses of a request."""
+    return {'cache': cache_stats} if prediction_cache.enabled else {}
+
+def send_json_message(client_socket, json_message, response_encoding="json"):
+    """
+    Length prefix and send a JSON-serializable object to the Evaluator.
+
+    Args:
+        client_socket (socket.socket): Connected Evaluator socket.
+        json_message (dict): Message to send.
+        response_encoding (str): "json" or "binary" (see tcp_framing_utils).
+
+    Returns:
+        bool: True if the message was sent, False if the socket failed.
+    """
+    try:
+        send_message(client_socket, json_message, response_encoding)
+        return True
+    except socket.error as e:
+        print("server_error: Error sending response: %s" % e)
+        return False
 
-    #create error object
-    json_return_error = {}
+def send_request_error(client_socket, evaluator_json, json_error):
+    """
+    Send an error reply to a request the Predictor rejected.
 
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    The sequence batches of a rejected streamed request are dropped first
+    (see tcp_framing_utils.discard_stream_request), so the next frame read
+    is the Evaluator's next request.
 
-    # bind the socket to a specific address and port
-    server.bind((evaluator_ip, evaluator_port))
-    # listen for incoming connections
-    server.listen(0)
-    print(f"Listening on {evaluator_ip}:{evaluator_port}")
+    Args:
+        client_socket (socket.socket): Connected Evaluator socket.
+        evaluator_json (dict): Rejected request (header of a streamed request).
+        json_error (dict): Error message to send.
 
-    # accept incoming connections
-    client_socket, client_address = server.accept()
-    print(f"Accepted connection from {client_address[0]}:{client_address[1]}")
+    Returns:
+        bool: True if the error was sent, False if the socket failed.
+    """
+    try:
+        discard_stream_request(client_socket, evaluator_json, desc="Discarding Evaluator Sequences")
+    except (ConnectionError, socket.error) as e:
+        print("server_error: Error receiving rejected streamed request: %s" % e)
+        return False
+    return send_json_message(client_socket, json_error)
+
+def send_streamed_predictions(client_socket, json_return, sequences, batcher,
+                              response_encoding="json", batch_size=BATCH_SIZE):
+    """
+    Predict and send the response one batch of sequences at a time.
+
+    The Evaluator receives a header frame, one frame per batch and prediction
+    task, then a trailer (see tcp_framing_utils), so neither side holds all
+    predictions at once.
+
+    Args:
+        client_socket (socket.socket): Connected Evaluator socket.
+        json_return (dict): Return message without predictions.
+        sequences (dict): {seq_id: sequence} to predict.
+        batcher (DynamicBatcher): Shared batches on the resident DREAM-RNN model.
+        response_encoding (str): "json" or "binary".
+        batch_size (int): Number of sequences per batch frame.
+
+    Returns:
+        bool: True if the whole response was sent, False if the socket failed.
+    """
+    seq_ids = list(sequences.keys())
+    n_batches = 0
+    cache_stats = new_cache_stats()
+    try:
+        send_stream_header(client_socket, json_return, response_encoding)
+        for start in range(0, len(seq_ids), batch_size):
+            batch = {seq_id: sequences[seq_id] for seq_id in seq_ids[start:start + batch_size]}
+            model_predictions = predict_cached(batcher, batch, cache_stats)
+            # Every prediction task shares the same K562 predictions
+            for current_prediction_task in json_return['prediction_tasks']:
+                send_stream_batch(client_socket, current_prediction_task['name'],
+                                  model_predictions, response_encoding)
+                n_batches += 1
+        send_stream_trailer(client_socket, n_batches, response_encoding,
+                            **cache_metadata(cache_stats))
+        return True
+    except socket.error as e:
+        print("server_error: Error sending streamed response: %s" % e)
+        return False
+
+def predict_streamed_request(client_socket, json_return, batcher, response_encoding="json",
+                             response_streaming=False):
+    """
+    Receive the sequence batches of a streamed request and predict each batch as it arrives.
+
+    The next batches are received in the background while the current one is
+    predicted (see tcp_framing_utils.iter_stream_prefetch). Predictions are
+    returned in one message, or batch by batch if `response_streaming` is set.
+
+    Args:
+        client_socket (socket.socket): Connected Evaluator socket.
+        json_return (dict): Return message without predictions.
+        batcher (DynamicBatcher): Shared batches on the resident DREAM-RNN model.
+        response_encoding (str): "json" or "binary".
+        response_streaming (bool): If True, send a streamed response.
+
+    Returns:
+        bool: True if the response was sent, False if the socket failed.
+    """
+    json_return_error = {'bad_prediction_request': []}
+    json_return_error_model = {'prediction_request_failed': []}
+    model_predictions = {}
+    seen_ids = set()
+    n_batches = 0
+    cache_stats = new_cache_stats()
+    try:
+        if response_streaming:
+            send_stream_header(client_socket, json_return, response_encoding)
+        for frame in iter_stream_prefetch(client_socket, desc="Receiving Evaluator Sequences"):
+            # Skip the trailer, and drain the remaining batches once an error was found
+            if frame.get(STREAM_KEY) != "batch" or any(json_return_error.values()) \
+                    or any(json_return_error_model.values()):
+                continue
+            sequences = frame['sequences']
+            duplicated = seen_ids.intersection(sequences)
+            if duplicated:
+                json_return_error['bad_prediction_request'].append(
+                    "Duplicate sequence ID keys across batches: " + ' '.join(sorted(duplicated)))
+                continue
+            seen_ids.update(sequences)
+            json_return_error_model = check_seqs_specifications(sequences, json_return_error_model)
+            if any(json_return_error_model.values()):
+                continue
+
+            batch_predictions = predict_cached(batcher, sequences, cache_stats)
+            if response_streaming:
+                # Every prediction task shares the same K562 predictions
+                for current_prediction_task in json_return['prediction_tasks']:
+                    send_stream_batch(client_socket, current_prediction_task['name'],
+                                      batch_predictions, response_encoding)
+                    n_batches += 1
+            else:
+                model_predictions.update(batch_predictions)
+    except (ConnectionError, socket.error) as e:
+        print("server_error: Error during streamed request: %s" % e)
+        return False
+
+    # An error message also ends a streamed response
+    if any(json_return_error.values()):
+        return send_json_message(client_socket, json_return_error)
+    if any(json_return_error_model.values()):
+        return send_json_message(client_socket, json_return_error_model)
+
+    if response_streaming:
+        try:
+            send_stream_trailer(client_socket, n_batches, response_encoding,
+                                **cache_metadata(cache_stats))
+            return True
+        except socket.error as e:
+            print("server_error: Error sending streamed response: %s" % e)
+            return False
 
-    # Step 1: receive total bytes the Predictor expects to receive
-    # Step 2: receive JSON from evaluator
+    for current_prediction_task in json_return['prediction_tasks']:
+        current_prediction_task['predictions'] = model_predictions
+    json_return.update(cache_metadata(cache_stats))
+    return send_json_message(client_socket, json_return, response_encoding)
 
-    # Initialize data to store a new message on each iteration
-    json_data_recv = b''
+def recv_message_loop(client_socket, batcher):
+    # Step 1: Receive total bytes (length) of the Evaluator's request
+    # Step 2: Receive file from Evaluator
+    # Runs on its own thread per Evaluator connection. Sequences of all
+    # connections are predicted in shared batches by `batcher` on the
+    # same resident model.
 
+    # ---------------------- Receive Evaluator JSON ----------------------
     while True:
-        # Before receiving JSON from Evaluator
-        # Receive length of the incoming JSON message (4-byte integer)
-        # Can change to 8-byte integer by changing .recv(4) to .recv(8)
-        # and replacing format string '>I' to '>Q'
-        # Step 1
+        # Receive the length prefix and then the JSON into one preallocated buffer
         try:
-            msg_length = client_socket.recv(4)
-            if not msg_length:
-                print("Failed to receive message length. Closing connection.")
-                client_socket.close()
-                break # Exit the loop if no message length is received
-
-            # Unpack message length from 4 bytes
-            msglen = struct.unpack('>I', msg_length)[0]
-            print(f"Expecting {msglen} bytes of data from the Evaluator.")
-            
-            # Initialize the progress bar
-            progress = tqdm.tqdm(range(msglen), unit="B", 
-                                 desc="Receiving Evaluator Request(s)",
-                                 unit_scale=True, unit_divisor=1024)
-
-            # Step 2
-            # Now we want to receive the actual JSON in packets
-            while len(json_data_recv) < msglen:
-                packet = client_socket.recv(BUFFER_SIZE)
-                if not packet:
-                    print("Connection closed unexpectedly.")
-                    break
-                json_data_recv += packet
-                progress.update(len(packet))
-                # print(f"Received packet of {len(packet)} bytes, total received: {len(data)} bytes")
-            
-            # Close the progress bar when done
-            progress.close()
-            
-            # Decode and display the received data if all of it is received
-            if len(json_data_recv) == msglen:
-                print("Evaluator request received completely")
-                break
-            else:
-                print("Data received was incomplete or corrupted.")
-                break
-        except Exception as e:
+            evaluator_request_full = recv_frame(client_socket, desc="Receiving Evaluator Request(s)")
+        except (ConnectionError, socket.error) as e:
             print(f"Error while receiving data: {e}")
             client_socket.close()
             break  # Break the loop on exception
 
+        if evaluator_request_full is None:
+            print("Evaluator closed the connection.")
+            client_socket.close()
+            break # Exit the loop if no message length is received
+        print("Evaluator request received completely")
 
-# ---------------------- %%%%%%%---------------
-    evaluator_request_full = json_data_recv
-    evaluator_json = evaluator_request_full.decode("utf-8")
-    evaluator_json = json.loads(evaluator_json)
-
-    # group these functions
-    json_return_error = {'bad_prediction_request': []}
-
-    # if only a "help" was requested return the predictor information file
-    if evaluator_json['request'] == "help":
-
-        #model builder should place help file in predictor folder
-        help_file = HELP_FILE
-        jsonResult_help = json.load(open(help_file))
+        # ---------------------- Process Received JSON ----------------------
+        # Parse straight from the receive buffer
+        evaluator_json = json.loads(evaluator_request_full)
 
-        jsonResult_help = json.dumps(jsonResult_help)
-        try:
-            jsonResult_help_bytes = jsonResult_help.encode("utf-8")
-            jsonResult_help_total_bytes = len(jsonResult_help_bytes)
-            client_socket.sendall(struct.pack('>I', jsonResult_help_total_bytes))
-            client_socket.sendall(jsonResult_help_bytes)
-            sys.exit(0)
-        except socket.error as e:
-            print ("server_error: Error sending error_file: %s" % e)
-            sys.exit(1)
+        # group these functions
+        json_return_error = {'bad_prediction_request': []}
 
+        # if only a "help" was requested return the predictor information file
+        if evaluator_json['request'] == "help":
 
-    # re-usable error checking functions
-    json_return_error = check_mandatory_keys(evaluator_json.keys(), json_return_error)
-    json_return_error = check_request(evaluator_json['request'], json_return_error)
-    json_return_error = check_prediction_task_mandatory_keys(evaluator_json['prediction_tasks'], json_return_error)
-    # if any of the mandatory keys are missing immediately return an error to the evaluator
-    if any(json_return_error.values()) == True:
-        json_string = json.dumps(json_return_error)
-        try:
-            jsonResult_error_bytes = json_string.encode("utf-8")
-            jsonResult_error_total_bytes = len(jsonResult_error_bytes)
-            client_socket.sendall(struct.pack('>I', jsonResult_error_total_bytes))
-            client_socket.sendall(jsonResult_error_bytes)
-            sys.exit(1)
-        except socket.error as e:
-            print ("server_error: Error sending error_file: %s" % e)
-            sys.exit(1)
-    else:
-        json_return_error = check_key_values_readout(evaluator_json['readout'], json_return_error)
-        json_return_error = check_prediction_task_name(evaluator_json['prediction_tasks'], json_return_error)
-        json_return_error = check_prediction_task_type(evaluator_json['prediction_tasks'], json_return_error)
-        json_return_error = check_prediction_task_cell_type(evaluator_json['prediction_tasks'], json_return_error)
-        # json_return_error = check_prediction_task_species(evaluator_json['prediction_tasks'], json_return_error)
-        if 'prediction_ranges' in evaluator_json.keys():
-            json_return_error = check_seq_ids(evaluator_json['prediction_ranges'], evaluator_json['sequences'], json_return_error)
-            json_return_error = check_prediction_ranges(evaluator_json['prediction_ranges'], json_return_error)
-
-        if 'upstream_seq' in evaluator_json.keys() or 'downstream_seq' in evaluator_json.keys():
-            json_return_error = check_key_values_upstream_flank(evaluator_json['upstream_seq'], json_return_error)
-        if 'downstream_seq' in evaluator_json.keys():
-            json_return_error = check_key_values_downstream_flank(evaluator_json['downstream_seq'], json_return_error)
-
-        #if any errors were caught return them all to evaluator
+            #model builder should place help file in predictor folder
+            help_file = HELP_FILE
+            print(f"Help requested! Sending {HELP_FILE}...")
+            jsonResult_help = json.load(open(help_file))
+            if send_json_message(client_socket, jsonResult_help):
+                continue
+            client_socket.close()
+            print("Connection to client closed")
+            break
+
+        # re-usable error checking functions
+        json_return_error = check_mandatory_keys(evaluator_json.keys(), json_return_error)
+        json_return_error = check_request(evaluator_json['request'], json_return_error)
+        json_return_error = check_prediction_task_mandatory_keys(evaluator_json['prediction_tasks'], json_return_error)
+        # if any of the mandatory keys are missing immediately return an error to the evaluator
         if any(json_return_error.values()) == True:
-            json_string = json.dumps(json_return_error)
-            try:
-                jsonResult_error_bytes = json_string.encode("utf-8")
-                jsonResult_error_total_bytes = len(jsonResult_error_bytes)
-                client_socket.sendall(struct.pack('>I', jsonResult_error_total_bytes))
-                client_socket.sendall(jsonResult_error_bytes)
-                sys.exit(1)
-            except socket.error as e:
-                print ("server_error: Error sending error_file: %s" % e)
-                sys.exit(1)
-
-# ---------------------- %%%%%%%---------------
-    # Extract sequences to predict
-    # Check that the sequences meet model specifications
-    # Otherwise do any other formatting required for the model
-    sequences = evaluator_json['sequences']
-    # Can add any additional error checking functons here
-    json_return_error_model = {'prediction_request_failed': {}}
-    json_return_error_model = check_seqs_specifications(sequences, json_return_error_model)
-
-    # if anything is caught don't run the model and return to evaluator to fix
-    if any(json_return_error_model.values()) == True:
-        json_string = json.dumps(json_return_error_model)
-        try:
-            jsonResult_bytes = json_string.encode("utf-8")
-            jsonResults_total_bytes = len(jsonResult_bytes)
-
-            client_socket.sendall(struct.pack('>I', jsonResults_total_bytes))
-
-            client_socket.sendall(jsonResult_bytes)
-        except socket.error as e:
-            print ("server_error: Error sending error_file: %s" % e)
-            sys.exit(1)
-
-    # Start big loop here for all the prediction_tasks
-    # Connect to cell type matching container in cases of multi-task models
-    # cell_type_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    # cell_type_socket.connect((cell_type_matcher_ip, cell_type_matcher_port))
-
-    # Create JSON to return
-    json_return = {'request': evaluator_json['request']}
-    # Prediction task is an array of objects for all requested tasks
-    json_return['prediction_tasks'] = []
-    # Loop through all the prediction tasks
-    for prediction_task in evaluator_json['prediction_tasks']:
-        
-        # Cell type predictor container is running, send the predictors's cell type and evalutor cell type to it
-        # If you want to override the cell type container you can remove the following code
-        # Send the predictor and evaluator cell type
-        # cell_type_socket.sendall(b'Hello, cell type matcher dude!')
-        # cell_type_matcher_return = cell_type_socket.recv(1024)
-
-        # The following code will be model specific
-        # Sample point prediction model
-        # Model builders need to add the appropriate returns here
-        
-        current_prediction_task = {'name': prediction_task['name']}
-
-        current_prediction_task['type_requested'] =  prediction_task['type']
-        current_prediction_task ['type_actual']  = 'expression'
-
-        current_prediction_task['cell_type_requested'] = prediction_task['cell_type']
-        current_prediction_task['cell_type_actual'] =  'K562'
-
-        current_prediction_task['scale_prediction_requested'] =  prediction_task['scale']
-        current_prediction_task['scale_prediction_actual']  = 'log'
-
-        current_prediction_task['species_requested']  = prediction_task['species']
-        current_prediction_task['species_actual']  = 'homo_sapiens'
-
-        # Add predictions dictionary to the JSON
-        model_predictions = predict_dream_rnn(sequences, include_rev=True)
-        current_prediction_task['predictions'] = model_predictions
-        # Append results for current prediction task to the main JSON object
-        json_return['prediction_tasks'].append(current_prediction_task)
+            if send_request_error(client_socket, evaluator_json, json_return_error):
+                continue
+            client_socket.close()
+            print("Connection to client closed")
+            break
+        else:
+            json_return_error = check_key_values_readout(evaluator_json['readout'], json_return_error)
+            json_return_error = check_prediction_task_name(evaluator_json['prediction_tasks'], json_return_error)
+            json_return_error = check_prediction_task_type(evaluator_json['prediction_tasks'], json_return_error)
+            json_return_error = check_prediction_task_cell_type(evaluator_json['prediction_tasks'], json_return_error)
+            # json_return_error = check_prediction_task_species(evaluator_json['prediction_tasks'], json_return_error)
+            if 'prediction_ranges' in evaluator_json.keys():
+                json_return_error = check_seq_ids(evaluator_json['prediction_ranges'], evaluator_json['sequences'], json_return_error)
+                json_return_error = check_prediction_ranges(evaluator_json['prediction_ranges'], json_return_error)
+
+            if 'upstream_seq' in evaluator_json.keys() or 'downstream_seq' in evaluator_json.keys():
+                json_return_error = check_key_values_upstream_flank(evaluator_json['upstream_seq'], json_return_error)
+            if 'downstream_seq' in evaluator_json.keys():
+                json_return_error = check_key_values_downstream_flank(evaluator_json['downstream_seq'], json_return_error)
+            if 'response_encoding' in evaluator_json.keys():
+                json_return_error = check_key_values_response_encoding(evaluator_json['response_encoding'], json_return_error)
+            if 'response_streaming' in evaluator_json.keys():
+                json_return_error = check_key_values_response_streaming(evaluator_json['response_streaming'], json_return_error)
+            if 'response_batch_size' in evaluator_json.keys():
+                json_return_error = check_key_values_response_batch_size(evaluator_json['response_batch_size'], json_return_error)
+            if 'request_streaming' in evaluator_json.keys():
+                json_return_error = check_key_values_request_streaming(evaluator_json['request_streaming'], json_return_error)
+
+            #if any errors were caught return them all to evaluator
+            if any(json_return_error.values()) == True:
+                if send_request_error(client_socket, evaluator_json, json_return_error):
+                    continue
+                client_socket.close()
+                print("Connection to client closed")
+                break
 
-    # Convert dictionary to JSON object and send back to evaluator
+        # ---------------------- Process Sequences ----------------------
+        # Extract sequences to predict
+        # Check that the sequences meet model specifications
+        # Otherwise do any other formatting required for the model
+        sequences = evaluator_json['sequences']
+        # Can add any additional error checking functons here
+        json_return_error_model = {'prediction_request_failed': []}
+        json_return_error_model = check_seqs_specifications(sequences, json_return_error_model)
+
+        # if anything is caught don't run the model and return to evaluator to fix
+        if any(json_return_error_model.values()) == True:
+            if send_request_error(client_socket, evaluator_json, json_return_error_model):
+                continue
+            client_socket.close()
+            print("Connection to client closed")
+            break
+
+        # ---------------------- Run the Model and Return Predictions ----------------------
+        # Start big loop here for all the prediction_tasks
+        # Connect to cell type matching container in cases of multi-task models
+        # cell_type_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # cell_type_socket.connect((cell_type_matcher_ip, cell_type_matcher_port))
+
+        # Create JSON to return
+        json_return = {'request': evaluator_json['request']}
+        # Prediction task is an array of objects for all requested tasks
+        json_return['prediction_tasks'] = []
+        # Loop through all the prediction tasks
+        for prediction_task in evaluator_json['prediction_tasks']:
+
+            # Cell type predictor container is running, send the predictors's cell type and evalutor cell type to it
+            # If you want to override the cell type container you can remove the following code
+            # Send the predictor and evaluator cell type
+            # cell_type_socket.sendall(b'Hello, cell type matcher dude!')
+            # cell_type_matcher_return = cell_type_socket.recv(1024)
+
+            # The following code will be model specific
+            # Sample point prediction model
+            # Model builders need to add the appropriate returns here
+
+            current_prediction_task = {'name': prediction_task['name']}
+
+            current_prediction_task['type_requested'] =  prediction_task['type']
+            current_prediction_task ['type_actual']  = 'expression'
+
+            current_prediction_task['cell_type_requested'] = prediction_task['cell_type']
+            current_prediction_task['cell_type_actual'] =  'K562'
+
+            current_prediction_task['scale_prediction_requested'] =  prediction_task['scale']
+            current_prediction_task['scale_prediction_actual']  = 'log'
+
+            current_prediction_task['species_requested']  = prediction_task['species']
+            current_prediction_task['species_actual']  = 'homo_sapiens'
+
+            # Append results for current prediction task to the main JSON object
+            json_return['prediction_tasks'].append(current_prediction_task)
+
+        response_encoding = evaluator_json.get('response_encoding', "json")
+        if evaluator_json.get('request_streaming', False):
+            # Sequences follow the request header in batches; predict each as it arrives
+            if predict_streamed_request(client_socket, json_return, batcher, response_encoding,
+                                        evaluator_json.get('response_streaming', False)):
+                continue
+            client_socket.close()
+            print("Connection to client closed")
+            break
+
+        if evaluator_json.get('response_streaming', False):
+            # Send a header, one frame per batch of sequences and a trailer
+            batch_size = evaluator_json.get('response_batch_size', BATCH_SIZE)
+            if send_streamed_predictions(client_socket, json_return, sequences, batcher,
+                                         response_encoding, batch_size):
+                continue
+            client_socket.close()
+            print("Connection to client closed")
+            break
+
+        # DREAM-RNN has a single K562 output, so every prediction task maps to
+        # the same model predictions. Run the resident model ONCE per request
+        # (in batches shared with other Evaluators) and share the predictions across all tasks.
+        cache_stats = new_cache_stats()
+        model_predictions = predict_cached(batcher, sequences, cache_stats)
+        for current_prediction_task in json_return['prediction_tasks']:
+            # Add predictions dictionary to the JSON
+            current_prediction_task['predictions'] = model_predictions
+        # Cache hits and misses of this request
+        json_return.update(cache_metadata(cache_stats))
+
+        # Convert dictionary to JSON object (or binary payload) and send back to evaluator
+        if send_json_message(client_socket, json_return, response_encoding):
+            continue
+        client_socket.close()
+        print("Connection to client closed")
+        break
 
-    json_string = json.dumps(json_return)
-    try:
-        jsonResult_bytes = json_string.encode("utf-8")
-        jsonResults_total_bytes = len(jsonResult_bytes)
+def run_predictor():
 
-        client_socket.sendall(struct.pack('>I', jsonResults_total_bytes))
+    predictor_ip = sys.argv[1]
+    predictor_port = int(sys.argv[2])
+    # cell_type_matcher_ip = sys.argv[3]
+    # cell_type_matcher_port = sys.argv[4]
 
-        client_socket.sendall(jsonResult_bytes)
-        sys.exit(0)
-    except socket.error as e:
-        print ("server_error: Error sending error_file: %s" % e)
-        sys.exit(1)
-
-# ---------------------- %%%%%%%---------------
-    # close connection socket with the client
-    client_socket.close()
-    print("Connection to client closed")
-    # close server socket
-    server.close()
+    # Load the model ONCE at startup and keep it resident for all Evaluators
+    model_rnn = get_dream_rnn()
+    # Inference requests from all Evaluator connections share this queue and its workers
+    inference_pool = InferencePool()
+    # Sequences of concurrent requests are coalesced into shared model batches
+    batcher = DynamicBatcher(lambda items, group: predict_dream_rnn_items(items, model_rnn),
+                             inference_pool, max_batch_size=BATCH_SIZE)
+
+    # Serve many Evaluators at once, each connection on its own thread
+    serve_predictor(predictor_ip, predictor_port,
+                    lambda client_socket: recv_message_loop(client_socket, batcher))
+    batcher.shutdown()
+    inference_pool.shutdown()
 
 run_predictor()
@@ -0,0 +1,320 @@
+# predictor_server_utils.py
+"""
+Concurrent Predictor server shared by the Predictor APIs.
+
+Several Evaluators (Gosai, Agarwal, custom) can target the same Predictor
+node. Each Evaluator connection is served on its own thread, so requests
+are received, parsed and validated concurrently. Model inference is
+dispatched to an `InferencePool`: a bounded request queue in front of a
+fixed number of worker threads sharing the ONE model loaded at startup.
+
+Socket I/O and the model kernels (PyTorch / TensorFlow) release the GIL,
+so connection threads keep receiving and validating while a worker runs
+the model. With the default single worker, inference is serialized on
+one thread, which keeps GPU memory and non thread-safe model code safe.
+
+A `DynamicBatcher` in front of the pool coalesces the sequences of
+concurrent requests into shared model batches, so small requests from
+several Evaluators fill the device together.
+"""
+import os
+import time
+import queue
+import socket
+import selectors
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+# Evaluator connections served at once; further connections wait in the listen backlog
+MAX_CLIENTS = int(os.environ.get("PREDICTOR_MAX_CLIENTS", 8))
+# Worker threads running inference on the shared model
+INFERENCE_WORKERS = int(os.environ.get("PREDICTOR_INFERENCE_WORKERS", 1))
+# Inference jobs waiting for a worker before new submissions block
+INFERENCE_QUEUE_SIZE = int(os.environ.get("PREDICTOR_INFERENCE_QUEUE_SIZE", 32))
+# Largest batch the DynamicBatcher hands to the model
+MAX_BATCH_SIZE = int(os.environ.get("PREDICTOR_MAX_BATCH_SIZE", 1024))
+# How long the DynamicBatcher waits for more sequences before running a partial batch
+MAX_WAIT_MS = float(os.environ.get("PREDICTOR_MAX_WAIT_MS", 10))
+# Pending connections the OS queues before the Predictor accepts them
+LISTEN_BACKLOG = 64
+# How often the accept loop wakes up to notice a shutdown (seconds)
+ACCEPT_POLL_SECONDS = 1.0
+
+class InferencePool:
+    """
+    Bounded request queue and worker threads sharing one loaded model.
+
+    Jobs are plain callables, e.g. `pool.run(predict_dream_rnn, sequences,
+    include_rev=True, model_rnn=model_rnn)`. When the queue is full,
+    `submit` blocks, which pushes back on the connection threads instead of
+    buffering an unbounded number of requests in memory.
+
+    Args:
+        n_workers (int): Number of inference worker threads.
+        max_queued (int): Maximum number of jobs waiting for a worker.
+        name (str): Prefix of the worker thread names.
+    """
+
+    def __init__(self, n_workers=INFERENCE_WORKERS, max_queued=INFERENCE_QUEUE_SIZE,
+                 name="inference"):
+        self.jobs = queue.Queue(maxsize=max_queued)
+        self.workers = [threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+                        for i in range(max(1, n_workers))]
+        for worker in self.workers:
+            worker.start()
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            future, fn, args, kwargs = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue `fn(*args, **kwargs)` for a worker thread.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the return value of `fn`.
+        """
+        future = Future()
+        self.jobs.put((future, fn, args, kwargs))
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Run `fn(*args, **kwargs)` on a worker thread and wait for its result.
+
+        Exceptions raised by `fn` are re-raised in the calling thread.
+        """
+        return self.submit(fn, *args, **kwargs).result()
+
+    def shutdown(self):
+        """Stop the workers once the queued jobs are done."""
+        for _ in self.workers:
+            self.jobs.put(None)
+        for worker in self.workers:
+            worker.join()
+
+class DynamicBatcher:
+    """
+    Coalesce sequences from concurrent requests into shared model batches.
+
+    Connection threads submit their sequences one item at a time; a collector
+    thread groups waiting items into batches of up to `max_batch_size`,
+    waiting at most `max_wait_ms` for a batch to fill, runs each batch on
+    the `InferencePool` and hands every item its own result back. A new batch
+    is only formed once a worker is free, so sequences queued while the model
+    is busy go out together in the next batch.
+
+    Items are only batched with items of the same `group` (e.g. the same
+    track selection of a multi-task model); items without a group all share
+    one model configuration.
+
+    Args:
+        predict_batch (callable): `predict_batch(items, group)` returns one
+            result per item, in order.
+        inference_pool (InferencePool): Workers running the model.
+        max_batch_size (int): Maximum number of items per batch.
+        max_wait_ms (float): Maximum time to wait for a batch to fill.
+        name (str): Name of the collector thread.
+    """
+
+    def __init__(self, predict_batch, inference_pool, max_batch_size=MAX_BATCH_SIZE,
+                 max_wait_ms=MAX_WAIT_MS, name="batcher"):
+        self.predict_batch = predict_batch
+        self.inference_pool = inference_pool
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.items = queue.Queue()
+        # Items of other groups set aside while a batch was collected
+        self.deferred = deque()
+        # One batch in flight per worker
+        self.in_flight = threading.BoundedSemaphore(len(inference_pool.workers))
+        self.n_batches = 0
+        self.n_items = 0
+        self.collector = threading.Thread(target=self._collect, name=name, daemon=True)
+        self.collector.start()
+
+    def submit(self, items, group=None):
+        """
+        Queue items for batched prediction.
+
+        Args:
+            items (iterable): Model inputs, e.g. (seq_id, sequence) pairs.
+            group (hashable, optional): Only items of the same group share a batch.
+
+        Returns:
+            list: One concurrent.futures.Future per item.
+        """
+        futures = []
+        for item in items:
+            future = Future()
+            self.items.put((group, item, future))
+            futures.append(future)
+        return futures
+
+    def predict(self, items, group=None):
+        """
+        Predict items in shared batches and wait for their results.
+
+        Exceptions raised by `predict_batch` are re-raised in the calling thread.
+
+        Returns:
+            list: One result per item, in order.
+        """
+        return [future.result() for future in self.submit(items, group)]
+
+    def predict_dict(self, sequences, group=None):
+        """
+        Predict a {seq_id: sequence} dictionary in shared batches.
+
+        Each (seq_id, sequence) pair is one item, so `predict_batch` still
+        sees the sequence IDs.
+
+        Returns:
+            dict: {seq_id: result}
+        """
+        return dict(zip(sequences, self.predict(list(sequences.items()), group)))
+
+    def shutdown(self):
+        """Stop the collector once the queued items are batched."""
+        self.items.put(None)
+        self.collector.join()
+
+    def _next_batch(self):
+        # Start with the oldest item, deferred ones first
+        first = self.deferred.popleft() if self.deferred else self.items.get()
+        if first is None:
+            return None, False
+        group = first[0]
+        batch = [first]
+        kept = deque()
+        for entry in self.deferred:
+            if entry[0] == group and len(batch) < self.max_batch_size:
+                batch.append(entry)
+            else:
+                kept.append(entry)
+        self.deferred = kept
+
+        # Wait up to max_wait for the batch to fill
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                entry = self.items.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if entry is None:
+                return batch, False
+            if entry[0] == group:
+                batch.append(entry)
+            else:
+                self.deferred.append(entry)
+        return batch, True
+
+    def _collect(self):
+        running = True
+        while running:
+            self.in_flight.acquire()
+            batch, running = self._next_batch()
+            if batch is None:
+                break
+            self.n_batches += 1
+            self.n_items += len(batch)
+            print(f"Running a shared batch of {len(batch)} sequence(s)")
+            batch_future = self.inference_pool.submit(self.predict_batch,
+                                                      [item for _, item, _ in batch], batch[0][0])
+            batch_future.add_done_callback(lambda done, batch=batch: self._demultiplex(done, batch))
+
+        for _, _, future in self.deferred:
+            future.set_exception(RuntimeError("The Predictor is shutting down."))
+
+    def _demultiplex(self, batch_future, batch):
+        # Hand every item its own result and free the batch slot
+        self.in_flight.release()
+        try:
+            results = list(batch_future.result())
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch of {len(batch)} items returned {len(results)} results.")
+        except BaseException as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+def serve_client(handle_client, client_socket, client_address, client_slots):
+    """
+    Serve one Evaluator connection, then free its slot.
+
+    Args:
+        handle_client (callable): Called with the connected socket; serves
+            all requests on the connection (e.g. `recv_message_loop`).
+        client_socket (socket.socket): Connected Evaluator socket.
+        client_address (tuple): (ip, port) of the Evaluator.
+        client_slots (threading.BoundedSemaphore): Limits concurrent connections.
+    """
+    try:
+        handle_client(client_socket)
+    except Exception as e:
+        print(f"Error serving {client_address[0]}:{client_address[1]}: {e}")
+    finally:
+        client_socket.close()
+        client_slots.release()
+        print(f"Finished serving {client_address[0]}:{client_address[1]}")
+
+def serve_predictor(predictor_ip, predictor_port, handle_client, max_clients=MAX_CLIENTS):
+    """
+    Accept Evaluator connections and serve up to `max_clients` of them concurrently.
+
+    A selector-based accept loop hands every connection to its own thread.
+    The loop runs until interrupted (Ctrl+C).
+
+    Args:
+        predictor_ip (str): Address to bind.
+        predictor_port (int): Port to bind.
+        handle_client (callable): Called with each connected socket on its own thread.
+        max_clients (int): Maximum number of connections served at once.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+    # bind the socket to a specific address and port
+    server.bind((predictor_ip, predictor_port))
+    # listen for incoming connections
+    server.listen(LISTEN_BACKLOG)
+    print(f"Listening on {predictor_ip}:{predictor_port} (up to {max_clients} Evaluators at once)")
+
+    client_slots = threading.BoundedSemaphore(max(1, max_clients))
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+    try:
+        # This loop allows the Predictor server to stay running so that different Evaluators can connect
+        while True:
+            # Only accept once a slot is free; extra Evaluators wait in the backlog
+            client_slots.acquire()
+            while not selector.select(timeout=ACCEPT_POLL_SECONDS):
+                pass
+            try:
+                client_socket, client_address = server.accept()
+            except OSError as e:
+                client_slots.release()
+                print(f"Error accepting client: {e}")
+                continue
+            print(f"Accepted connection from {client_address[0]}:{client_address[1]}")
+            threading.Thread(target=serve_client,
+                             args=(handle_client, client_socket, client_address, client_slots),
+                             name=f"evaluator-{client_address[0]}:{client_address[1]}",
+                             daemon=True).start()
+    except KeyboardInterrupt:
+        print("Shutting down the Predictor")
+    finally:
+        selector.close()
+        server.close()
@@ -0,0 +1,722 @@
+# tcp_framing_utils.py
+# Length-prefixed message framing shared by the Evaluator and Predictor containers.
+# Keep every copy of this file identical across containers.
+import os
+import json
+import queue
+import struct
+import socket
+import threading
+import tqdm
+import numpy as np
+
+# Framing protocol versions
+# Version 1: every frame starts with a 4-byte big-endian length ('>I'), so a
+#            single message is capped at 4 GiB.
+# Version 2: frames of 4 GiB or more send the 4-byte escape value
+#            LONG_LENGTH_ESCAPE followed by an 8-byte big-endian length ('>Q').
+#            Smaller frames are identical to version 1, so version 1 peers keep
+#            working for every message they could already handle.
+PROTOCOL_VERSION = 2
+LENGTH_FORMAT = '>I'
+LONG_LENGTH_FORMAT = '>Q'
+LONG_LENGTH_ESCAPE = 0xFFFFFFFF
+
+# Maximum number of bytes requested from the socket per recv_into call
+BUFFER_SIZE = 1 << 20
+
+# Binary tensor payloads (`"response_encoding": "binary"`)
+# A binary frame payload is laid out as:
+#   BINARY_MAGIC (8 bytes) | envelope length ('>Q') | UTF-8 JSON envelope | tensor data
+# The envelope is {"message": ..., "tensors": [...]} where every array in the
+# message is replaced by {"__tensor__": i} and tensors[i] holds its "dtype"
+# (little-endian numpy dtype string, e.g. "<f2"), "shape", "offset" (from the
+# start of the tensor data) and "nbytes". The envelope is padded with spaces so
+# the tensor data, and every tensor in it, starts 8-byte aligned.
+# JSON payloads always start with '{', so the two encodings can not be confused.
+RESPONSE_ENCODINGS = ["json", "binary"]
+BINARY_MAGIC = b"GAMEBIN1"
+BINARY_HEADER_FORMAT = '>Q'
+TENSOR_ALIGNMENT = 8
+TENSOR_KEY = "__tensor__"
+
+# Streamed responses (`"response_streaming": true`)
+# Instead of one return message the Predictor sends, each with the requested
+# response_encoding:
+#   header frame:  the return message without "predictions" in its prediction
+#                  tasks, plus {"stream": "header"}
+#   batch frames:  {"stream": "batch", "name": <prediction task name>,
+#                   "predictions": {seq_id: ...}} for one batch of sequences
+#   trailer frame: {"stream": "trailer", "n_batches": <number of batch frames>},
+#                  plus any response metadata (e.g. "cache" hit/miss counts)
+# An error message (e.g. "prediction_request_failed") may replace any frame
+# and ends the stream.
+STREAM_KEY = "stream"
+
+# Keys of Predictor error messages
+ERROR_KEYS = ["bad_prediction_request", "prediction_request_failed", "server_error"]
+
+# Streamed requests (`"request_streaming": true`)
+# The Evaluator sends its request as:
+#   header frame:  the request with "sequences": {} and "request_streaming": true
+#   batch frames:  {"stream": "batch", "sequences": {seq_id: sequence}} (optionally
+#                  with the "prediction_ranges" of those sequences)
+#   trailer frame: {"stream": "trailer", "n_batches": <number of batch frames>}
+# The Predictor predicts each batch as it arrives and answers with one return
+# message, or with a streamed response if "response_streaming" is also true.
+# Only Predictors whose help message sets "request_streaming": true accept it
+# (see `request_help`); an error reply may arrive before the trailer is sent.
+# Batches received ahead of the one being predicted
+REQUEST_PREFETCH = 2
+
+def recv_exact_into(sock, view):
+    """
+    Fill a writable buffer with exactly len(view) bytes from the socket.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        view (memoryview): Writable buffer to fill in place.
+
+    Returns:
+        int: Number of bytes received. Only less than len(view) if the peer
+             closed the connection before sending anything (returns 0).
+
+    Raises:
+        ConnectionError: If the peer closed the connection part way through.
+    """
+    total = len(view)
+    received = 0
+    while received < total:
+        n_bytes = sock.recv_into(view[received:], min(total - received, BUFFER_SIZE))
+        if n_bytes == 0:
+            if received == 0:
+                return 0
+            raise ConnectionError(f"Connection closed after {received} of {total} bytes.")
+        received += n_bytes
+    return received
+
+def recv_frame_length(sock):
+    """
+    Receive and decode the length prefix of the next frame.
+
+    Args:
+        sock (socket.socket): Connected socket.
+
+    Returns:
+        int or None: Announced frame length in bytes, or None if the peer
+                     closed the connection before a new frame started.
+    """
+    header = bytearray(struct.calcsize(LENGTH_FORMAT))
+    if recv_exact_into(sock, memoryview(header)) == 0:
+        return None
+    msglen = struct.unpack(LENGTH_FORMAT, header)[0]
+
+    if msglen == LONG_LENGTH_ESCAPE:
+        # Version 2 frame with an 8-byte length
+        long_header = bytearray(struct.calcsize(LONG_LENGTH_FORMAT))
+        if recv_exact_into(sock, memoryview(long_header)) == 0:
+            raise ConnectionError("Connection closed inside a frame header.")
+        msglen = struct.unpack(LONG_LENGTH_FORMAT, long_header)[0]
+
+    return msglen
+
+def recv_frame(sock, desc="Receiving message"):
+    """
+    Receive one length-prefixed frame into a single preallocated buffer.
+
+    The announced length is used to allocate the buffer once, which is then
+    filled in place with `recv_into`, so receiving is linear in the message
+    size and never holds more than one copy of the payload.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        desc (str): Progress bar description.
+
+    Returns:
+        bytearray or None: Frame payload, or None if the peer closed the
+                           connection before a new frame started.
+
+    Raises:
+        ConnectionError: If the peer closed the connection part way through.
+    """
+    msglen = recv_frame_length(sock)
+    if msglen is None:
+        return None
+    print(f"Expecting {msglen} bytes of data.")
+
+    payload = bytearray(msglen)
+    view = memoryview(payload)
+    received = 0
+    with tqdm.tqdm(total=msglen, unit="B", desc=desc,
+                   unit_scale=True, unit_divisor=1024) as progress:
+        while received < msglen:
+            n_bytes = sock.recv_into(view[received:], min(msglen - received, BUFFER_SIZE))
+            if n_bytes == 0:
+                raise ConnectionError(f"Connection closed after {received} of {msglen} bytes.")
+            received += n_bytes
+            progress.update(n_bytes)
+    return payload
+
+def send_frame(sock, payload):
+    """
+    Length prefix and send one frame, using the 8-byte length only when needed.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        payload (bytes-like): Frame payload.
+    """
+    send_frame_parts(sock, [payload])
+
+def send_frame_parts(sock, parts):
+    """
+    Send several buffers as the payload of a single frame without joining them.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        parts (list of bytes-like): Buffers that make up the frame payload, in order.
+    """
+    parts = [memoryview(part).cast('B') for part in parts]
+    msglen = sum(part.nbytes for part in parts)
+    if msglen < LONG_LENGTH_ESCAPE:
+        header = struct.pack(LENGTH_FORMAT, msglen)
+    else:
+        header = struct.pack(LENGTH_FORMAT, LONG_LENGTH_ESCAPE) + struct.pack(LONG_LENGTH_FORMAT, msglen)
+    sock.sendall(header)
+    for part in parts:
+        sock.sendall(part)
+
+def json_default(obj):
+    """
+    `json.dumps` fallback that converts numpy arrays and scalars to Python types.
+    """
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def pack_tensors(message, tensors=None):
+    """
+    Replace every numpy array in a message by a {"__tensor__": i} reference.
+
+    Zero-dimensional arrays and numpy scalars are converted to Python numbers.
+
+    Args:
+        message (dict, list or value): JSON-like message that may contain arrays.
+        tensors (list): List the arrays are appended to (created if None).
+
+    Returns:
+        tuple: (packed message, list of np.ndarray) where the i-th array is
+               referenced by {"__tensor__": i}.
+    """
+    if tensors is None:
+        tensors = []
+    if isinstance(message, np.ndarray) and message.ndim > 0:
+        tensors.append(message)
+        return {TENSOR_KEY: len(tensors) - 1}, tensors
+    if isinstance(message, (np.ndarray, np.generic)):
+        return message.item(), tensors
+    if isinstance(message, dict):
+        return {key: pack_tensors(value, tensors)[0] for key, value in message.items()}, tensors
+    if isinstance(message, (list, tuple)):
+        return [pack_tensors(value, tensors)[0] for value in message], tensors
+    return message, tensors
+
+def unpack_tensors(message, tensors):
+    """
+    Inverse of `pack_tensors`: put the arrays back in place of their references.
+
+    Args:
+        message (dict, list or value): Packed message.
+        tensors (list or mapping): Arrays indexed by their reference number.
+
+    Returns:
+        dict, list or value: Message with numpy arrays in place of the references.
+    """
+    if isinstance(message, dict):
+        if len(message) == 1 and TENSOR_KEY in message:
+            return tensors[message[TENSOR_KEY]]
+        return {key: unpack_tensors(value, tensors) for key, value in message.items()}
+    if isinstance(message, list):
+        return [unpack_tensors(value, tensors) for value in message]
+    return message
+
+def _aligned(offset):
+    return -(-offset // TENSOR_ALIGNMENT) * TENSOR_ALIGNMENT
+
+def encode_binary_message(json_message):
+    """
+    Encode a message as a binary tensor payload.
+
+    Every array is shipped as its raw little-endian buffer, so a float16 track
+    costs 2 bytes per value instead of the ~10 bytes of its JSON text.
+
+    Args:
+        json_message (dict): Message whose predictions may be numpy arrays.
+
+    Returns:
+        list of bytes-like: Buffers that make up the payload (see `send_frame_parts`).
+    """
+    message, tensors = pack_tensors(json_message)
+    buffers = []
+    descriptors = []
+    offset = 0
+    for tensor in tensors:
+        tensor = np.ascontiguousarray(tensor)
+        tensor = tensor.astype(tensor.dtype.newbyteorder('<'), copy=False)
+        buffers.append(tensor)
+        descriptors.append({'dtype': tensor.dtype.str, 'shape': list(tensor.shape),
+                            'offset': offset, 'nbytes': tensor.nbytes})
+        offset = _aligned(offset + tensor.nbytes)
+
+    envelope = {'message': message, 'tensors': descriptors}
+    envelope_bytes = json.dumps(envelope, default=json_default).encode("utf-8")
+    # JSON allows trailing whitespace, so pad the envelope up to an aligned data section
+    header_length = len(BINARY_MAGIC) + struct.calcsize(BINARY_HEADER_FORMAT)
+    envelope_bytes += b' ' * (_aligned(header_length + len(envelope_bytes)) - header_length - len(envelope_bytes))
+
+    parts = [BINARY_MAGIC + struct.pack(BINARY_HEADER_FORMAT, len(envelope_bytes)), envelope_bytes]
+    position = 0
+    for descriptor, buffer in zip(descriptors, buffers):
+        if descriptor['offset'] > position:
+            parts.append(bytes(descriptor['offset'] - position))
+        parts.append(buffer)
+        position = descriptor['offset'] + descriptor['nbytes']
+    return parts
+
+def decode_message(payload):
+    """
+    Decode a received frame payload, whether it is JSON or a binary tensor payload.
+
+    Arrays of a binary payload are `np.frombuffer` views of the receive buffer,
+    so no prediction value is copied or parsed.
+
+    Args:
+        payload (bytes-like): Frame payload returned by `recv_frame`.
+
+    Returns:
+        dict: Decoded message; binary payloads contain numpy arrays.
+    """
+    if bytes(payload[:len(BINARY_MAGIC)]) != BINARY_MAGIC:
+        return json.loads(payload)
+
+    header_length = len(BINARY_MAGIC) + struct.calcsize(BINARY_HEADER_FORMAT)
+    envelope_length = struct.unpack_from(BINARY_HEADER_FORMAT, payload, len(BINARY_MAGIC))[0]
+    envelope = json.loads(bytes(memoryview(payload)[header_length:header_length + envelope_length]))
+    data_start = header_length + envelope_length
+    tensors = []
+    for descriptor in envelope['tensors']:
+        dtype = np.dtype(descriptor['dtype'])
+        tensor = np.frombuffer(payload, dtype=dtype, count=descriptor['nbytes'] // dtype.itemsize,
+                               offset=data_start + descriptor['offset'])
+        tensors.append(tensor.reshape(descriptor['shape']))
+    return unpack_tensors(envelope['message'], tensors)
+
+def save_message(message, output_file, **json_kwargs):
+    """
+    Save a decoded message as JSON, writing any numpy arrays to a side .npz file.
+
+    The arrays are stored as arr_0, arr_1, ... in `<output_file stem>.npz` and
+    referenced from the JSON by {"__tensor__": i}; the JSON gets a
+    "tensor_file" key naming the .npz. Messages without arrays are saved as
+    plain JSON.
+
+    Args:
+        message (dict): Decoded message (see `decode_message`).
+        output_file (str): Path of the JSON file to write.
+        **json_kwargs: Extra keyword arguments for `json.dump`.
+    """
+    envelope, tensors = pack_tensors(message)
+    if tensors:
+        tensor_file = os.path.splitext(output_file)[0] + ".npz"
+        np.savez(tensor_file, *tensors)
+        envelope['tensor_file'] = os.path.basename(tensor_file)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(envelope, f, **json_kwargs)
+
+def load_message(json_file):
+    """
+    Load a message saved with `save_message`, restoring its numpy arrays.
+
+    Args:
+        json_file (str): Path of the saved JSON file.
+
+    Returns:
+        dict: Message with numpy arrays in place of the tensor references.
+    """
+    with open(json_file, 'r', encoding='utf-8') as f:
+        envelope = json.load(f)
+    tensor_file = envelope.pop('tensor_file', None)
+    if tensor_file is None:
+        return envelope
+    with np.load(os.path.join(os.path.dirname(json_file), tensor_file)) as npz:
+        tensors = [npz[f"arr_{i}"] for i in range(len(npz.files))]
+    return unpack_tensors(envelope, tensors)
+
+def send_stream_header(sock, json_message, response_encoding="json"):
+    """
+    Send the header frame of a streamed response.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        json_message (dict): Return message; "predictions" are dropped from its prediction tasks.
+        response_encoding (str): One of RESPONSE_ENCODINGS.
+    """
+    header = dict(json_message)
+    header['prediction_tasks'] = [{key: value for key, value in task.items() if key != 'predictions'}
+                                  for task in json_message.get('prediction_tasks', [])]
+    header[STREAM_KEY] = "header"
+    send_message(sock, header, response_encoding)
+
+def send_stream_batch(sock, task_name, predictions, response_encoding="json"):
+    """
+    Send the predictions of one prediction task for one batch of sequences.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        task_name (str): Name of the prediction task.
+        predictions (dict): {seq_id: prediction} for the sequences in this batch.
+        response_encoding (str): One of RESPONSE_ENCODINGS.
+    """
+    send_message(sock, {STREAM_KEY: "batch", 'name': task_name, 'predictions': predictions},
+                 response_encoding)
+
+def send_stream_trailer(sock, n_batches, response_encoding="json", **metadata):
+    """
+    Send the trailer frame that ends a streamed response.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        n_batches (int): Number of batch frames that were sent.
+        response_encoding (str): One of RESPONSE_ENCODINGS.
+        **metadata: Extra response metadata added to the trailer (e.g. cache={...}).
+    """
+    send_message(sock, {STREAM_KEY: "trailer", 'n_batches': n_batches, **metadata},
+                 response_encoding)
+
+def recv_stream(sock, desc="Receiving message"):
+    """
+    Yield the frames following a stream header until the trailer is received.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        desc (str): Progress bar description.
+
+    Yields:
+        dict: Decoded batch frames, then the trailer (or an error message,
+              which ends the stream).
+
+    Raises:
+        ConnectionError: If the peer closed the connection before the trailer.
+    """
+    while True:
+        frame = recv_message(sock, desc=desc)
+        if frame is None:
+            raise ConnectionError("Connection closed before the end of the streamed response.")
+        yield frame
+        if frame.get(STREAM_KEY) != "batch":
+            return
+
+def discard_stream_request(sock, header, desc="Discarding sequences"):
+    """
+    Receive and drop the sequence batches of a streamed request up to its trailer.
+
+    A Predictor that rejects a request from its header calls this before
+    sending the error, so the next frame it reads is the next request and not
+    a batch of the rejected one. Does nothing if `header` is not streamed.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        header (dict): Request header that was rejected.
+        desc (str): Progress bar description.
+
+    Returns:
+        int: Number of batch frames dropped.
+
+    Raises:
+        ConnectionError: If the peer closed the connection before the trailer.
+    """
+    if not header.get('request_streaming', False):
+        return 0
+    n_batches = 0
+    for frame in recv_stream(sock, desc=desc):
+        if frame.get(STREAM_KEY) == "batch":
+            n_batches += 1
+    return n_batches
+
+def send_stream_request(sock, header, sequence_items, batch_size, desc="Sending sequences",
+                        stop_event=None):
+    """
+    Send a request as a header frame followed by batches of sequences and a trailer.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        header (dict): Request without "sequences".
+        sequence_items (iterable): (seq_id, sequence) pairs, e.g. zip(ids, sequences).
+        batch_size (int): Number of sequences per batch frame.
+        desc (str): Progress bar description.
+        stop_event (threading.Event, optional): When set, no further frames
+            (batches or trailer) are sent.
+
+    Returns:
+        int: Number of batch frames sent.
+    """
+    header = dict(header, sequences={}, request_streaming=True)
+    send_json(sock, header)
+    n_batches = 0
+    batch = {}
+    with tqdm.tqdm(desc=desc, unit="sequence") as progress:
+        for seq_id, sequence in sequence_items:
+            if stop_event is not None and stop_event.is_set():
+                return n_batches
+            batch[seq_id] = sequence
+            if len(batch) == batch_size:
+                send_json(sock, {STREAM_KEY: "batch", 'sequences': batch})
+                progress.update(len(batch))
+                n_batches += 1
+                batch = {}
+        if stop_event is not None and stop_event.is_set():
+            return n_batches
+        if batch:
+            send_json(sock, {STREAM_KEY: "batch", 'sequences': batch})
+            progress.update(len(batch))
+            n_batches += 1
+    send_json(sock, {STREAM_KEY: "trailer", 'n_batches': n_batches})
+    return n_batches
+
+def start_stream_request(sock, header, sequence_items, batch_size, desc="Sending sequences"):
+    """
+    Run `send_stream_request` in a background thread.
+
+    Sending from a thread lets the caller receive a streamed response while
+    the request is still being sent, so neither side blocks the other.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        header (dict): Request without "sequences".
+        sequence_items (iterable): (seq_id, sequence) pairs.
+        batch_size (int): Number of sequences per batch frame.
+        desc (str): Progress bar description.
+
+    Returns:
+        threading.Thread: Started sender thread; join it after receiving the response,
+            or call `stop_stream_request` if the response is an error.
+    """
+    stop_event = threading.Event()
+
+    def send():
+        try:
+            send_stream_request(sock, header, sequence_items, batch_size, desc=desc,
+                                stop_event=stop_event)
+        except socket.error as e:
+            if not stop_event.is_set():
+                print("server_error: Error sending streamed request: %s" % e)
+
+    sender = threading.Thread(target=send, daemon=True)
+    sender.stop_event = stop_event
+    sender.start()
+    return sender
+
+def stop_stream_request(sender):
+    """
+    Stop a sender thread of `start_stream_request` and wait for it to finish.
+
+    The sender stops before its next frame, so call this when the Predictor
+    answered with an error before the whole request was sent.
+
+    Args:
+        sender (threading.Thread): Thread returned by `start_stream_request`.
+    """
+    sender.stop_event.set()
+    sender.join()
+
+def request_help(sock):
+    """
+    Ask a Predictor for its help message on an open connection.
+
+    Args:
+        sock (socket.socket): Connected socket.
+
+    Returns:
+        dict or None: Help message, or None if the Predictor closed the connection.
+    """
+    send_json(sock, {'request': "help"})
+    return recv_message(sock, desc="Receiving Predictor help")
+
+def supports_request_streaming(predictor_help):
+    """
+    Returns:
+        bool: True if a Predictor help message advertises streamed requests
+            (`"request_streaming": true`).
+    """
+    return isinstance(predictor_help, dict) and predictor_help.get('request_streaming') is True
+
+def iter_stream_prefetch(sock, max_prefetch=REQUEST_PREFETCH, desc="Receiving message"):
+    """
+    Like `recv_stream`, but receive and decode frames in a background thread.
+
+    Up to `max_prefetch` frames are received ahead of the consumer, so the
+    network transfer of the next batch overlaps with predicting the current
+    one. Iterate until the end so the socket stays in sync for the next message.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        max_prefetch (int): Maximum number of frames waiting to be consumed.
+        desc (str): Progress bar description.
+
+    Yields:
+        dict: Decoded batch frames, then the trailer (or an error message).
+
+    Raises:
+        ConnectionError: If the peer closed the connection before the trailer.
+    """
+    frames = queue.Queue(maxsize=max_prefetch)
+
+    def receive():
+        try:
+            for frame in recv_stream(sock, desc=desc):
+                frames.put(frame)
+        except (ConnectionError, socket.error) as e:
+            frames.put(e)
+
+    receiver = threading.Thread(target=receive, daemon=True)
+    receiver.start()
+    while True:
+        frame = frames.get()
+        if isinstance(frame, Exception):
+            raise frame
+        yield frame
+        if frame.get(STREAM_KEY) != "batch":
+            break
+    receiver.join()
+
+def save_stream(sock, header, output_file, desc="Receiving message"):
+    """
+    Receive a streamed response and write it to disk one frame at a time.
+
+    Frames are written as JSON Lines to `<output_file stem>.jsonl`, starting
+    with the header. Arrays of each batch are written to
+    `<output_file stem>_batch<i>.npz` (see `save_message`), so the full
+    response is never held in memory.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        header (dict): Header frame that started the stream.
+        output_file (str): Path the response would have been saved to as JSON.
+        desc (str): Progress bar description.
+
+    Returns:
+        tuple: (path of the .jsonl file, last frame received: the trailer or an error message)
+    """
+    stem = os.path.splitext(output_file)[0]
+    stream_file = stem + ".jsonl"
+    n_batches = 0
+    with open(stream_file, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(header, default=json_default) + "\n")
+        for frame in recv_stream(sock, desc=desc):
+            envelope, tensors = pack_tensors(frame)
+            if tensors:
+                tensor_file = f"{stem}_batch{n_batches}.npz"
+                np.savez(tensor_file, *tensors)
+                envelope['tensor_file'] = os.path.basename(tensor_file)
+            f.write(json.dumps(envelope) + "\n")
+            f.flush()
+            if frame.get(STREAM_KEY) == "batch":
+                n_batches += 1
+    return stream_file, frame
+
+def load_stream(stream_file):
+    """
+    Reassemble a response saved with `save_stream` into one return message.
+
+    Args:
+        stream_file (str): Path of the saved .jsonl file.
+
+    Returns:
+        dict: Return message with the predictions of every batch merged into
+              their prediction tasks, or the error message that ended the stream.
+    """
+    stream_dir = os.path.dirname(stream_file)
+    with open(stream_file, 'r', encoding='utf-8') as f:
+        json_message = json.loads(f.readline())
+        json_message.pop(STREAM_KEY, None)
+        tasks = {task['name']: task for task in json_message['prediction_tasks']}
+        for task in tasks.values():
+            task['predictions'] = {}
+        for line in f:
+            frame = json.loads(line)
+            tensor_file = frame.pop('tensor_file', None)
+            if tensor_file is not None:
+                with np.load(os.path.join(stream_dir, tensor_file)) as npz:
+                    frame = unpack_tensors(frame, [npz[f"arr_{i}"] for i in range(len(npz.files))])
+            if frame.get(STREAM_KEY) == "batch":
+                tasks[frame['name']]['predictions'].update(frame['predictions'])
+            elif frame.get(STREAM_KEY) != "trailer":
+                return frame
+    return json_message
+
+def recv_json(sock, desc="Receiving message"):
+    """
+    Receive one frame and parse it as JSON directly from the receive buffer.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        desc (str): Progress bar description.
+
+    Returns:
+        dict or None: Parsed message, or None if the peer closed the connection.
+    """
+    payload = recv_frame(sock, desc=desc)
+    if payload is None:
+        return None
+    return json.loads(payload)
+
+def recv_message(sock, desc="Receiving message"):
+    """
+    Receive one frame and decode it as JSON or as a binary tensor payload.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        desc (str): Progress bar description.
+
+    Returns:
+        dict or None: Decoded message, or None if the peer closed the connection.
+    """
+    payload = recv_frame(sock, desc=desc)
+    if payload is None:
+        return None
+    return decode_message(payload)
+
+def send_json(sock, json_message):
+    """
+    Serialize a JSON object as UTF-8 and send it as one frame.
+
+    Numpy arrays in the message are sent as JSON lists.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        json_message (dict): Message to send.
+    """
+    send_frame(sock, json.dumps(json_message, default=json_default).encode("utf-8"))
+
+def send_binary(sock, json_message):
+    """
+    Send a message as one binary tensor payload frame.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        json_message (dict): Message whose predictions may be numpy arrays.
+    """
+    send_frame_parts(sock, encode_binary_message(json_message))
+
+def send_message(sock, json_message, response_encoding="json"):
+    """
+    Send a message with the encoding requested by the Evaluator.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        json_message (dict): Message to send.
+        response_encoding (str): One of RESPONSE_ENCODINGS.
+    """
+    if response_encoding == "binary":
+        send_binary(sock, json_message)
+    else:
+        send_json(sock, json_message)
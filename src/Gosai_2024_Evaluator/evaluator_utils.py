@@ -2,16 +2,15 @@ import json
 import pandas as pd
 from collections import Counter
 
-def create_json(input_data):
+def create_request_header():
     """
-    Parses a pandas DataFrame to create a JSON object to be sent to a Predictor.
-    
-    Args:
-        input_data: pandas DataFrame with DNA sequences.
-            Expected to have columns 'IDs' and 'sequence'.
-    
+    Creates the Evaluator request without its sequences.
+
+    Used on its own for streamed requests, where the sequences follow in
+    batches (see tcp_framing_utils.send_stream_request).
+
     Returns:
-        str: JSON string in API format.
+        dict: Request in API format without the "sequences" key.
     """
     # These parameters are decided based on the sequence dataset.
     json_evaluator = {
@@ -31,6 +30,21 @@ def create_json(input_data):
     # json_evaluator["upstream_seq"] = ["ATGCTT"]
     # json_evaluator["downstream_seq"] = ["GATCA"]
 
+    return json_evaluator
+
+def create_json(input_data):
+    """
+    Parses a pandas DataFrame to create a JSON object to be sent to a Predictor.
+    
+    Args:
+        input_data: pandas DataFrame with DNA sequences.
+            Expected to have columns 'IDs' and 'sequence'.
+    
+    Returns:
+        str: JSON string in API format.
+    """
+    json_evaluator = create_request_header()
+
     # Build the sequences dictionary from the DataFrame
     sequences = dict(zip(input_data.IDs, input_data.sequence))
     json_evaluator["sequences"] = sequences
@@ -42,6 +56,30 @@ def create_json(input_data):
 
     return json_string
 
+def unique_id_mask(seq_ids):
+    """
+    Flags the sequences to stream to a Predictor when sequence IDs are duplicated.
+
+    Streamed requests never build the "sequences" object, so duplicate IDs are
+    resolved here the same way `dict(zip(ids, sequences))` resolves them: the
+    last occurrence of an ID is kept.
+
+    Args:
+        seq_ids (pandas.Series): Sequence IDs.
+
+    Returns:
+        pandas.Series: Boolean mask of the rows to keep.
+    """
+    counts = seq_ids.value_counts()
+    duplicates = counts[counts > 1]
+    if len(duplicates):
+        print("Duplicate keys found (keeping the last occurrence):")
+        for key, count in duplicates.items():
+            print(f"Key: {key}, Count: {count}")
+    else:
+        print("No duplicates found.")
+    return ~seq_ids.duplicated(keep='last')
+
 # Function to check for duplicate keys in the JSON file
 # UPDATED FROM PREVIOUS EVALUATORS -- takes JSON string instead of file path
 # to support all input format types.
@@ -5,11 +5,11 @@ import sys
 import json
 import time
 import tqdm
-import struct
 import socket
 import pandas as pd
 
 from evaluator_utils import *
+from tcp_framing_utils import *
 
 # Get the absolute path of the script's directory
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -29,8 +29,12 @@ EVALUATOR_INPUT_PATH = os.path.join(EVALUATOR_DATA_DIR, input_txt)
 
 output_json_filename = f"gosai_mpra_predictions_{input_txt.replace(".txt", "")}.json"
 
-# Set buffer size for TCP
-BUFFER_SIZE = 65536
+# Send the sequences to the Predictor in batches after a request header instead
+# of one JSON message, so the Predictor can start predicting while they arrive.
+# Only used if the Predictor's help message advertises "request_streaming": true
+REQUEST_STREAMING = False
+REQUEST_BATCH_SIZE = 4096
+
 
 # Debug logs for validation
 print(f"Using input file: {EVALUATOR_INPUT_PATH}")
@@ -88,107 +92,102 @@ def run_evaluator():
                 print(f"Tried connecting {attempt} times. Exceeded maximum number of retries. Exiting...")
                 sys.exit(1)
 
-    try:
-        # Load in JSON file from evalutor_data if connection to Predictor container was successful
-        # Create JSON string from input file since it is not in JSON format already
+    sender = None
+    request_streaming = False
+    if REQUEST_STREAMING:
+        # Ask the Predictor first: others would read the batch frames as new requests
+        try:
+            predictor_help = request_help(connection)
+        except (ConnectionError, socket.error) as e:
+            print ("server_error: Error requesting Predictor help: %s" % e)
+            sys.exit(1)
+        if predictor_help is None:
+            print("Predictor closed the connection after the help request. Exiting...")
+            sys.exit(1)
+        request_streaming = supports_request_streaming(predictor_help)
+        if not request_streaming:
+            print("Predictor does not support request streaming; sending one request message")
+
+    if request_streaming:
+        # Stream the sequences straight from the input file: no request JSON is built
         df = pd.read_csv(EVALUATOR_INPUT_PATH, delimiter='\t')
-        evaluator_json_str = create_json(df)
+        keep = unique_id_mask(df.IDs)
+        sender = start_stream_request(connection, create_request_header(),
+                                      zip(df.IDs[keep], df.sequence[keep]), REQUEST_BATCH_SIZE)
+    else:
+        try:
+            # Load in JSON file from evalutor_data if connection to Predictor container was successful
+            # Create JSON string from input file since it is not in JSON format already
+            df = pd.read_csv(EVALUATOR_INPUT_PATH, delimiter='\t')
+            evaluator_json_str = create_json(df)
                 
-        # Check for duplicate keys in the generated JSON string.
-        # Use the helper function that accepts a JSON string.
-        jsonResult_dict = check_duplicates_from_string(evaluator_json_str)
-        if jsonResult_dict is None:
-            sys.exit(1)
+            # Check for duplicate keys in the generated JSON string.
+            # Use the helper function that accepts a JSON string.
+            jsonResult_dict = check_duplicates_from_string(evaluator_json_str)
+            if jsonResult_dict is None:
+                sys.exit(1)
         
-        # Convert the validated JSON dictionary back to a JSON string for transmission.    
-        jsonResult = json.dumps(jsonResult_dict)
-    except json.JSONDecodeError as e:
-        print("Invalid JSON syntax:", e)
-
-    # first send the total bytes we are transmitting to the Predictor
-    # This is used to stop the recv() process
-    # send the evaluator json to the predictor server
-    try:
-        # Length prefixing
-        # Send Evaluator JSON length as a 4-byte integer
-        jsonResult_bytes = jsonResult.encode("utf-8")
-        jsonResults_total_bytes = len(jsonResult_bytes)
-
-        connection.sendall(struct.pack('>I', jsonResults_total_bytes))
-        print(f"Sent evaluator request length {jsonResults_total_bytes} bytes")
-
-        connection.sendall(jsonResult_bytes)
+            # Convert the validated JSON dictionary back to a JSON string for transmission.    
+            jsonResult = json.dumps(jsonResult_dict)
+        except json.JSONDecodeError as e:
+            print("Invalid JSON syntax:", e)
+
+        # first send the total bytes we are transmitting to the Predictor
+        # This is used to stop the recv() process
+        # send the evaluator json to the predictor server
+        try:
+            # Length prefixing (4-byte length, or 8-byte length for frames of 4 GiB or more)
+            jsonResult_bytes = jsonResult.encode("utf-8")
+            send_frame(connection, jsonResult_bytes)
+            print(f"Sent evaluator request of {len(jsonResult_bytes)} bytes")
 
-    except socket.error as e:
-        print ("server_error: Error sending evaluator_file: %s" % e)
-        sys.exit(1)
+        except socket.error as e:
+            print ("server_error: Error sending evaluator_file: %s" % e)
+            sys.exit(1)
 
 # ---------------------- %%%%%%%---------------
     # receive message from the server
-    json_data_recv = b''
-    while True:
-        # Before receiving JSON from Predictor
-        # Receive length of the incoming JSON message (4-byte integer)
-        # Can change to 8-byte integer by changing .recv(4) to .recv(8)
-        # and replacing format string '>I' to '>Q'
-        # Step 1
-        try:
-            msg_length = connection.recv(4)
-            if not msg_length:
-                print("Failed to receive message length. Closing connection.")
-                connection.close()
-                break # Exit the loop if no message length is received
-
-            # Unpack message length from 4 bytes
-            msglen = struct.unpack('>I', msg_length)[0]
-            print(f"Expecting {msglen} bytes of data from the Predictor.")
-            # Can comment out print commands other than for errors
-            
-            # Initialize the progress bar
-            progress = tqdm.tqdm(range(msglen), unit="B", 
-                                 desc="Receiving Predictor Response",
-                                 unit_scale=True)
-
-            #Step 2
-            # Now we want to receive the actual JSON in packets
-            
-            while len(json_data_recv) < msglen:
-                packet = connection.recv(BUFFER_SIZE)
-                if not packet:
-                    print("Connection closed unexpectedly.")
-                    break
-                json_data_recv += packet
-                progress.update(len(packet))
-                #print(f"Received packet of {len(packet)} bytes, total received: {len(data)} bytes")
-           
-            # Close the progress bar when done
-            progress.close()
-            
-            # Decode and display the received data if all of it is received
-            if len(json_data_recv) == msglen:
-                print("Predictor return received completely!")
-                break
-            else:
-                print("Data received was incomplete or corrupted.")
-                break
+    # The announced length is used to receive the JSON into one preallocated buffer
+    try:
+        json_data_recv = recv_frame(connection, desc="Receiving Predictor Response")
+    except (ConnectionError, socket.error) as e:
+        print ("server_error: Error receiving predictions: %s" % e)
+        if sender is not None:
+            stop_stream_request(sender)
+        sys.exit(1)
 
+    if json_data_recv is None:
+        print("Failed to receive message length. Closing connection.")
+        if sender is not None:
+            stop_stream_request(sender)
+        connection.close()
+        sys.exit(1)
+    print("Predictor return received completely!")
 
-        except socket.error as e:
-            print ("server_error: Error receiving predictions: %s" % e)
-            sys.exit(1)
+    # Parse Predictor response
+    try:
+        # Parse straight from the receive buffer
+        predictor_json = json.loads(json_data_recv)
+    except json.JSONDecodeError as e:
+        predictor_json = None
+        print(f"Invalid JSON in Predictor response: {e}")
+    if sender is not None:
+        # An error reply can arrive before the whole request was sent: stop sending
+        if predictor_json is None or any(key in predictor_json for key in ERROR_KEYS):
+            stop_stream_request(sender)
+        else:
+            sender.join()
+    if predictor_json is None:
+        sys.exit(1)
 
-    # Parse and save Predictor response
+    # Save Predictor response
     try:
-        predictor_response_full = json_data_recv
-        predictor_json = predictor_response_full.decode("utf-8")
-        predictor_json = json.loads(predictor_json)
-        
         output_file = RETURN_FILE_PATH
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(predictor_json, f, ensure_ascii=False, indent=4, separators=(",", ": ")) # // ADDED separators
         print(f"Predictions saved to {output_file}")
         
-    except (json.JSONDecodeError, IOError) as e:
+    except IOError as e:
         print(f"Error saving predictions: {e}")
         sys.exit(1)
 
@@ -0,0 +1,82 @@
+# test_stream_error_recovery.py
+"""
+Check that a Predictor keeps serving a connection after rejecting a streamed request.
+
+Sends a streamed request whose header is invalid (an unknown response_encoding),
+followed by its sequence batches and trailer, and then a valid request on the
+same socket. The Predictor must answer the first request with an error and the
+second one with predictions for every sequence.
+
+Usage (with a Predictor that advertises "request_streaming": true, e.g. DREAM-RNN):
+    apptainer run -B /path_to/Gosai_2024_Evaluator/ gosai_evaluator.sif test_stream_error_recovery.py HOST PORT
+"""
+import sys
+import random
+import socket
+
+from tcp_framing_utils import *
+
+N_SEQUENCES = 10
+SEQUENCE_LENGTH = 200
+BATCH_SIZE = 4
+
+def create_request_header():
+    """Streamed request header with the Gosai 2024 prediction task."""
+    json_evaluator = {'request': 'predict', 'readout': 'point'}
+    json_evaluator['prediction_tasks'] = [{'name': 'gosai_synthetic_sequences', 'type': 'expression', 'cell_type': 'K562', 'scale': 'linear', 'species': 'homo_sapiens'}]
+    return json_evaluator
+
+def check_stream_error_recovery(host, port):
+    """
+    Returns:
+        list: Failed checks (empty if the Predictor recovered).
+    """
+    random.seed(0)
+    sequences = {f"seq_{i}": "".join(random.choice("ACGT") for _ in range(SEQUENCE_LENGTH))
+                 for i in range(N_SEQUENCES)}
+    failures = []
+
+    connection = socket.create_connection((host, port))
+    try:
+        if not supports_request_streaming(request_help(connection)):
+            return ["Predictor does not advertise request streaming"]
+
+        # Rejected from its header: every batch and the trailer must be dropped
+        bad_header = dict(create_request_header(), response_encoding="xml")
+        n_batches = send_stream_request(connection, bad_header, sequences.items(), BATCH_SIZE)
+        print(f"Sent a bad streamed request with {n_batches} batches")
+        reply = recv_message(connection, desc="Receiving Predictor error")
+        if reply is None:
+            return ["Predictor closed the connection instead of answering the bad request"]
+        if not any(reply.get(key) for key in ERROR_KEYS):
+            failures.append(f"Bad streamed request was not rejected: {sorted(reply)}")
+
+        # The next frame the Predictor reads must be this request, not a leftover batch
+        send_json(connection, dict(create_request_header(), sequences=sequences))
+        reply = recv_message(connection, desc="Receiving Predictor predictions")
+        if reply is None:
+            return failures + ["Predictor closed the connection instead of answering the valid request"]
+        errors = {key: reply[key] for key in ERROR_KEYS if reply.get(key)}
+        if errors:
+            failures.append(f"Valid request after the bad one failed: {errors}")
+        for prediction_task in reply.get('prediction_tasks', []):
+            missing = set(sequences) - set(prediction_task.get('predictions', {}))
+            if missing:
+                failures.append(f"Task {prediction_task['name']} is missing {len(missing)} predictions")
+        if not errors and not reply.get('prediction_tasks'):
+            failures.append("Valid request after the bad one returned no prediction tasks")
+    except (ConnectionError, socket.error) as e:
+        failures.append(f"Connection to the Predictor failed: {e}")
+    finally:
+        connection.close()
+    return failures
+
+if __name__ == "__main__":
+    host = sys.argv[1]
+    port = int(sys.argv[2])
+    failures = check_stream_error_recovery(host, port)
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if failures:
+        sys.exit(1)
+    print("Predictor recovered from the rejected streamed request")
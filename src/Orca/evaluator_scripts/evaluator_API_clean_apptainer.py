@@ -1,13 +1,16 @@
 # evaluator_API_clean_apptainer.py
 import os
+import re
 import sys
 import json
-import tqdm
-import struct
 import socket
 
+import hashlib
 from collections import Counter
 
+from tcp_framing_utils import *
+from interaction_matrix_utils import *
+
 import numpy as np
 from seqstr import seqstr
 ############# get target for orca
@@ -20,7 +23,6 @@ import orca_predict
 orca_predict.load_resources(models=['1M'], use_cuda=USE_CUDA)
 
 from orca_predict import h1esc_1m, hff_1m, target_h1esc_1m, target_hff_1m
-from scipy.stats import pearsonr
 ############# get target for orca
 
 # Get the absolute path of the script's directory
@@ -29,6 +31,34 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 # Define the input JSON file name
 input_json = "evaluator_message_orca_2seqs.json"
 
+# Ask the Predictor for raw prediction buffers instead of JSON lists
+# (unless the input JSON sets "response_encoding" itself)
+RESPONSE_ENCODING = "binary"
+
+# Send genomic intervals (a few bytes each) for the Predictor to fetch from its own
+# reference genome, instead of fetching 1 Mb sequences here and sending them
+SEND_COORDINATES = True
+GENOME_ASSEMBLY = "hg38"
+
+# Ask for the upper triangle of each symmetric interaction matrix as float16
+# (unless the input JSON sets "interaction_matrix_encoding" itself; see interaction_matrix_utils)
+INTERACTION_MATRIX_ENCODING = "upper_triangle"
+
+# Model and ground-truth target of each cell type the Orca Predictor reports in `cell_type_actual`
+ORCA_TARGETS = {"H1-ESC": (h1esc_1m, target_h1esc_1m), "HFF": (hff_1m, target_hff_1m)}
+# Reported cell types (lower case, letters and digits only) of each target, as in the
+# Orca Predictor's `orca_cell_type`; any other cell type is compared with H1-ESC
+CELL_TYPE_ALIASES = {"h1esc": "H1-ESC", "h1": "H1-ESC", "hesc": "H1-ESC",
+                     "hff": "HFF", "hffc6": "HFF"}
+DEFAULT_CELL_TYPE = "H1-ESC"
+
+# Binned and normalized ground-truth targets are cached here across runs, one .npy per
+# (target, cooler file, locus, level); defaults to `orca_target_cache` in the output
+# directory, set to an empty string to disable
+TARGET_CACHE_DIR = os.environ.get("ORCA_TARGET_CACHE_DIR")
+# Loci whose raw 1000x1000 targets are fetched and binned at once (~8 MB each)
+TARGET_CHUNK_SIZE = 32
+
 # Determine if running inside a container or not
 if os.path.exists("/.singularity.d"):
     # Running inside the container
@@ -54,8 +84,6 @@ if not os.path.exists(output_dir):
     print(f"Error: Output directory '{output_dir}' does not exist.")
     sys.exit(1)
     
-# Set buffer size for TCP
-BUFFER_SIZE = 65536
 
 # Debug logs for validation
 print(f"Using input JSON: {EVALUATOR_INPUT_PATH}")
@@ -140,6 +168,130 @@ def check_duplicates(json_file_path):
         print(f"Invalid JSON in file '{json_file_path}': {e}")
         return None
 
+def orca_cell_type(cell_type):
+    """
+    Cell type of the target (key of ORCA_TARGETS) to compare a prediction task with.
+
+    Args:
+        cell_type (str): `cell_type_actual` reported by the Predictor (may be missing).
+
+    Returns:
+        str: Key of ORCA_TARGETS; DEFAULT_CELL_TYPE for unknown cell types.
+    """
+    key = re.sub(r'[^0-9a-z]', '', str(cell_type).lower())
+    if key not in CELL_TYPE_ALIASES:
+        print(f"No target for cell type '{cell_type}', comparing with {DEFAULT_CELL_TYPE}")
+        return DEFAULT_CELL_TYPE
+    return CELL_TYPE_ALIASES[key]
+
+def target_cache_key(target_name, target, locus, level):
+    """
+    Cache key of the binned and normalized target of one locus.
+
+    Args:
+        target_name (str): Name of the target, e.g. its cell type in ORCA_TARGETS.
+        target: Orca target (e.g. `target_h1esc_1m`); its cooler files are part of the key.
+        locus (tuple): (chrom, start, end).
+        level (int): Number of 1 kb target bins averaged per output bin.
+
+    Returns:
+        str: Hex SHA-256 digest.
+
+    Raises:
+        ValueError: If the target does not list its cooler files (`input_paths`).
+    """
+    cooler_files = getattr(target, 'input_paths', None) or getattr(target, 'input_path', None)
+    if not cooler_files:
+        raise ValueError(f"Target '{target_name}' has no cooler files (input_paths) to key its cache on")
+    return hashlib.sha256(f"{target_name}|{cooler_files}|{locus}|{level}".encode()).hexdigest()
+
+def orca_targets(loci, target_name, target, model, cache_dir=None, level=4, n_bins=250,
+                 chunk_size=TARGET_CHUNK_SIZE):
+    """
+    Binned, normalized log ground-truth targets of many loci.
+
+    Loci missing from the cache are fetched, binned and normalized as stacked
+    chunks of `chunk_size` loci, and each chunk is cached before the next one
+    is fetched, so only one chunk of raw targets is in memory.
+
+    Args:
+        loci (list): (chrom, start, end) loci.
+        target_name (str): Name of the target in the cache key (see `target_cache_key`).
+        target: Orca target, e.g. `target_h1esc_1m`.
+        model: Orca model providing `normmats` and `epss`, e.g. `h1esc_1m`.
+        cache_dir (str, optional): Directory of the target cache; None disables it.
+        level (int): 1 kb target bins averaged per output bin (4 for the 1M model).
+        n_bins (int): Output bins per side.
+        chunk_size (int): Loci fetched and binned at once.
+
+    Returns:
+        np.ndarray: (len(loci), n_bins, n_bins) targets, NaN where undefined.
+    """
+    targets = np.empty((len(loci), n_bins, n_bins), dtype=np.float32)
+    cache_files = [None] * len(loci)
+    missing = []
+    for i, locus in enumerate(loci):
+        if cache_dir:
+            cache_files[i] = os.path.join(cache_dir, f"{target_cache_key(target_name, target, locus, level)}.npy")
+            if os.path.exists(cache_files[i]):
+                targets[i] = np.load(cache_files[i])
+                continue
+        missing.append(i)
+    print(f"Targets: {len(loci) - len(missing)} cached, {len(missing)} to compute")
+    if not missing:
+        return targets
+
+    norm_level = 1 # 1M model only has level 1 normmats
+    epss = model.epss[norm_level]
+    normmat = np.asarray(model.normmats[norm_level])
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    for chunk_start in range(0, len(missing), max(1, chunk_size)):
+        chunk = missing[chunk_start:chunk_start + max(1, chunk_size)]
+        with warnings.catch_warnings(): # suppress runtime warning from printing to terminal
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            # 1m target resolution is 1k, bin and average them every 4k
+            raw = np.stack([target.get_feature_data(chrom, start, end)[:n_bins * level, :n_bins * level]
+                            for chrom, start, end in (loci[i] for i in chunk)])
+            binned = np.nanmean(np.nanmean(raw.reshape(len(chunk), n_bins, level, n_bins, level),
+                                           axis=4), axis=2)
+            del raw
+            targets[chunk] = np.log((binned + epss) / (normmat + epss))
+
+        if cache_dir:
+            for i in chunk:
+                # Write to a temporary file first so readers never see a partial file
+                tmp_file = f"{cache_files[i]}.{os.getpid()}.tmp"
+                with open(tmp_file, 'wb') as tmp_open:
+                    np.save(tmp_open, targets[i])
+                os.replace(tmp_file, cache_files[i])
+    return targets
+
+def masked_pearson(predictions, targets):
+    """
+    Pearson correlation of each prediction with its target over the finite target values.
+
+    Args:
+        predictions (np.ndarray): (n, ...) predictions.
+        targets (np.ndarray): (n, ...) targets, same shape, NaN/inf where undefined.
+
+    Returns:
+        np.ndarray: (n,) correlations (NaN if fewer than 2 valid values).
+    """
+    n = len(predictions)
+    x = np.asarray(predictions, dtype=np.float64).reshape(n, -1)
+    y = np.asarray(targets, dtype=np.float64).reshape(n, -1)
+    valid = np.isfinite(y)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    counts = valid.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dx = np.where(valid, x - (x.sum(axis=1) / counts)[:, None], 0.0)
+        dy = np.where(valid, y - (y.sum(axis=1) / counts)[:, None], 0.0)
+        corr = (dx * dy).sum(axis=1) / np.sqrt((dx * dx).sum(axis=1) * (dy * dy).sum(axis=1))
+    corr[counts < 2] = np.nan
+    return corr
+
 def run_evaluator():
     host = sys.argv[1]
     port = int(sys.argv[2])
@@ -180,23 +332,31 @@ def run_evaluator():
         if jsonResult is None:
             sys.exit(1)
         
-        # get sequence from seqstr
         seq_dict = jsonResult['sequences']
 
         seq_len = 1000000
-        retrieved_seqs = []
-        for key, val in seq_dict.items():
-            chr, coord = val
-            seqstr_input = f"[hg38]{chr}:{coord}-{coord+seq_len} +"
-            print(f"fetching sequence: {seqstr_input}")
-            seqstrout = seqstr(seqstr_input)
-            seq = seqstrout[0].Seq
-            if len(seq) == seq_len: # 1M model
-                retrieved_seqs.append(seq)
-            else:
-                print(f"Sequence length does not match {seq_len}!")
-    
-        jsonResult['retrieved_seqs'] = retrieved_seqs
+        if SEND_COORDINATES:
+            # [chromosome, start] -> [chromosome, start, end] intervals of the 1M model
+            jsonResult['genome_assembly'] = GENOME_ASSEMBLY
+            jsonResult['sequences'] = {key: [chr, coord, coord + seq_len]
+                                       for key, (chr, coord) in seq_dict.items()}
+        else:
+            # get sequence from seqstr
+            retrieved_seqs = []
+            for key, val in seq_dict.items():
+                chr, coord = val
+                seqstr_input = f"[{GENOME_ASSEMBLY}]{chr}:{coord}-{coord+seq_len} +"
+                print(f"fetching sequence: {seqstr_input}")
+                seqstrout = seqstr(seqstr_input)
+                seq = seqstrout[0].Seq
+                if len(seq) == seq_len: # 1M model
+                    retrieved_seqs.append(seq)
+                else:
+                    print(f"Sequence length does not match {seq_len}!")
+
+            jsonResult['retrieved_seqs'] = retrieved_seqs
+        jsonResult.setdefault('response_encoding', RESPONSE_ENCODING)
+        jsonResult.setdefault('interaction_matrix_encoding', INTERACTION_MATRIX_ENCODING)
         jsonResult = json.dumps(jsonResult)
     except json.JSONDecodeError as e:
         print("Invalid JSON syntax:", e)
@@ -205,15 +365,10 @@ def run_evaluator():
     # This is used to stop the recv() process
     # send the evaluator json to the predictor server
     try:
-        # Length prefixing
-        # Send Evaluator JSON length as a 4-byte integer
+        # Length prefixing (4-byte length, or 8-byte length for frames of 4 GiB or more)
         jsonResult_bytes = jsonResult.encode("utf-8")
-        jsonResults_total_bytes = len(jsonResult_bytes)
-
-        connection.sendall(struct.pack('>I', jsonResults_total_bytes))
-        print(f"Sent evaluator request length {jsonResults_total_bytes} bytes")
-
-        connection.sendall(jsonResult_bytes)
+        send_frame(connection, jsonResult_bytes)
+        print(f"Sent evaluator request of {len(jsonResult_bytes)} bytes")
 
     except socket.error as e:
         print ("server_error: Error sending evaluator_file: %s" % e)
@@ -221,95 +376,57 @@ def run_evaluator():
 
 # ---------------------- %%%%%%%---------------
     # receive message from the server
-    json_data_recv = b''
-    while True:
-        # Before receiving JSON from Predictor
-        # Receive length of the incoming JSON message (4-byte integer)
-        # Can change to 8-byte integer by changing .recv(4) to .recv(8)
-        # and replacing format string '>I' to '>Q'
-        # Step 1
-        try:
-            msg_length = connection.recv(4)
-            if not msg_length:
-                print("Failed to receive message length. Closing connection.")
-                connection.close()
-                break # Exit the loop if no message length is received
-
-            # Unpack message length from 4 bytes
-            msglen = struct.unpack('>I', msg_length)[0]
-            print(f"Expecting {msglen} bytes of data from the Predictor.")
-            # Can comment out print commands other than for errors
-            
-            # Initialize the progress bar
-            progress = tqdm.tqdm(range(msglen), unit="B", 
-                                 desc="Receiving Predictor Response",
-                                 unit_scale=True, unit_divisor=1024)
-
-            #Step 2
-            # Now we want to receive the actual JSON in packets
-            
-            while len(json_data_recv) < msglen:
-                packet = connection.recv(BUFFER_SIZE)
-                if not packet:
-                    print("Connection closed unexpectedly.")
-                    break
-                json_data_recv += packet
-                progress.update(len(packet))
-                #print(f"Received packet of {len(packet)} bytes, total received: {len(data)} bytes")
-           
-            # Close the progress bar when done
-            progress.close()
-            
-            # Decode and display the received data if all of it is received
-            if len(json_data_recv) == msglen:
-                print("Predictor return received completely!")
-                break
-            else:
-                print("Data received was incomplete or corrupted.")
-                break
-
-
-        except socket.error as e:
-            print ("server_error: Error receiving predictions: %s" % e)
-            sys.exit(1)
+    # The announced length is used to receive the JSON into one preallocated buffer
+    try:
+        json_data_recv = recv_frame(connection, desc="Receiving Predictor Response")
+    except (ConnectionError, socket.error) as e:
+        print ("server_error: Error receiving predictions: %s" % e)
+        sys.exit(1)
+
+    if json_data_recv is None:
+        print("Failed to receive message length. Closing connection.")
+        connection.close()
+        sys.exit(1)
+    print("Predictor return received completely!")
 
     # Parse and save Predictor response
     try:
-        predictor_response_full = json_data_recv
-        predictor_json = predictor_response_full.decode("utf-8")
-        predictor_json = json.loads(predictor_json)
+        # Parse straight from the receive buffer (JSON or binary tensor payload)
+        predictor_json = decode_message(json_data_recv)
 
 ############# calculate Pearson correlation between prediction and target
-        correlations = {}
-        model = h1esc_1m
-        for key, val in seq_dict.items():
-            chr, coord = val
-
-            with warnings.catch_warnings(): # suppress runtime warning from printing to terminal
-                warnings.simplefilter("ignore", category=RuntimeWarning)
-                target = target_h1esc_1m.get_feature_data(chr, coord, coord + seq_len)[None, :, :]
-                level = 4 # 1m target resolution is 1k, bin and average them every 4k
-                start = 0
-                target_r = np.nanmean(np.nanmean(np.reshape(target[:,start:start+250*level,start:start+250*level],(target.shape[0],250,level,250,level)),axis=4),axis=2)
-                level = 1 # 1M model only has level 1 normmats
-                target_np = np.log((target_r+model.epss[level])/(model.normmats[level]+model.epss[level]))[0, :, :]
-
-            valid = np.isfinite(target_np)
-            pred_arr = np.array(predictor_json['prediction_tasks'][0]['predictions'][key])
-
-            corr = pearsonr(pred_arr[valid], target_np[valid])[0]
-            correlations[key] = corr
-            print(f"{key} correlation: {corr}")
-
+        seq_ids = list(seq_dict)
+        loci = [(chr, coord, coord + seq_len) for chr, coord in seq_dict.values()]
+        cache_dir = os.path.join(output_dir, "orca_target_cache") if TARGET_CACHE_DIR is None \
+            else TARGET_CACHE_DIR
+
+        # Each prediction task is compared with the target of the cell-type model that served it
+        task_correlations = []
+        for prediction_task in predictor_json['prediction_tasks']:
+            target_name = orca_cell_type(prediction_task.get('cell_type_actual', DEFAULT_CELL_TYPE))
+            model, target = ORCA_TARGETS[target_name]
+            targets = orca_targets(loci, target_name, target, model, cache_dir or None)
+
+            # Rebuild dense 250x250 matrices from the encoding the task reports
+            predictions = decode_interaction_matrices(prediction_task)
+            pred_arr = np.stack([predictions[key] for key in seq_ids])
+            correlations = dict(zip(seq_ids, masked_pearson(pred_arr, targets).tolist()))
+            for key, corr in correlations.items():
+                print(f"{prediction_task['name']} ({target_name} target) {key} correlation: {corr}")
+            prediction_task['correlations'] = correlations
+            task_correlations.append(correlations)
+
+        # Correlations of the first prediction task, as before multi-cell-type predictions
+        correlations = task_correlations[0]
         predictor_json['correlations'] = correlations
 ############# calculate Pearson correlation between prediction and target
 
+        # Binary predictions are saved to a .npz next to the JSON (see save_message)
         output_file = os.path.join(output_dir, os.path.basename(RETURN_FILE_PATH))
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(predictor_json, f, ensure_ascii=False, indent=4)
+        save_message(predictor_json, output_file, ensure_ascii=False, indent=4)
         print(f"Predictions saved to {output_file}")
         
-    except (json.JSONDecodeError, IOError) as e:
+    except (json.JSONDecodeError, IOError, ValueError) as e:
         print(f"Error saving predictions: {e}")
         sys.exit(1)
 
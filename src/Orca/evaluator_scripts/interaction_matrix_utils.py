@@ -0,0 +1,130 @@
+# interaction_matrix_utils.py
+"""
+Compact encodings of symmetric interaction-matrix (contact map) predictions.
+
+A prediction task with interaction-matrix predictions describes their encoding with:
+    interaction_matrix_encoding: "dense", "upper_triangle" or "coo"
+    interaction_matrix_size: number of rows (and columns) n of each matrix
+    interaction_matrix_diagonal_offset: first diagonal kept (0 keeps the main diagonal;
+        2 drops the main diagonal and the one next to it, like baskerville's UpperTri)
+    interaction_matrix_threshold: ("coo" only) largest absolute value dropped
+
+and each prediction is:
+    "dense": the (n, n) matrix
+    "upper_triangle": float16 values of the diagonals from the offset up, row by row
+        (the order of `np.triu_indices(n, diagonal_offset)`)
+    "coo": {"rows": [...], "cols": [...], "values": [...]} of the upper-triangle entries
+        whose absolute value is above the threshold, values as float16
+
+Predictors encode with `encode_interaction_matrices` and Evaluators rebuild dense
+matrices with `decode_interaction_matrices`. This file is copied into each container
+that sends or receives interaction matrices.
+"""
+import numpy as np
+
+INTERACTION_MATRIX_ENCODINGS = ["dense", "upper_triangle", "coo"]
+
+def _coo_index_dtype(size):
+    return np.uint16 if size <= np.iinfo(np.uint16).max + 1 else np.int32
+
+def encode_interaction_matrices(matrices, prediction_task, encoding="upper_triangle",
+                                diagonal_offset=0, threshold=0.0, as_lists=False):
+    """
+    Encode symmetric interaction matrices and describe the encoding in their prediction task.
+
+    Args:
+        matrices (dict): {sequence_id: (n, n) symmetric matrix}, all of the same size.
+        prediction_task (dict): Prediction task of the matrices; the interaction_matrix_*
+            keys are added to it.
+        encoding (str): One of INTERACTION_MATRIX_ENCODINGS.
+        diagonal_offset (int): First diagonal kept by "upper_triangle" and "coo".
+        threshold (float): "coo" drops entries whose absolute value is at most `threshold`.
+        as_lists (bool): Return lists instead of arrays, for messages sent with plain
+            `json.dumps`.
+
+    Returns:
+        dict: {sequence_id: encoded matrix}
+    """
+    if encoding not in INTERACTION_MATRIX_ENCODINGS:
+        raise ValueError(f"Unknown interaction matrix encoding {encoding}")
+    matrices = {seq_id: np.asarray(matrix) for seq_id, matrix in matrices.items()}
+    sizes = set(matrix.shape[0] for matrix in matrices.values())
+    if len(sizes) > 1:
+        raise ValueError("Interaction matrices of a prediction task must have the same size")
+    size = sizes.pop() if sizes else 0
+
+    prediction_task['interaction_matrix_encoding'] = encoding
+    prediction_task['interaction_matrix_size'] = size
+    if encoding == "dense":
+        encoded = matrices
+    else:
+        prediction_task['interaction_matrix_diagonal_offset'] = diagonal_offset
+        rows, cols = np.triu_indices(size, diagonal_offset)
+        if encoding == "upper_triangle":
+            encoded = {seq_id: matrix[rows, cols].astype(np.float16)
+                       for seq_id, matrix in matrices.items()}
+        else:
+            prediction_task['interaction_matrix_threshold'] = threshold
+            index_dtype = _coo_index_dtype(size)
+            encoded = {}
+            for seq_id, matrix in matrices.items():
+                values = matrix[rows, cols]
+                kept = np.abs(values) > threshold
+                encoded[seq_id] = {'rows': rows[kept].astype(index_dtype),
+                                   'cols': cols[kept].astype(index_dtype),
+                                   'values': values[kept].astype(np.float16)}
+
+    if as_lists:
+        encoded = {seq_id: ({key: value.tolist() for key, value in matrix.items()}
+                            if isinstance(matrix, dict) else matrix.tolist())
+                   for seq_id, matrix in encoded.items()}
+    return encoded
+
+def decode_interaction_matrix(prediction, prediction_task, fill_value=np.nan):
+    """
+    Rebuild the dense matrix of one encoded prediction.
+
+    Args:
+        prediction: Encoded matrix (array, nested lists or COO dict).
+        prediction_task (dict): Prediction task holding the interaction_matrix_* keys;
+            without `interaction_matrix_encoding` the prediction is taken as dense.
+        fill_value (float): Value of the diagonals below the diagonal offset, which
+            the Predictor did not send. Entries dropped by "coo" are 0.
+
+    Returns:
+        np.ndarray: (n, n) float32 symmetric matrix.
+    """
+    encoding = prediction_task.get('interaction_matrix_encoding', "dense")
+    if encoding == "dense":
+        return np.asarray(prediction, dtype=np.float32)
+    if encoding not in INTERACTION_MATRIX_ENCODINGS:
+        raise ValueError(f"Unknown interaction matrix encoding {encoding}")
+
+    size = prediction_task['interaction_matrix_size']
+    diagonal_offset = prediction_task.get('interaction_matrix_diagonal_offset', 0)
+    if encoding == "upper_triangle":
+        matrix = np.empty((size, size), dtype=np.float32)
+        rows, cols = np.triu_indices(size, diagonal_offset)
+        values = np.asarray(prediction, dtype=np.float32)
+    else:
+        matrix = np.zeros((size, size), dtype=np.float32)
+        rows = np.asarray(prediction['rows'], dtype=np.intp)
+        cols = np.asarray(prediction['cols'], dtype=np.intp)
+        values = np.asarray(prediction['values'], dtype=np.float32)
+    matrix[rows, cols] = values
+    matrix[cols, rows] = values
+
+    if diagonal_offset > 0:
+        near_diagonal = np.abs(np.subtract.outer(np.arange(size), np.arange(size))) < diagonal_offset
+        matrix[near_diagonal] = fill_value
+    return matrix
+
+def decode_interaction_matrices(prediction_task, fill_value=np.nan):
+    """
+    Rebuild the dense matrices of all predictions of a prediction task.
+
+    Returns:
+        dict: {sequence_id: (n, n) float32 matrix}
+    """
+    return {seq_id: decode_interaction_matrix(prediction, prediction_task, fill_value)
+            for seq_id, prediction in prediction_task['predictions'].items()}
@@ -1,4 +1,5 @@
 # api_preprocessing_utils.py
+import numpy as np
 
 ## model specific checks that cause a "prediction_request_failed" error
 def check_seqs_specifications(sequences, json_return_error_model):
@@ -13,6 +14,17 @@ def check_seqs_specifications(sequences, json_return_error_model):
             json_return_error_model['prediction_request_failed'].append("sequence in " + key + " has an invalid character present")
     return(json_return_error_model)
 
+def check_intervals_specifications(intervals, chrom_lengths, seq_len, json_return_error_model):
+    # intervals: {seq_id: (chrom, start, end)}, chrom_lengths: {chrom: length} of the genome
+    for key, (chrom, start, end) in intervals.items():
+        if chrom not in chrom_lengths:
+            json_return_error_model['prediction_request_failed'].append("chromosome " + str(chrom) + " of " + key + " is not in the reference genome")
+        elif end > chrom_lengths[chrom]:
+            json_return_error_model['prediction_request_failed'].append("interval in " + key + " ends after the end of " + chrom)
+        if end - start != seq_len:
+            json_return_error_model['prediction_request_failed'].append("length of the interval in " + key + " is not " + str(seq_len))
+    return(json_return_error_model)
+
 def pad_sequence(seq, target_length):
     """
     Pad a sequence, without adapters, with 'N' until it reached the target length.
@@ -62,6 +74,25 @@ def add_adapters(seq, upstream_adapter, downstream_adapter):
     seq_with_adapters = upstream_adapter + seq + downstream_adapter
     return seq_with_adapters
 
+# One-hot lookup table indexed by the ASCII byte of each base ('A', 'G', 'C', 'T'
+# in that column order). Every other byte, including 'N', maps to all zeros.
+ONE_HOT_TABLE = np.zeros((256, 4), dtype=np.uint8)
+for base_index, base in enumerate("AGCT"):
+    ONE_HOT_TABLE[ord(base), base_index] = 1
+
+def sequence_to_bytes(seq):
+    """
+    View a sequence as a uint8 array of ASCII codes without copying per base.
+
+    Args:
+        seq (str): DNA sequence.
+
+    Returns:
+        np.ndarray: uint8 array of length len(seq). Non-ASCII characters are
+                    replaced by '?' and therefore encode as all zeros.
+    """
+    return np.frombuffer(seq.encode("ascii", "replace"), dtype=np.uint8)
+
 # One-hot encode sequences
 def one_hot_encode(seq):
     """
@@ -71,14 +102,9 @@ def one_hot_encode(seq):
         seq (str): Sequence consisting of 'A', 'T', 'G', 'C', and 'N'.
 
     Returns:
-        list: A one-hot encoded list for the sequence.
+        np.ndarray: uint8 array of shape (len(seq), 4) with the one-hot encoding.
     """
-    mapping = {'A': [1, 0, 0, 0],
-               'G': [0, 1, 0, 0],
-               'C': [0, 0, 1, 0],
-               'T': [0, 0, 0, 1],
-               'N': [0, 0, 0, 0]}
-    return [mapping.get(base, [0, 0, 0, 0]) for base in seq]
+    return np.take(ONE_HOT_TABLE, sequence_to_bytes(seq), axis=0)
 
 # Full preprocessing pipeline for a sequence
 def process_sequence(seq, target_length, seq_size,
@@ -88,13 +114,13 @@ def process_sequence(seq, target_length, seq_size,
 
     Args:
         seq (str): The input sequence.
-        target_length (int): Length of the sequence before adding adapters (200 for Dream-RNN).
-        seq_size (int): Model-specific final sequence size (230 for Dream-RNN)
+        target_length (int): Model-dependent length of the sequence before adding adapters.
+        seq_size (int): Model-specific final sequence size.
         upstream_adapter (str): Upstream adapter sequence to prepend.
         downstream_adapter (str): Downstream adapter sequence to append.
 
     Returns:
-        list: A one-hot encoded list with padding and adapters applied.
+        np.ndarray: A (seq_size, 4) one-hot encoded array with padding and adapters applied.
     """
     # Step 1: Pad the sequence
     padded_seq = pad_sequence(seq, target_length)
@@ -105,4 +131,4 @@ def process_sequence(seq, target_length, seq_size,
     # Step 3: One-hot encode the sequence
     encoded_seq = one_hot_encode(seq_with_adapters)
     
-    return encoded_seq
\ No newline at end of file
+    return encoded_seq
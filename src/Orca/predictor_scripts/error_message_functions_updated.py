@@ -250,3 +250,81 @@ def check_key_values_downstream_flank(downstream_seq, json_return_error):
             json_return_error['bad_prediction_request'].append("'downstream_seq' value should be a string")
 
     return(json_return_error)
+
+
+def check_key_values_response_encoding(response_encoding, json_return_error):
+    response_encoding_options = ["json", "binary"]
+
+    if response_encoding not in response_encoding_options:
+        json_return_error['bad_prediction_request'].append("response_encoding requested is not recognized. Please choose from ['json', 'binary']")
+
+    return(json_return_error)
+
+
+def check_key_values_response_streaming(response_streaming, json_return_error):
+
+    if isinstance(response_streaming, bool) == True:
+        pass
+    else:
+        json_return_error['bad_prediction_request'].append("'response_streaming' value should be a boolean")
+
+    return(json_return_error)
+
+def check_key_values_response_batch_size(response_batch_size, json_return_error):
+
+    if isinstance(response_batch_size, int) == True and isinstance(response_batch_size, bool) == False and response_batch_size > 0:
+        pass
+    else:
+        json_return_error['bad_prediction_request'].append("'response_batch_size' value should be a positive integer")
+
+    return(json_return_error)
+
+def check_key_values_request_streaming(request_streaming, json_return_error):
+
+    if isinstance(request_streaming, bool) == True:
+        pass
+    else:
+        json_return_error['bad_prediction_request'].append("'request_streaming' value should be a boolean")
+
+    return(json_return_error)
+
+def check_key_values_genome_assembly(genome_assembly, json_return_error):
+    genome_assembly_options = ["hg38"]
+
+    if genome_assembly not in genome_assembly_options:
+        json_return_error['bad_prediction_request'].append("genome_assembly requested is not recognized. Please choose from ['hg38']")
+
+    return(json_return_error)
+
+#with a genome_assembly, sequences are genomic intervals: [chrom, start] or [chrom, start, end]
+def check_genomic_intervals(sequences, json_return_error):
+    for key, value in sequences.items():
+
+        if type(value) == list and len(value) in (2, 3):
+            if isinstance(value[0], str) == False:
+                json_return_error['bad_prediction_request'].append("chromosome of the interval in " + key + " should be a string")
+            coords = value[1:]
+            if all(isinstance(number, int) == True and isinstance(number, bool) == False for number in coords):
+                if coords[0] < 0 or (len(coords) == 2 and coords[1] <= coords[0]):
+                    json_return_error['bad_prediction_request'].append("interval in " + key + " should have 0 <= start < end")
+            else:
+                json_return_error['bad_prediction_request'].append("start and end of the interval in " + key + " should be integers")
+        else:
+            json_return_error['bad_prediction_request'].append("with a genome_assembly, values in sequences should be [chrom, start] or [chrom, start, end] intervals")
+
+    return(json_return_error)
+
+def check_key_values_interaction_matrix_encoding(interaction_matrix_encoding, json_return_error):
+    interaction_matrix_encoding_options = ["dense", "upper_triangle", "coo"]
+
+    if interaction_matrix_encoding not in interaction_matrix_encoding_options:
+        json_return_error['bad_prediction_request'].append("interaction_matrix_encoding requested is not recognized. Please choose from ['dense', 'upper_triangle', 'coo']")
+
+    return(json_return_error)
+
+def check_key_values_interaction_matrix_threshold(interaction_matrix_threshold, json_return_error):
+    if isinstance(interaction_matrix_threshold, bool) or not isinstance(interaction_matrix_threshold, (int, float)) \
+            or not interaction_matrix_threshold >= 0:
+        json_return_error['bad_prediction_request'].append("interaction_matrix_threshold should be a non-negative number")
+
+    return(json_return_error)
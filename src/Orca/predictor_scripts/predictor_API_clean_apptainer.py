@@ -1,5 +1,6 @@
 ############# orca prediction function
-import sys, torch, warnings
+import os, re, sys, torch, warnings
+import numpy as np
 ORCA_PATH='/orca/'
 USE_CUDA=torch.cuda.is_available()
 sys.path.append(ORCA_PATH)
@@ -9,30 +10,102 @@ import orca_predict
 orca_predict.load_resources(models=['1M'], use_cuda=USE_CUDA)
 from orca_predict import h1esc_1m, hff_1m
 
-def orca_prediction(sequences, seq_ids):
-    predictions = {}
-    for seq, id in zip(sequences, seq_ids):
-        sequence_encoded = Genome.sequence_to_encoding(seq)[None, :, :]
-
-        model = h1esc_1m # change to hff_1m for hff model
-        with warnings.catch_warnings(): # suppress warning
-            warnings.simplefilter("ignore", category=UserWarning)
-            pred = model(torch.FloatTensor(sequence_encoded).transpose(1, 2)) # pred shape [1, 1, 250, 250]
-
-        predictions[id] = pred[0][0].cpu().detach().numpy().tolist()
+# Input length of the 1M models
+ORCA_SEQ_LEN = 1000000
+# Reference genomes the Predictor can fetch genomic intervals from (see `encode_interval`).
+# `load_resources` opens hg38 as a memory-mapped genome, so a fetch is a slice, not a FASTA parse.
+GENOME_ASSEMBLIES = {"hg38": orca_predict.hg38}
+# 1 Mb sequences stacked per forward pass (16 MB of float32 input each)
+ORCA_BATCH_SIZE = int(os.environ.get("ORCA_BATCH_SIZE", 4))
+# Cell-type models, all loaded once by `load_resources`
+ORCA_MODELS = {"H1-ESC": h1esc_1m, "HFF": hff_1m}
+# Requested cell types (lower case, letters and digits only) served by each model;
+# any other cell type is predicted with the default H1-ESC model
+CELL_TYPE_ALIASES = {"h1esc": "H1-ESC", "h1": "H1-ESC", "hesc": "H1-ESC",
+                     "hff": "HFF", "hffc6": "HFF"}
+DEFAULT_CELL_TYPE = "H1-ESC"
+
+def orca_cell_type(cell_type):
+    """Cell type of the Orca model (key of ORCA_MODELS) that serves a requested cell type."""
+    return CELL_TYPE_ALIASES.get(re.sub(r'[^0-9a-z]', '', cell_type.lower()), DEFAULT_CELL_TYPE)
+
+def interval_bounds(interval):
+    """
+    Normalize a genomic interval from a request.
+
+    Args:
+        interval (list): [chrom, start] (a model input from start) or
+            [chrom, start, end], 0 indexed with `end` excluded.
+
+    Returns:
+        tuple: (chrom, start, end)
+    """
+    chrom, start = interval[0], interval[1]
+    end = interval[2] if len(interval) > 2 else start + ORCA_SEQ_LEN
+    return chrom, start, end
+
+def encode_interval(interval, genome_assembly):
+    """
+    Fetch and one-hot encode a genomic interval from a local reference genome.
+
+    Returns:
+        np.ndarray: (end - start, 4) encoding, like `Genome.sequence_to_encoding`.
+    """
+    chrom, start, end = interval_bounds(interval)
+    return GENOME_ASSEMBLIES[genome_assembly].get_encoding_from_coords(chrom, start, end)
+
+def orca_prediction(sequences, seq_ids, cell_types=(DEFAULT_CELL_TYPE,), genome_assembly=None,
+                    batch_size=ORCA_BATCH_SIZE):
+    """
+    Predict the 250x250 1M interaction matrices of sequences with one or more cell-type models.
+
+    Sequences are encoded once per batch of `batch_size` and every requested
+    model runs on the stacked batch.
+
+    Args:
+        sequences (list): Sequences, or genomic intervals if `genome_assembly` is given.
+        seq_ids (iterable): Sequence IDs, in the order of `sequences`.
+        cell_types (iterable): Models to run (keys of ORCA_MODELS).
+        genome_assembly (str, optional): Reference genome of the intervals.
+        batch_size (int): Sequences per forward pass.
+
+    Returns:
+        dict: {cell_type: {sequence_id: np.ndarray of shape (250, 250)}}
+    """
+    seq_ids = list(seq_ids)
+    predictions = {cell_type: {} for cell_type in cell_types}
+    batch_size = max(1, batch_size)
+    for batch_start in range(0, len(seq_ids), batch_size):
+        batch_ids = seq_ids[batch_start:batch_start + batch_size]
+        batch_seqs = sequences[batch_start:batch_start + batch_size]
+        if genome_assembly is None:
+            encoded = np.stack([Genome.sequence_to_encoding(seq) for seq in batch_seqs])
+        else:
+            encoded = np.stack([encode_interval(seq, genome_assembly) for seq in batch_seqs])
+        batch_input = torch.from_numpy(encoded.astype(np.float32)).transpose(1, 2)
+
+        for cell_type in predictions:
+            model = ORCA_MODELS[cell_type]
+            with torch.no_grad(), warnings.catch_warnings(): # suppress warning
+                warnings.simplefilter("ignore", category=UserWarning)
+                pred = model(batch_input) # pred shape [B, 1, 250, 250]
+            for seq_id, matrix in zip(batch_ids, pred[:, 0].cpu().numpy()):
+                predictions[cell_type][seq_id] = matrix
     return predictions
+
 ############ orca prediction function
 
 # predictor_API_clean_apptainer.py
 import os
 import sys
 import json
-import tqdm
-import struct
 import socket
 
 from error_message_functions_updated import *
 from api_preprocessing_utils import *
+from interaction_matrix_utils import *
+from tcp_framing_utils import *
+from predictor_server_utils import *
 
 # Get the absolute path of the script's directory
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -57,245 +130,207 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
 
-# Set buffer size for TCP
-BUFFER_SIZE = 65536
-
-def run_predictor():
-
-    evaluator_ip = sys.argv[1]
-    evaluator_port = int(sys.argv[2])
-    # cell_type_matcher_ip = sys.argv[3]
-    # cell_type_matcher_port = sys.argv[4]
-
-    #create error object
-    json_return_error = {}
-
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
-    # bind the socket to a specific address and port
-    server.bind((evaluator_ip, evaluator_port))
-    # listen for incoming connections
-    server.listen(0)
-    print(f"Listening on {evaluator_ip}:{evaluator_port}")
-
-    # accept incoming connections
-    client_socket, client_address = server.accept()
-    print(f"Accepted connection from {client_address[0]}:{client_address[1]}")
-
+def recv_message_loop(client_socket, inference_pool):
     # Step 1: receive total bytes the Predictor expects to receive
     # Step 2: receive JSON from evaluator
-
-    # Initialize data to store a new message on each iteration
-    json_data_recv = b''
+    # Runs on its own thread per Evaluator connection. The Orca models loaded at
+    # import are shared by every connection; inference runs on `inference_pool`.
 
     while True:
-        # Before receiving JSON from Evaluator
-        # Receive length of the incoming JSON message (4-byte integer)
-        # Can change to 8-byte integer by changing .recv(4) to .recv(8)
-        # and replacing format string '>I' to '>Q'
-        # Step 1
+        # Receive the length prefix and then the JSON into one preallocated buffer
         try:
-            msg_length = client_socket.recv(4)
-            if not msg_length:
-                print("Failed to receive message length. Closing connection.")
-                client_socket.close()
-                break # Exit the loop if no message length is received
-
-            # Unpack message length from 4 bytes
-            msglen = struct.unpack('>I', msg_length)[0]
-            print(f"Expecting {msglen} bytes of data from the Evaluator.")
-            
-            # Initialize the progress bar
-            progress = tqdm.tqdm(range(msglen), unit="B", 
-                                 desc="Receiving Evaluator Request(s)",
-                                 unit_scale=True, unit_divisor=1024)
-
-            # Step 2
-            # Now we want to receive the actual JSON in packets
-            while len(json_data_recv) < msglen:
-                packet = client_socket.recv(BUFFER_SIZE)
-                if not packet:
-                    print("Connection closed unexpectedly.")
-                    break
-                json_data_recv += packet
-                progress.update(len(packet))
-                # print(f"Received packet of {len(packet)} bytes, total received: {len(data)} bytes")
-            
-            # Close the progress bar when done
-            progress.close()
-            
-            # Decode and display the received data if all of it is received
-            if len(json_data_recv) == msglen:
-                print("Evaluator request received completely")
-                break
-            else:
-                print("Data received was incomplete or corrupted.")
-                break
-        except Exception as e:
+            evaluator_request_full = recv_frame(client_socket, desc="Receiving Evaluator Request(s)")
+        except (ConnectionError, socket.error) as e:
             print(f"Error while receiving data: {e}")
             client_socket.close()
-            break  # Break the loop on exception
+            break
 
+        if evaluator_request_full is None:
+            print("Evaluator closed the connection.")
+            client_socket.close()
+            break
+        print("Evaluator request received completely")
 
 # ---------------------- %%%%%%%---------------
-    evaluator_request_full = json_data_recv
-    evaluator_json = evaluator_request_full.decode("utf-8")
-    evaluator_json = json.loads(evaluator_json)
+        # Parse straight from the receive buffer
+        evaluator_json = json.loads(evaluator_request_full)
 
-    # group these functions
-    json_return_error = {'bad_prediction_request': []}
+        # group these functions
+        json_return_error = {'bad_prediction_request': []}
 
-    # if only a "help" was requested return the predictor information file
-    if evaluator_json['request'] == "help":
+        # if only a "help" was requested return the predictor information file
+        if evaluator_json['request'] == "help":
 
-        #model builder should place help file in predictor folder
-        help_file = HELP_FILE
-        jsonResult_help = json.load(open(help_file))
+            #model builder should place help file in predictor folder
+            help_file = HELP_FILE
+            jsonResult_help = json.load(open(help_file))
 
-        jsonResult_help = json.dumps(jsonResult_help)
-        try:
-            jsonResult_help_bytes = jsonResult_help.encode("utf-8")
-            jsonResult_help_total_bytes = len(jsonResult_help_bytes)
-            client_socket.sendall(struct.pack('>I', jsonResult_help_total_bytes))
-            client_socket.sendall(jsonResult_help_bytes)
-            sys.exit(0)
-        except socket.error as e:
-            print ("server_error: Error sending error_file: %s" % e)
-            sys.exit(1)
+            try:
+                send_json(client_socket, jsonResult_help)
+                continue
+            except socket.error as e:
+                print ("server_error: Error sending error_file: %s" % e)
+                break
 
 
-    # re-usable error checking functions
-    json_return_error = check_mandatory_keys(evaluator_json.keys(), json_return_error)
-    json_return_error = check_request(evaluator_json['request'], json_return_error)
-    json_return_error = check_prediction_task_mandatory_keys(evaluator_json['prediction_tasks'], json_return_error)
-    # if any of the mandatory keys are missing immediately return an error to the evaluator
-    if any(json_return_error.values()) == True:
-        json_string = json.dumps(json_return_error)
-        try:
-            jsonResult_error_bytes = json_string.encode("utf-8")
-            jsonResult_error_total_bytes = len(jsonResult_error_bytes)
-            client_socket.sendall(struct.pack('>I', jsonResult_error_total_bytes))
-            client_socket.sendall(jsonResult_error_bytes)
-            sys.exit(1)
-        except socket.error as e:
-            print ("server_error: Error sending error_file: %s" % e)
-            sys.exit(1)
-    else:
-        json_return_error = check_key_values_readout(evaluator_json['readout'], json_return_error)
-        json_return_error = check_prediction_task_name(evaluator_json['prediction_tasks'], json_return_error)
-        json_return_error = check_prediction_task_type(evaluator_json['prediction_tasks'], json_return_error)
-        json_return_error = check_prediction_task_cell_type(evaluator_json['prediction_tasks'], json_return_error)
-        # json_return_error = check_prediction_task_species(evaluator_json['prediction_tasks'], json_return_error)
-        if 'prediction_ranges' in evaluator_json.keys():
-            json_return_error = check_seq_ids(evaluator_json['prediction_ranges'], evaluator_json['sequences'], json_return_error)
-            json_return_error = check_prediction_ranges(evaluator_json['prediction_ranges'], json_return_error)
-
-        if 'upstream_seq' in evaluator_json.keys() or 'downstream_seq' in evaluator_json.keys():
-            json_return_error = check_key_values_upstream_flank(evaluator_json['upstream_seq'], json_return_error)
-        if 'downstream_seq' in evaluator_json.keys():
-            json_return_error = check_key_values_downstream_flank(evaluator_json['downstream_seq'], json_return_error)
-
-        #if any errors were caught return them all to evaluator
+        # re-usable error checking functions
+        json_return_error = check_mandatory_keys(evaluator_json.keys(), json_return_error)
+        json_return_error = check_request(evaluator_json['request'], json_return_error)
+        json_return_error = check_prediction_task_mandatory_keys(evaluator_json['prediction_tasks'], json_return_error)
+        # if any of the mandatory keys are missing immediately return an error to the evaluator
         if any(json_return_error.values()) == True:
-            json_string = json.dumps(json_return_error)
             try:
-                jsonResult_error_bytes = json_string.encode("utf-8")
-                jsonResult_error_total_bytes = len(jsonResult_error_bytes)
-                client_socket.sendall(struct.pack('>I', jsonResult_error_total_bytes))
-                client_socket.sendall(jsonResult_error_bytes)
-                sys.exit(1)
+                send_json(client_socket, json_return_error)
+                continue
             except socket.error as e:
                 print ("server_error: Error sending error_file: %s" % e)
-                sys.exit(1)
+                break
+        else:
+            json_return_error = check_key_values_readout(evaluator_json['readout'], json_return_error)
+            json_return_error = check_prediction_task_name(evaluator_json['prediction_tasks'], json_return_error)
+            json_return_error = check_prediction_task_type(evaluator_json['prediction_tasks'], json_return_error)
+            json_return_error = check_prediction_task_cell_type(evaluator_json['prediction_tasks'], json_return_error)
+            # json_return_error = check_prediction_task_species(evaluator_json['prediction_tasks'], json_return_error)
+            if 'prediction_ranges' in evaluator_json.keys():
+                json_return_error = check_seq_ids(evaluator_json['prediction_ranges'], evaluator_json['sequences'], json_return_error)
+                json_return_error = check_prediction_ranges(evaluator_json['prediction_ranges'], json_return_error)
+
+            if 'upstream_seq' in evaluator_json.keys() or 'downstream_seq' in evaluator_json.keys():
+                json_return_error = check_key_values_upstream_flank(evaluator_json['upstream_seq'], json_return_error)
+            if 'downstream_seq' in evaluator_json.keys():
+                json_return_error = check_key_values_downstream_flank(evaluator_json['downstream_seq'], json_return_error)
+            if 'response_encoding' in evaluator_json.keys():
+                json_return_error = check_key_values_response_encoding(evaluator_json['response_encoding'], json_return_error)
+            if 'interaction_matrix_encoding' in evaluator_json.keys():
+                json_return_error = check_key_values_interaction_matrix_encoding(evaluator_json['interaction_matrix_encoding'], json_return_error)
+            if 'interaction_matrix_threshold' in evaluator_json.keys():
+                json_return_error = check_key_values_interaction_matrix_threshold(evaluator_json['interaction_matrix_threshold'], json_return_error)
+            if 'genome_assembly' in evaluator_json.keys():
+                json_return_error = check_key_values_genome_assembly(evaluator_json['genome_assembly'], json_return_error)
+                json_return_error = check_genomic_intervals(evaluator_json['sequences'], json_return_error)
+
+            #if any errors were caught return them all to evaluator
+            if any(json_return_error.values()) == True:
+                try:
+                    send_json(client_socket, json_return_error)
+                    continue
+                except socket.error as e:
+                    print ("server_error: Error sending error_file: %s" % e)
+                    break
 
 # ---------------------- %%%%%%%---------------
-    # Extract sequences to predict
-    # Check that the sequences meet model specifications
-    # Otherwise do any other formatting required for the model
-    sequences = evaluator_json['sequences']
-    # Can add any additional error checking functons here
-    json_return_error_model = {'prediction_request_failed': {}}
-    json_return_error_model = check_seqs_specifications(sequences, json_return_error_model)
-
-    # if anything is caught don't run the model and return to evaluator to fix
-    if any(json_return_error_model.values()) == True:
-        json_string = json.dumps(json_return_error_model)
-        try:
-            jsonResult_bytes = json_string.encode("utf-8")
-            jsonResults_total_bytes = len(jsonResult_bytes)
-
-            client_socket.sendall(struct.pack('>I', jsonResults_total_bytes))
-
-            client_socket.sendall(jsonResult_bytes)
-        except socket.error as e:
-            print ("server_error: Error sending error_file: %s" % e)
-            sys.exit(1)
+        # Extract sequences to predict
+        # Check that the sequences meet model specifications
+        # Otherwise do any other formatting required for the model
+        sequences = evaluator_json['sequences']
+        # With a genome_assembly, sequences are genomic intervals fetched by the Predictor
+        genome_assembly = evaluator_json.get('genome_assembly')
+        # Can add any additional error checking functons here
+        json_return_error_model = {'prediction_request_failed': []}
+        if genome_assembly is None:
+            json_return_error_model = check_seqs_specifications(sequences, json_return_error_model)
+        else:
+            json_return_error_model = check_intervals_specifications(
+                {seq_id: interval_bounds(interval) for seq_id, interval in sequences.items()},
+                dict(GENOME_ASSEMBLIES[genome_assembly].get_chr_lens()), ORCA_SEQ_LEN,
+                json_return_error_model)
+
+        # if anything is caught don't run the model and return to evaluator to fix
+        if any(json_return_error_model.values()) == True:
+            try:
+                send_json(client_socket, json_return_error_model)
+                continue
+            except socket.error as e:
+                print ("server_error: Error sending error_file: %s" % e)
+                break
     
-    # Start big loop here for all the prediction_tasks
-    # Connect to cell type matching container in cases of multi-task models
-    # cell_type_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    # cell_type_socket.connect((cell_type_matcher_ip, cell_type_matcher_port))
-
-    # Create JSON to return
-    json_return = {'request': evaluator_json['request']}
-    # Prediction task is an array of objects for all requested tasks
-    json_return['prediction_tasks'] = []
-    # Loop through all the prediction tasks
-    for prediction_task in evaluator_json['prediction_tasks']:
-        
-        # Cell type predictor container is running, send the predictors's cell type and evalutor cell type to it
-        # If you want to override the cell type container you can remove the following code
-        # Send the predictor and evaluator cell type
-        # cell_type_socket.sendall(b'Hello, cell type matcher dude!')
-        # cell_type_matcher_return = cell_type_socket.recv(1024)
-
-        # The following code will be model specific
-        # Sample point prediction model
-        # Model builders need to add the appropriate returns here
-
-        current_prediction_task = {'name': prediction_task['name']}
+        # Start big loop here for all the prediction_tasks
+        # Connect to cell type matching container in cases of multi-task models
+        # cell_type_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # cell_type_socket.connect((cell_type_matcher_ip, cell_type_matcher_port))
 
-        current_prediction_task['type_requested'] =  prediction_task['type']
-        current_prediction_task ['type_actual']  = 'expression'
+        # Run each cell-type model once over all sequences, shared by the prediction tasks
+        # Intervals are fetched here; older Evaluators send the fetched `retrieved_seqs`
+        seq_ids = evaluator_json["sequences"].keys()
+        if genome_assembly is None:
+            sequences = evaluator_json['retrieved_seqs']
+        else:
+            sequences = list(evaluator_json['sequences'].values())
+        task_cell_types = [orca_cell_type(prediction_task['cell_type'])
+                           for prediction_task in evaluator_json['prediction_tasks']]
+        model_predictions = inference_pool.run(orca_prediction, sequences, seq_ids,
+                                               list(dict.fromkeys(task_cell_types)), genome_assembly)
+        # "upper_triangle" returns the upper triangle of each symmetric matrix as float16,
+        # "coo" only its entries above `interaction_matrix_threshold` (see interaction_matrix_utils)
+        interaction_matrix_encoding = evaluator_json.get('interaction_matrix_encoding', "dense")
+        interaction_matrix_threshold = evaluator_json.get('interaction_matrix_threshold', 0.0)
+
+        # Create JSON to return
+        json_return = {'request': evaluator_json['request']}
+        # Prediction task is an array of objects for all requested tasks
+        json_return['prediction_tasks'] = []
+        # Loop through all the prediction tasks
+        for prediction_task, cell_type in zip(evaluator_json['prediction_tasks'], task_cell_types):
+        
+            # Cell type predictor container is running, send the predictors's cell type and evalutor cell type to it
+            # If you want to override the cell type container you can remove the following code
+            # Send the predictor and evaluator cell type
+            # cell_type_socket.sendall(b'Hello, cell type matcher dude!')
+            # cell_type_matcher_return = cell_type_socket.recv(1024)
 
-        current_prediction_task['cell_type_requested'] = prediction_task['cell_type']
-        current_prediction_task['cell_type_actual'] =  'K562'
+            # The following code will be model specific
+            # Sample point prediction model
+            # Model builders need to add the appropriate returns here
 
-        current_prediction_task['scale_prediction_requested'] =  prediction_task['scale']
-        current_prediction_task['scale_prediction_actual']  = 'log'
+            current_prediction_task = {'name': prediction_task['name']}
 
-        current_prediction_task['species_requested']  = prediction_task['species']
-        current_prediction_task['species_actual']  = 'homo_sapiens'
+            current_prediction_task['type_requested'] =  prediction_task['type']
+            current_prediction_task ['type_actual']  = 'chromatin_confirmation'
 
-        # Add predictions dictionary to the JSON
-        sequences = evaluator_json['retrieved_seqs']
-        seq_ids = evaluator_json["sequences"].keys()
-        model_predictions = orca_prediction(sequences, seq_ids)
-        current_prediction_task['predictions'] = model_predictions
+            current_prediction_task['cell_type_requested'] = prediction_task['cell_type']
+            current_prediction_task['cell_type_actual'] =  cell_type
 
-        # Append results for current prediction task to the main JSON object
-        json_return['prediction_tasks'].append(current_prediction_task)
+            current_prediction_task['scale_prediction_requested'] =  prediction_task['scale']
+            current_prediction_task['scale_prediction_actual']  = 'log'
 
-    # Convert dictionary to JSON object and send back to evaluator
+            current_prediction_task['species_requested']  = prediction_task['species']
+            current_prediction_task['species_actual']  = 'homo_sapiens'
 
-    json_string = json.dumps(json_return)
-    try:
-        jsonResult_bytes = json_string.encode("utf-8")
-        jsonResults_total_bytes = len(jsonResult_bytes)
+            # Add predictions dictionary to the JSON
+            current_prediction_task['predictions'] = encode_interaction_matrices(
+                model_predictions[cell_type], current_prediction_task, interaction_matrix_encoding,
+                threshold=interaction_matrix_threshold)
 
-        client_socket.sendall(struct.pack('>I', jsonResults_total_bytes))
+            # Append results for current prediction task to the main JSON object
+            json_return['prediction_tasks'].append(current_prediction_task)
 
-        client_socket.sendall(jsonResult_bytes)
-        sys.exit(0)
-    except socket.error as e:
-        print ("server_error: Error sending error_file: %s" % e)
-        sys.exit(1)
+        # Convert dictionary to JSON object (or binary tensor payload) and send back to evaluator
+        # "binary" ships each 250x250 matrix as a raw float32 buffer instead of JSON lists
+        # (or each upper triangle / COO entry list as float16 and index buffers)
+        response_encoding = evaluator_json.get('response_encoding', "json")
+        try:
+            send_message(client_socket, json_return, response_encoding)
+        except socket.error as e:
+            print ("server_error: Error sending error_file: %s" % e)
+            break
 
-# ---------------------- %%%%%%%---------------
     # close connection socket with the client
     client_socket.close()
     print("Connection to client closed")
-    # close server socket
-    server.close()
+
+def run_predictor():
+
+    predictor_ip = sys.argv[1]
+    predictor_port = int(sys.argv[2])
+    # cell_type_matcher_ip = sys.argv[3]
+    # cell_type_matcher_port = sys.argv[4]
+
+    # Inference requests from all Evaluator connections share this queue and its workers
+    inference_pool = InferencePool()
+
+    # Stay up for many Evaluators, each connection served on its own thread
+    serve_predictor(predictor_ip, predictor_port,
+                    lambda client_socket: recv_message_loop(client_socket, inference_pool))
+    inference_pool.shutdown()
 
 run_predictor()
@@ -2,28 +2,34 @@ import json
 import pandas as pd
 from collections import Counter
 
-def create_json_from_xlsx(input_file_path):
-    
+def read_sequences_from_xlsx(input_file_path):
     """
-    Parses an Excel file, extracts to Pandas DataFrame to create a JSON object to be sent to a Predictor.
-    
+    Reads the sequence IDs and sequences from the Excel file.
+
     Args:
         input_file_path (str): Path to the XLSX file.
 
     Returns:
-        json_evaluator (str): JSON string in API format.
+        tuple: (names, sequences) as pandas Series.
     """
-    
     # Read the Excel file, treating the second row as the header (skipping the empty first row)
     df = pd.read_excel(input_file_path, header=1)
     
     # Extract the first column (seq_id (names)) and the last column (sequences -- "230nt sequence (15nt 5' adaptor - 200nt element - 15nt 3' adaptor)")
     names = df.iloc[:, 0]      # sequence ID
     sequences = df.iloc[:, -1] # sequences
-    
-    # Create a dictionary, mapping each sequence name to its corresponding sequence
-    sequence_dict = dict(zip(names, sequences))
-    
+    return names, sequences
+
+def create_request_header():
+    """
+    Creates the Evaluator request without its sequences.
+
+    Used on its own for streamed requests, where the sequences follow in
+    batches (see tcp_framing_utils.send_stream_request).
+
+    Returns:
+        dict: Request in API format without the "sequences" key.
+    """
     # Define the prediction tasks as a separate variable
     prediction_tasks = [
         {
@@ -53,15 +59,58 @@ def create_json_from_xlsx(input_file_path):
     evaluator_dict = {
         "request": "predict",
         "readout": "point",
-        "prediction_tasks": prediction_tasks,
-        "sequences": sequence_dict
+        "prediction_tasks": prediction_tasks
     }
+    return evaluator_dict
+
+def create_json_from_xlsx(input_file_path):
+    
+    """
+    Parses an Excel file, extracts to Pandas DataFrame to create a JSON object to be sent to a Predictor.
+    
+    Args:
+        input_file_path (str): Path to the XLSX file.
+
+    Returns:
+        json_evaluator (str): JSON string in API format.
+    """
+    names, sequences = read_sequences_from_xlsx(input_file_path)
+    
+    # Create a dictionary, mapping each sequence name to its corresponding sequence
+    sequence_dict = dict(zip(names, sequences))
+    
+    evaluator_dict = create_request_header()
+    evaluator_dict["sequences"] = sequence_dict
     
     # Convert the dictionary to a JSON string with indentation for readability
     json_string = json.dumps(evaluator_dict, indent=4)
     
     return json_string
 
+def unique_id_mask(seq_ids):
+    """
+    Flags the sequences to stream to a Predictor when sequence IDs are duplicated.
+
+    Streamed requests never build the "sequences" object, so duplicate IDs are
+    resolved here the same way `dict(zip(ids, sequences))` resolves them: the
+    last occurrence of an ID is kept.
+
+    Args:
+        seq_ids (pandas.Series): Sequence IDs.
+
+    Returns:
+        pandas.Series: Boolean mask of the rows to keep.
+    """
+    counts = seq_ids.value_counts()
+    duplicates = counts[counts > 1]
+    if len(duplicates):
+        print("Duplicate keys found (keeping the last occurrence):")
+        for key, count in duplicates.items():
+            print(f"Key: {key}, Count: {count}")
+    else:
+        print("No duplicates found.")
+    return ~seq_ids.duplicated(keep='last')
+
 
 # Function to check for duplicate keys in the JSON file
 # UPDATED FROM PREVIOUS EVALUATORS -- takes JSON string instead of file path
@@ -4,17 +4,25 @@ import sys
 import json
 import time
 import tqdm
-import struct
 import socket
 
 from collections import Counter
 
+from tcp_framing_utils import *
+
 # Get the absolute path of the script's directory
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Define the input JSON file name
 input_json = "evaluator_message_more_complex.json"
 
+# Ask the Predictor for raw float16 prediction buffers instead of JSON lists
+# (unless the input JSON sets "response_encoding" itself)
+RESPONSE_ENCODING = "binary"
+# Ask the Predictor to stream predictions batch by batch, so they are written
+# to disk as they arrive (unless the input JSON sets "response_streaming" itself)
+RESPONSE_STREAMING = True
+
 # Determine if running inside a container or not
 if os.path.exists("/.singularity.d"):
     # Running inside the container
@@ -25,8 +33,6 @@ else:
     
 EVALUATOR_INPUT_PATH = os.path.join(EVALUATOR_DATA_DIR, input_json)
     
-# Set buffer size for TCP
-BUFFER_SIZE = 65536
 
 # Debug logs for validation
 print(f"Using input JSON: {EVALUATOR_INPUT_PATH}")
@@ -166,6 +172,8 @@ def run_evaluator():
         jsonResult = check_duplicates(EVALUATOR_INPUT_PATH)
         if jsonResult is None:
             sys.exit(1)
+        jsonResult.setdefault('response_encoding', RESPONSE_ENCODING)
+        jsonResult.setdefault('response_streaming', RESPONSE_STREAMING)
         jsonResult = json.dumps(jsonResult)
     except json.JSONDecodeError as e:
         print("Invalid JSON syntax:", e)
@@ -174,15 +182,10 @@ def run_evaluator():
     # This is used to stop the recv() process
     # send the evaluator json to the predictor server
     try:
-        # Length prefixing
-        # Send Evaluator JSON length as a 4-byte integer
+        # Length prefixing (4-byte length, or 8-byte length for frames of 4 GiB or more)
         jsonResult_bytes = jsonResult.encode("utf-8")
-        jsonResults_total_bytes = len(jsonResult_bytes)
-
-        connection.sendall(struct.pack('>I', jsonResults_total_bytes))
-        print(f"Sent evaluator request length {jsonResults_total_bytes} bytes")
-
-        connection.sendall(jsonResult_bytes)
+        send_frame(connection, jsonResult_bytes)
+        print(f"Sent evaluator request of {len(jsonResult_bytes)} bytes")
 
     except socket.error as e:
         print ("server_error: Error sending evaluator_file: %s" % e)
@@ -190,70 +193,39 @@ def run_evaluator():
 
 # ---------------------- %%%%%%%---------------
     # receive message from the server
-    json_data_recv = b''
-    while True:
-        # Before receiving JSON from Predictor
-        # Receive length of the incoming JSON message (4-byte integer)
-        # Can change to 8-byte integer by changing .recv(4) to .recv(8)
-        # and replacing format string '>I' to '>Q'
-        # Step 1
-        try:
-            msg_length = connection.recv(4)
-            if not msg_length:
-                print("Failed to receive message length. Closing connection.")
-                connection.close()
-                break # Exit the loop if no message length is received
-
-            # Unpack message length from 4 bytes
-            msglen = struct.unpack('>I', msg_length)[0]
-            print(f"Expecting {msglen} bytes of data from the Predictor.")
-            # Can comment out print commands other than for errors
-            
-            # Initialize the progress bar
-            progress = tqdm.tqdm(range(msglen), unit="B", 
-                                 desc="Receiving Predictor Response",
-                                 unit_scale=True, unit_divisor=1024)
-
-            #Step 2
-            # Now we want to receive the actual JSON in packets
-            
-            while len(json_data_recv) < msglen:
-                packet = connection.recv(BUFFER_SIZE)
-                if not packet:
-                    print("Connection closed unexpectedly.")
-                    break
-                json_data_recv += packet
-                progress.update(len(packet))
-                #print(f"Received packet of {len(packet)} bytes, total received: {len(data)} bytes")
-           
-            # Close the progress bar when done
-            progress.close()
-            
-            # Decode and display the received data if all of it is received
-            if len(json_data_recv) == msglen:
-                print("Predictor return received completely!")
-                break
-            else:
-                print("Data received was incomplete or corrupted.")
-                break
-
+    # The announced length is used to receive the JSON into one preallocated buffer
+    try:
+        json_data_recv = recv_frame(connection, desc="Receiving Predictor Response")
+    except (ConnectionError, socket.error) as e:
+        print ("server_error: Error receiving predictions: %s" % e)
+        sys.exit(1)
 
-        except socket.error as e:
-            print ("server_error: Error receiving predictions: %s" % e)
-            sys.exit(1)
+    if json_data_recv is None:
+        print("Failed to receive message length. Closing connection.")
+        connection.close()
+        sys.exit(1)
+    print("Predictor return received completely!")
 
     # Parse and save Predictor response
     try:
-        predictor_response_full = json_data_recv
-        predictor_json = predictor_response_full.decode("utf-8")
-        predictor_json = json.loads(predictor_json)
+        # Parse straight from the receive buffer (JSON or binary tensor payload)
+        predictor_json = decode_message(json_data_recv)
         
         output_file = RETURN_FILE_PATH
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(predictor_json, f, ensure_ascii=False, indent=4, separators=(",", ": ")) # // ADDED separators
-        print(f"Predictions saved to {output_file}")
+        if predictor_json.get(STREAM_KEY) == "header":
+            # Streamed response: write each batch frame to disk as it arrives
+            # (reassemble with load_stream)
+            stream_file, last_frame = save_stream(connection, predictor_json, output_file,
+                                                  desc="Receiving Predictor Response")
+            print(f"Predictions saved to {stream_file}")
+            if last_frame.get(STREAM_KEY) != "trailer":
+                print(f"Predictor stopped the stream: {last_frame}")
+        else:
+            # Binary predictions are saved to a .npz next to the JSON (see save_message)
+            save_message(predictor_json, output_file, ensure_ascii=False, indent=4, separators=(",", ": ")) # // ADDED separators
+            print(f"Predictions saved to {output_file}")
         
-    except (json.JSONDecodeError, IOError) as e:
+    except (json.JSONDecodeError, IOError, ValueError, ConnectionError) as e:
         print(f"Error saving predictions: {e}")
         sys.exit(1)
 
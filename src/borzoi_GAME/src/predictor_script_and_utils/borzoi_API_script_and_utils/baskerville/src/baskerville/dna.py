@@ -36,6 +36,61 @@ def dna_rc(seq: str):
     return seq.translate(str.maketrans("ATCGatcg", "TAGCtagc"))[::-1]
 
 
+# ASCII code to nucleotide index lookup: A/C/G/T (either case) to 0-3,
+# everything else to 4.
+DNA_INDEX_TABLE = np.full(256, 4, dtype="uint8")
+for _ni, _nt in enumerate("ACGT"):
+    DNA_INDEX_TABLE[ord(_nt)] = _ni
+    DNA_INDEX_TABLE[ord(_nt.lower())] = _ni
+
+# Nucleotide index to 1-hot row lookups; row 4 encodes N.
+HOT1_TABLE = np.vstack([np.eye(4), np.zeros((1, 4))]).astype("bool")
+HOT1_UNIFORM_TABLE = np.vstack([np.eye(4), np.full((1, 4), 0.25)]).astype("float16")
+
+
+def dna_index_array(seq: str):
+    """Translate a DNA sequence to nucleotide indexes with a byte lookup.
+
+    Args:
+      seq (str): DNA sequence.
+
+    Returns:
+      seq_index (np.array): uint8 array with A,C,G,T as 0-3 and anything else as 4.
+    """
+    seq_bytes = np.frombuffer(seq.encode("ascii", "replace"), dtype="uint8")
+    return DNA_INDEX_TABLE[seq_bytes]
+
+
+def _dna_1hot_fill(seq_code, seq: str, n_uniform: bool = False, n_sample: bool = False):
+    """Write the 1-hot encoding of a sequence into a zeroed len x 4 array,
+    center trimming or padding the sequence to the array length.
+
+    Args:
+      seq_code (np.array): Zeroed output array of shape (seq_len, 4).
+      seq (str): DNA sequence.
+      n_uniform (bool): represent N's as 0.25.
+      n_sample (bool):  sample ACGT for N
+    """
+    seq_len = seq_code.shape[0]
+    if seq_len <= len(seq):
+        # trim the sequence
+        seq_trim = (len(seq) - seq_len) // 2
+        seq = seq[seq_trim : seq_trim + seq_len]
+        seq_start = 0
+    else:
+        seq_start = (seq_len - len(seq)) // 2
+
+    seq_index = dna_index_array(seq)
+    hot1_table = HOT1_UNIFORM_TABLE if n_uniform else HOT1_TABLE
+    seq_code[seq_start : seq_start + len(seq)] = hot1_table[seq_index]
+
+    if n_sample and not n_uniform:
+        n_positions = np.flatnonzero(seq_index == 4)
+        if len(n_positions) > 0:
+            ni = [random.randint(0, 3) for _ in range(len(n_positions))]
+            seq_code[seq_start + n_positions, ni] = 1
+
+
 def dna_1hot(
     seq: str, seq_len: int = None, n_uniform: bool = False, n_sample: bool = False
 ):
@@ -52,17 +107,6 @@ def dna_1hot(
     """
     if seq_len is None:
         seq_len = len(seq)
-        seq_start = 0
-    else:
-        if seq_len <= len(seq):
-            # trim the sequence
-            seq_trim = (len(seq) - seq_len) // 2
-            seq = seq[seq_trim : seq_trim + seq_len]
-            seq_start = 0
-        else:
-            seq_start = (seq_len - len(seq)) // 2
-
-    seq = seq.upper()
 
     # map nt's to a matrix len(seq)x4 of 0's and 1's.
     if n_uniform:
@@ -70,27 +114,43 @@ def dna_1hot(
     else:
         seq_code = np.zeros((seq_len, 4), dtype="bool")
 
-    for i in range(seq_len):
-        if i >= seq_start and i - seq_start < len(seq):
-            nt = seq[i - seq_start]
-            if nt == "A":
-                seq_code[i, 0] = 1
-            elif nt == "C":
-                seq_code[i, 1] = 1
-            elif nt == "G":
-                seq_code[i, 2] = 1
-            elif nt == "T":
-                seq_code[i, 3] = 1
-            else:
-                if n_uniform:
-                    seq_code[i, :] = 0.25
-                elif n_sample:
-                    ni = random.randint(0, 3)
-                    seq_code[i, ni] = 1
+    _dna_1hot_fill(seq_code, seq, n_uniform=n_uniform, n_sample=n_sample)
 
     return seq_code
 
 
+def dna_1hot_batch(
+    seqs, seq_len: int = None, n_uniform: bool = False, n_sample: bool = False
+):
+    """Convert a list of DNA sequences to a stacked 1-hot encoding.
+
+    Args:
+      seqs ([str]): DNA sequences.
+      seq_len (int): length to extend/trim sequences to; required
+        unless all sequences share the same length.
+      n_uniform (bool): represent N's as 0.25, forcing float16,
+      n_sample (bool):  sample ACGT for N
+
+    Returns:
+      seqs_code (np.array): N x seq_len x 4 1-hot encoding of DNA sequences.
+    """
+    if seq_len is None:
+        seq_lens = set(len(seq) for seq in seqs)
+        if len(seq_lens) > 1:
+            raise ValueError("seq_len is required for sequences of different lengths")
+        seq_len = seq_lens.pop() if seq_lens else 0
+
+    if n_uniform:
+        seqs_code = np.zeros((len(seqs), seq_len, 4), dtype="float16")
+    else:
+        seqs_code = np.zeros((len(seqs), seq_len, 4), dtype="bool")
+
+    for si, seq in enumerate(seqs):
+        _dna_1hot_fill(seqs_code[si], seq, n_uniform=n_uniform, n_sample=n_sample)
+
+    return seqs_code
+
+
 def dna_1hot_index(seq: str, n_sample: bool = False):
     """Convert a DNA sequence to an index encoding.
 
@@ -101,27 +161,13 @@ def dna_1hot_index(seq: str, n_sample: bool = False):
     Returns:
       seq_code (np.array): Index encoding of DNA sequence.
     """
-    seq_len = len(seq)
-    seq = seq.upper()
-
     # map nt's to a len(seq) of 0,1,2,3
-    seq_code = np.zeros(seq_len, dtype="uint8")
+    seq_code = dna_index_array(seq)
 
-    for i in range(seq_len):
-        nt = seq[i]
-        if nt == "A":
-            seq_code[i] = 0
-        elif nt == "C":
-            seq_code[i] = 1
-        elif nt == "G":
-            seq_code[i] = 2
-        elif nt == "T":
-            seq_code[i] = 3
-        else:
-            if n_sample:
-                seq_code[i] = random.randint(0, 3)
-            else:
-                seq_code[i] = 4
+    if n_sample:
+        n_positions = np.flatnonzero(seq_code == 4)
+        for i in n_positions:
+            seq_code[i] = random.randint(0, 3)
 
     return seq_code
 
@@ -0,0 +1,229 @@
+# Copyright 2023 Calico LLC
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =========================================================================
+import gzip
+import os
+
+import numpy as np
+
+from baskerville import dna
+
+"""
+genome.py
+
+Pre-encoded reference genome store. Each chromosome is written once as a
+uint8 array of nucleotide indexes (A,C,G,T as 0-3, anything else as 4) in
+its own .npy file, and opened with np.memmap, so fetching a window is a
+slice of the page cache instead of a FASTA parse and text encoding.
+"""
+
+# Bytes of FASTA text encoded per chunk while building a store.
+BUILD_CHUNK_BYTES = 1 << 24
+# Nucleotide index of N, also used to pad windows beyond the chromosome ends.
+N_INDEX = 4
+# Nucleotide index to upper case ASCII code.
+INDEX_NT_TABLE = np.frombuffer(b"ACGTN", dtype="uint8")
+
+
+def _open_fasta(fasta_file: str):
+    """Open a plain or gzip/bgzip compressed FASTA as binary lines."""
+    with open(fasta_file, "rb") as fasta_open:
+        gzipped = fasta_open.read(2) == b"\x1f\x8b"
+    return gzip.open(fasta_file, "rb") if gzipped else open(fasta_file, "rb")
+
+
+def build_genome_store(fasta_file: str, store_dir: str, chroms=None):
+    """Write a FASTA as per-chromosome nucleotide index arrays.
+
+    Args:
+      fasta_file (str): Genome FASTA, plain or gzip/bgzip compressed.
+      store_dir (str): Output directory of the <chrom>.npy arrays.
+      chroms ([str]): Chromosomes to write; all by default.
+
+    Returns:
+      chrom_lens (dict): Length of each written chromosome.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    chrom_lens = {}
+
+    def write_chrom(chrom, chunks):
+        seq_index = np.concatenate(chunks) if chunks else np.zeros(0, dtype="uint8")
+        # write to a temporary file first so readers never see a partial array
+        tmp_file = os.path.join(store_dir, "%s.npy.tmp" % chrom)
+        with open(tmp_file, "wb") as tmp_open:
+            np.save(tmp_open, seq_index)
+        os.replace(tmp_file, os.path.join(store_dir, "%s.npy" % chrom))
+        chrom_lens[chrom] = len(seq_index)
+
+    chrom = None
+    chunks = []
+    lines = []
+    line_bytes = 0
+    with _open_fasta(fasta_file) as fasta_open:
+        for line in fasta_open:
+            if line.startswith(b">"):
+                if chrom is not None:
+                    chunks.append(dna.DNA_INDEX_TABLE[_join_lines(lines)])
+                    write_chrom(chrom, chunks)
+                name = line[1:].split()[0].decode()
+                chrom = name if chroms is None or name in chroms else None
+                chunks, lines, line_bytes = [], [], 0
+            elif chrom is not None:
+                lines.append(line.rstrip())
+                line_bytes += len(line)
+                if line_bytes >= BUILD_CHUNK_BYTES:
+                    chunks.append(dna.DNA_INDEX_TABLE[_join_lines(lines)])
+                    lines, line_bytes = [], 0
+        if chrom is not None:
+            chunks.append(dna.DNA_INDEX_TABLE[_join_lines(lines)])
+            write_chrom(chrom, chunks)
+
+    return chrom_lens
+
+
+def _join_lines(lines):
+    return np.frombuffer(b"".join(lines), dtype="uint8")
+
+
+class GenomeStore:
+    """Memory-mapped genome written by build_genome_store.
+
+    Windows inside a chromosome are zero-copy views of the memory map;
+    windows past either end are padded with N, like make_seq_1hot.
+    Safe to share across threads (and across processes, which share the
+    page cache of the arrays).
+
+    Args:
+      store_dir (str): Directory of the <chrom>.npy arrays.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self.chroms = {}
+        for file_name in sorted(os.listdir(store_dir)):
+            if file_name.endswith(".npy"):
+                chrom = file_name[: -len(".npy")]
+                self.chroms[chrom] = np.load(
+                    os.path.join(store_dir, file_name), mmap_mode="r"
+                )
+
+    def chrom_lens(self):
+        """Return a dict of chromosome lengths."""
+        return {chrom: len(seq_index) for chrom, seq_index in self.chroms.items()}
+
+    def index(self, chrom: str, start: int, end: int):
+        """Nucleotide indexes of a window.
+
+        Args:
+          chrom (str): Chromosome.
+          start (int): Window start (0-based).
+          end (int): Window end (exclusive).
+
+        Returns:
+          seq_index (np.array): uint8 array of length end - start; a read-only
+            view of the memory map if the window is inside the chromosome.
+        """
+        if chrom not in self.chroms:
+            raise KeyError("Chromosome %s is not in the genome store" % chrom)
+        seq_index = self.chroms[chrom]
+        if 0 <= start and end <= len(seq_index):
+            return seq_index[start:end]
+
+        window_index = np.full(end - start, N_INDEX, dtype="uint8")
+        inside_start = min(max(start, 0), len(seq_index))
+        inside_end = max(min(end, len(seq_index)), inside_start)
+        window_index[inside_start - start : inside_end - start] = seq_index[
+            inside_start:inside_end
+        ]
+        return window_index
+
+    def seq(self, chrom: str, start: int, end: int):
+        """Return the window as an upper case DNA string (N beyond the ends)."""
+        return INDEX_NT_TABLE[self.index(chrom, start, end)].tobytes().decode()
+
+    def fetch(self, chrom: str, start: int, end: int):
+        """Return the window clipped to the chromosome, like pysam.Fastafile.fetch."""
+        chrom_len = len(self.chroms[chrom])
+        start, end = min(max(start, 0), chrom_len), min(max(end, 0), chrom_len)
+        return self.seq(chrom, start, max(start, end))
+
+    def close(self):
+        """Release the memory maps."""
+        self.chroms = {}
+
+    def one_hot(
+        self, chrom: str, start: int, end: int, n_uniform: bool = False, out=None
+    ):
+        """1-hot encoding of a window, like dna.dna_1hot of its sequence.
+
+        Args:
+          chrom (str): Chromosome.
+          start (int): Window start (0-based).
+          end (int): Window end (exclusive).
+          n_uniform (bool): represent N's as 0.25, forcing float16.
+          out (np.array): Optional (end - start) x 4 array to write into.
+
+        Returns:
+          seq_1hot (np.array): (end - start) x 4 1-hot encoding.
+        """
+        hot1_table = dna.HOT1_UNIFORM_TABLE if n_uniform else dna.HOT1_TABLE
+        seq_index = self.index(chrom, start, end)
+        if out is None:
+            return hot1_table[seq_index]
+        if out.dtype == hot1_table.dtype:
+            # indexes are always 0-4, so clipping never applies; it skips buffering
+            np.take(hot1_table, seq_index, axis=0, out=out, mode="clip")
+        else:
+            out[:] = hot1_table[seq_index]
+        return out
+
+    def one_hot_batch(self, intervals, n_uniform: bool = False, out=None):
+        """Stacked 1-hot encodings of equal length windows.
+
+        Args:
+          intervals ([(str, int, int)]): (chrom, start, end) windows.
+          n_uniform (bool): represent N's as 0.25, forcing float16.
+          out (np.array): Optional N x seq_len x 4 array to write into, e.g.
+            a preallocated model input batch.
+
+        Returns:
+          seqs_1hot (np.array): N x seq_len x 4 1-hot encodings.
+        """
+        seq_lens = set(end - start for _, start, end in intervals)
+        if len(seq_lens) > 1:
+            raise ValueError("Windows of a batch must have the same length")
+        seq_len = seq_lens.pop() if seq_lens else 0
+
+        if out is None:
+            hot1_table = dna.HOT1_UNIFORM_TABLE if n_uniform else dna.HOT1_TABLE
+            out = np.empty((len(intervals), seq_len, 4), dtype=hot1_table.dtype)
+        for si, (chrom, start, end) in enumerate(intervals):
+            self.one_hot(chrom, start, end, n_uniform=n_uniform, out=out[si])
+        return out
+
+
+def open_genome(genome_path: str):
+    """Open a genome store directory, or a FASTA with pysam.
+
+    Both support fetch(chrom, start, end) and close(), so a store can stand
+    in for a pysam.Fastafile.
+
+    Args:
+      genome_path (str): GenomeStore directory or indexed FASTA.
+    """
+    if os.path.isdir(genome_path):
+        return GenomeStore(genome_path)
+    import pysam
+
+    return pysam.Fastafile(genome_path)
@@ -0,0 +1,83 @@
+import os
+import threading
+
+import numpy as np
+import tensorflow as tf
+
+
+def quantize_model(model, tflite_file, precision="INT8"):
+    """
+    Convert a Keras model to a quantized TFLite flatbuffer for CPU inference.
+
+    INT8 is dynamic-range quantization: weights are stored as int8 (a quarter
+    of their float32 size) and the hybrid CPU kernels dequantize activations on
+    the fly, so no calibration data is needed. FP16 stores float16 weights.
+    Ops without a TFLite builtin run through the TensorFlow (flex) fallback.
+
+    Args:
+      model (tf.keras.Model): Model to convert, e.g. SeqNN.ensemble.
+      tflite_file (str): Output .tflite path.
+      precision (str): "INT8" or "FP16".
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if precision == "FP16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif precision != "INT8":
+        raise ValueError("Unknown TFLite precision %s" % precision)
+    converter.target_spec.supported_ops = [
+        tf.lite.OpsSet.TFLITE_BUILTINS,
+        tf.lite.OpsSet.SELECT_TF_OPS,
+    ]
+    tflite_model = converter.convert()
+
+    # write to a temporary file first so readers never see a partial model
+    tmp_file = "%s.tmp" % tflite_file
+    with open(tmp_file, "wb") as tflite_open:
+        tflite_open.write(tflite_model)
+    os.replace(tmp_file, tflite_file)
+
+
+class QuantizedModel:
+    """
+    Class of model quantized with TFLite, the CPU counterpart of OptimizedModel
+    Args:
+      tflite_file: Quantized model written by quantize_model
+      num_threads: CPU threads of the interpreter (default: all)
+    """
+
+    def __init__(self, tflite_file=None, num_threads=None):
+        self.interpreter = None
+        self.lock = threading.Lock()
+        if not tflite_file is None:
+            self.load_model(tflite_file, num_threads)
+
+    def predict(self, input_data, output_columns=None):
+        """Predict a batch; output_columns keeps those targets of each sequence's output."""
+        if self.interpreter is None:
+            raise (Exception("Haven't loaded a model"))
+        x = np.asarray(input_data, dtype="float32")
+
+        # the interpreter runs one sequence at a time and is not thread safe
+        preds = []
+        with self.lock:
+            for xi in x:
+                self.interpreter.set_tensor(self.input_index, xi[np.newaxis])
+                self.interpreter.invoke()
+                pred = self.interpreter.get_tensor(self.output_index)
+                if output_columns is not None:
+                    pred = pred[..., output_columns]
+                preds.append(pred)
+        return np.concatenate(preds, axis=0)
+
+    def load_model(self, tflite_file, num_threads=None):
+        self.interpreter = tf.lite.Interpreter(
+            model_path=tflite_file, num_threads=num_threads or os.cpu_count()
+        )
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self.output_shape = tuple(self.interpreter.get_output_details()[0]["shape"])
+
+    def __call__(self, x, output_columns=None):
+        return self.predict(x, output_columns)
@@ -473,8 +473,13 @@ class MultiheadAttention(tf.keras.layers.Layer):
         if self._scaling:
             q *= self._key_size**-0.5
 
+        # The biases are float32 variables; under a float16/bfloat16 policy
+        # they are not autocast, so match the compute dtype here
+        r_w_bias = tf.cast(self._r_w_bias, q.dtype)
+        r_r_bias = tf.cast(self._r_r_bias, q.dtype)
+
         # [B, H, T', T]
-        content_logits = tf.matmul(q + self._r_w_bias, k, transpose_b=True)
+        content_logits = tf.matmul(q + r_w_bias, k, transpose_b=True)
 
         if self._num_position_features == 0:
             logits = content_logits
@@ -500,10 +505,10 @@ class MultiheadAttention(tf.keras.layers.Layer):
             # Add shifted relative logits to content logits.
             if self._content_position_bias:
                 # [B, H, T', 2T-1]
-                relative_logits = tf.matmul(q + self._r_r_bias, r_k, transpose_b=True)
+                relative_logits = tf.matmul(q + r_r_bias, r_k, transpose_b=True)
             else:
                 # [1, H, 1, 2T-1]
-                relative_logits = tf.matmul(self._r_r_bias, r_k, transpose_b=True)
+                relative_logits = tf.matmul(r_r_bias, r_k, transpose_b=True)
                 # [1, H, T', 2T-1]
                 relative_logits = tf.broadcast_to(
                     relative_logits,
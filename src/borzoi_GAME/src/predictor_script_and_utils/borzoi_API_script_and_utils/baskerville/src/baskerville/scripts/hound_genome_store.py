@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# Copyright 2023 Calico LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =========================================================================
+import argparse
+
+from baskerville import genome
+
+"""
+hound_genome_store.py
+
+Pre-encode a genome FASTA into a memory-mapped genome store.
+"""
+
+
+################################################################################
+# main
+################################################################################
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pre-encode a genome FASTA into a memory-mapped genome store."
+    )
+    parser.add_argument(
+        "-c",
+        "--chroms",
+        default=None,
+        help="Comma-separated chromosomes to write [Default: all]",
+    )
+    parser.add_argument("fasta_file", help="Genome FASTA (plain or gzip/bgzip)")
+    parser.add_argument("store_dir", help="Output genome store directory")
+    args = parser.parse_args()
+
+    chroms = None if args.chroms is None else args.chroms.split(",")
+    chrom_lens = genome.build_genome_store(args.fasta_file, args.store_dir, chroms)
+    for chrom, chrom_len in chrom_lens.items():
+        print("%s\t%d" % (chrom, chrom_len))
+
+
+################################################################################
+# __main__
+################################################################################
+if __name__ == "__main__":
+    main()
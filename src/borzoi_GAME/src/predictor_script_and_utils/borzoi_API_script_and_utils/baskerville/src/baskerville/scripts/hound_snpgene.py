@@ -58,6 +58,12 @@ def main():
         default=None,
         help="Genome FASTA [Default: %default]",
     )
+    parser.add_option(
+        "--genome_store",
+        dest="genome_store",
+        default=None,
+        help="Pre-encoded genome store (see genome.build_genome_store) to fetch sequences from instead of the FASTA [Default: %default]",
+    )
     parser.add_option(
         "--float16",
         dest="float16",
@@ -13,6 +13,7 @@ from tqdm import tqdm
 
 from baskerville import dna
 from baskerville import dataset
+from baskerville import genome
 from baskerville.gene import Transcriptome
 from baskerville import seqnn
 from baskerville import vcf as bvcf
@@ -134,8 +135,10 @@ def score_snps(params_file, model_file, vcf_file, worker_index, options):
     # delimit sequence boundaries
     [sc.delimit(params_model["seq_length"]) for sc in snp_clusters]
 
-    # open genome FASTA
-    genome_open = pysam.Fastafile(options.genome_fasta)
+    # open genome FASTA (or its pre-encoded store)
+    genome_open = genome.open_genome(
+        getattr(options, "genome_store", None) or options.genome_fasta
+    )
 
     #################################################################
     # predict SNP scores, write output
@@ -373,8 +376,10 @@ def score_gene_snps(params_file, model_file, vcf_file, worker_index, options):
     # remove genes w/o SNPs
     genesnp_clusters = [gsc for gsc in genesnp_clusters if len(gsc.snps) > 0]
 
-    # open genome FASTA
-    genome_open = pysam.Fastafile(options.genome_fasta)
+    # open genome FASTA (or its pre-encoded store)
+    genome_open = genome.open_genome(
+        getattr(options, "genome_store", None) or options.genome_fasta
+    )
 
     #################################################################
     # predict SNP scores, write output
@@ -969,23 +974,33 @@ class SNPCluster:
         """Get list of one hot coded sequences."""
         seqs1_list = []
 
-        # extract reference
-        if self.start < 0:
-            ref_seq = (
-                "N" * (-self.start) + genome_open.fetch(self.chr, 0, self.end).upper()
-            )
+        if isinstance(genome_open, genome.GenomeStore):
+            # 1 hot code straight from the pre-encoded store (N padded past the ends)
+            ref_seq = None
+            ref_1hot = genome_open.one_hot(self.chr, self.start, self.end)
         else:
-            ref_seq = genome_open.fetch(self.chr, self.start, self.end).upper()
+            # extract reference
+            if self.start < 0:
+                ref_seq = (
+                    "N" * (-self.start)
+                    + genome_open.fetch(self.chr, 0, self.end).upper()
+                )
+            else:
+                ref_seq = genome_open.fetch(self.chr, self.start, self.end).upper()
 
-        # extend to full length
-        if len(ref_seq) < self.end - self.start:
-            ref_seq += "N" * (self.end - self.start - len(ref_seq))
+            # extend to full length
+            if len(ref_seq) < self.end - self.start:
+                ref_seq += "N" * (self.end - self.start - len(ref_seq))
+            ref_1hot = None
 
         # verify reference alleles
         for snp in self.snps:
             ref_n = len(snp.ref_allele)
             snp_pos = snp.pos - 1 - self.start
-            ref_snp = ref_seq[snp_pos : snp_pos + ref_n]
+            if ref_seq is None:
+                ref_snp = genome_open.seq(self.chr, snp.pos - 1, snp.pos - 1 + ref_n)
+            else:
+                ref_snp = ref_seq[snp_pos : snp_pos + ref_n]
             if snp.ref_allele != ref_snp:
                 print(
                     "ERROR: %s does not match reference %s" % (snp, ref_snp),
@@ -994,7 +1009,8 @@ class SNPCluster:
                 exit(1)
 
         # 1 hot code reference sequence
-        ref_1hot = dna.dna_1hot(ref_seq)
+        if ref_1hot is None:
+            ref_1hot = dna.dna_1hot(ref_seq)
         seqs1_list = [ref_1hot]
 
         # make alternative 1 hot coded sequences
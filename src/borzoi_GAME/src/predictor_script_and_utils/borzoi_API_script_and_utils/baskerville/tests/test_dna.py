@@ -56,6 +56,35 @@ def test_dna_1hot_sum():
     assert seq_1hot[2].sum() == 1
 
 
+def test_dna_1hot_seq_len():
+    # pad and trim around the center
+    assert np.array_equal(dna.dna_1hot("ACGT", seq_len=6)[1:5], ACGT_ARRAY)
+    assert dna.dna_1hot("ACGT", seq_len=6)[[0, 5]].sum() == 0
+    assert np.array_equal(dna.dna_1hot("TACGTA", seq_len=4), ACGT_ARRAY)
+
+
+def test_dna_1hot_lowercase():
+    assert np.array_equal(dna.dna_1hot("acgt"), ACGT_ARRAY)
+
+
+def test_dna_1hot_batch():
+    seqs = ["ACGT", "ACNGTA", "GA"]
+    seqs_1hot = dna.dna_1hot_batch(seqs, seq_len=5, n_uniform=True)
+    assert seqs_1hot.shape == (3, 5, 4)
+    assert seqs_1hot.dtype == np.float16
+    for si, seq in enumerate(seqs):
+        seq_1hot = dna.dna_1hot(seq, seq_len=5, n_uniform=True)
+        assert np.array_equal(seqs_1hot[si], seq_1hot)
+
+
+def test_dna_1hot_batch_seq_len():
+    seqs_1hot = dna.dna_1hot_batch(["ACGT", "ACGT"])
+    assert seqs_1hot.shape == (2, 4, 4)
+    assert np.array_equal(seqs_1hot[1], ACGT_ARRAY)
+    with pytest.raises(ValueError):
+        dna.dna_1hot_batch(["ACGT", "ACG"])
+
+
 dna_1hot_index_cases = [
     ("ACGT", np.array([0, 1, 2, 3], dtype="uint8")),
     ("ACNGT", np.array([0, 1, 4, 2, 3], dtype="uint8")),
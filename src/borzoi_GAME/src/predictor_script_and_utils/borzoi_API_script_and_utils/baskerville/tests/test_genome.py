@@ -0,0 +1,107 @@
+import gzip
+
+import numpy as np
+import pytest
+
+from baskerville import dna
+from baskerville import genome
+
+fasta_file = "tests/data/hg38_1m.fa.gz"
+
+FASTA_CHROMS = {"chrA": "ACGTNacgtnRY" * 5 + "AC", "chrB": "ggccAATT"}
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    fasta = tmp_path / "genome.fa"
+    with open(fasta, "w") as fasta_open:
+        for chrom, seq in FASTA_CHROMS.items():
+            print(">%s description" % chrom, file=fasta_open)
+            for i in range(0, len(seq), 10):
+                print(seq[i : i + 10], file=fasta_open)
+    genome.build_genome_store(str(fasta), str(tmp_path / "store"))
+    return str(tmp_path / "store")
+
+
+def test_build_genome_store(store_dir):
+    genome_store = genome.GenomeStore(store_dir)
+    assert genome_store.chrom_lens() == {k: len(v) for k, v in FASTA_CHROMS.items()}
+    for chrom, seq in FASTA_CHROMS.items():
+        assert genome_store.seq(chrom, 0, len(seq)) == "".join(
+            nt if nt in "ACGT" else "N" for nt in seq.upper()
+        )
+
+
+def test_build_genome_store_gzip_chroms(tmp_path):
+    fasta = tmp_path / "genome.fa.gz"
+    with gzip.open(fasta, "wt") as fasta_open:
+        for chrom, seq in FASTA_CHROMS.items():
+            print(">%s\n%s" % (chrom, seq), file=fasta_open)
+    chrom_lens = genome.build_genome_store(
+        str(fasta), str(tmp_path / "store"), chroms=["chrB"]
+    )
+    assert chrom_lens == {"chrB": len(FASTA_CHROMS["chrB"])}
+    assert genome.GenomeStore(str(tmp_path / "store")).seq("chrB", 0, 4) == "GGCC"
+
+
+def test_index_view(store_dir):
+    genome_store = genome.GenomeStore(store_dir)
+    seq_index = genome_store.index("chrA", 3, 13)
+    assert isinstance(seq_index, np.memmap)
+    np.testing.assert_array_equal(
+        seq_index, dna.dna_index_array(FASTA_CHROMS["chrA"][3:13])
+    )
+
+
+@pytest.mark.parametrize("start,end", [(-3, 5), (60, 66), (-2, 70), (10, 20)])
+def test_fetch_and_pad(store_dir, start, end):
+    genome_store = genome.GenomeStore(store_dir)
+    seq = FASTA_CHROMS["chrA"].upper()
+    padded = "N" * max(0, -start) + seq[max(0, start) : end]
+    padded += "N" * (end - start - len(padded))
+    assert genome_store.seq("chrA", start, end) == "".join(
+        nt if nt in "ACGT" else "N" for nt in padded
+    )
+    assert genome_store.fetch("chrA", start, end) == genome_store.seq(
+        "chrA", max(0, start), min(end, len(seq))
+    )
+
+
+@pytest.mark.parametrize("n_uniform", [False, True])
+def test_one_hot(store_dir, n_uniform):
+    genome_store = genome.GenomeStore(store_dir)
+    seq_1hot = genome_store.one_hot("chrA", -4, 20, n_uniform=n_uniform)
+    expected = dna.dna_1hot(
+        "N" * 4 + FASTA_CHROMS["chrA"][:20], n_uniform=n_uniform
+    )
+    assert seq_1hot.dtype == expected.dtype
+    np.testing.assert_array_equal(seq_1hot, expected)
+
+
+def test_one_hot_batch(store_dir):
+    genome_store = genome.GenomeStore(store_dir)
+    intervals = [("chrA", 0, 8), ("chrB", 0, 8), ("chrB", 4, 12)]
+    expected = dna.dna_1hot_batch(
+        [genome_store.seq(chrom, start, end) for chrom, start, end in intervals]
+    )
+    np.testing.assert_array_equal(genome_store.one_hot_batch(intervals), expected)
+
+    # write into a preallocated float32 batch
+    out = np.ones((3, 8, 4), dtype="float32")
+    genome_store.one_hot_batch(intervals, out=out)
+    np.testing.assert_array_equal(out, expected.astype("float32"))
+
+    with pytest.raises(ValueError):
+        genome_store.one_hot_batch([("chrA", 0, 8), ("chrB", 0, 4)])
+
+
+def test_fasta_genome_store(tmp_path):
+    genome.build_genome_store(fasta_file, str(tmp_path))
+    genome_store = genome.GenomeStore(str(tmp_path))
+    assert genome_store.chrom_lens() == {"chr1": 1000000}
+
+    with gzip.open(fasta_file, "rt") as fasta_open:
+        seq = "".join(line.strip() for line in fasta_open if not line.startswith(">"))
+    np.testing.assert_array_equal(
+        genome_store.one_hot("chr1", 500000, 510000), dna.dna_1hot(seq[500000:510000])
+    )
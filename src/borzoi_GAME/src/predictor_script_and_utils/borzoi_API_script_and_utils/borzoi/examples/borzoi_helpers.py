@@ -10,6 +10,7 @@ import tensorflow as tf
 import baskerville
 from baskerville import seqnn
 from baskerville import dna
+from baskerville import genome
 
 import pysam
 
@@ -35,6 +36,10 @@ import gc
 
 # Make one-hot coded sequence
 def make_seq_1hot(genome_open, chrm, start, end, seq_len):
+    # Pre-encoded genome store (see baskerville.genome): no FASTA text to encode
+    if isinstance(genome_open, genome.GenomeStore):
+        return genome_open.one_hot(chrm, start, max(end, start + seq_len))
+
     if start < 0:
         seq_dna = "N" * (-start) + genome_open.fetch(chrm, 0, end)
     else:
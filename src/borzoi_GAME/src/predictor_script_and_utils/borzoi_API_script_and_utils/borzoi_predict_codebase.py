@@ -1,11 +1,15 @@
 # borzoiAPI_predictions.py
 import os
 import sys
+import copy
 import json
 import tqdm
+import queue
+import threading
+import functools
 import numpy as np
 import pandas as pd
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 BORZOI_SCRIPT_DIR = os.path.dirname(__file__)
 
@@ -15,9 +19,11 @@ from borzoi_utils import *
 sys.path.append(f"{BORZOI_SCRIPT_DIR}/baskerville/src")
 from baskerville import seqnn
 from baskerville import dna
+from baskerville.helpers.tflite_quantized_model import QuantizedModel, quantize_model
 
 sys.path.append(f"{BORZOI_SCRIPT_DIR}/borzoi/examples")
 from borzoi_helpers import *
+import tensorflow as tf
 
 params_file = f"{BORZOI_SCRIPT_DIR}/borzoi/examples/params_pred.json"
 targets_file = f"{BORZOI_SCRIPT_DIR}/borzoi/examples/targets_human.txt"
@@ -31,24 +37,72 @@ saved_models_path = f"{BORZOI_SCRIPT_DIR}/borzoi/examples/saved_models"
 
 # Sequence parameters
 seq_len = 524288
+# Output geometry of the heads (checked against SeqNN.model_strides and
+# SeqNN.target_crops when the ensemble is loaded)
+bin_size = 32         # Model stride: resolution of the output bins
+target_crop = 16      # Bins cropped on each side of the window
+target_length = 16352 # Output bins per window
 n_folds = 4  # Use all 4 model folds. Can vary between 1 and 4 (inclusive).
 rc = True    # Reverse-complement predictions
 
+# Sequences per prediction batch (and per shared batch across requests). A single
+# "all_tracks" prediction is 16352 x 7611 values, so those run one sequence at a time.
+BATCH_SIZE = int(os.environ.get("BORZOI_BATCH_SIZE", 4))
+# Encoded batches prepared ahead of the model by the encoding thread
+PREFETCH_BATCHES = int(os.environ.get("BORZOI_PREFETCH_BATCHES", 2))
+# Memory ceiling (MiB) for encoded batches in flight; each sequence takes 2 MiB
+ENCODE_MEMORY_MB = int(os.environ.get("BORZOI_ENCODE_MEMORY_MB", 512))
+# Set BORZOI_WARMUP=0 to skip the warmup pass after loading the ensemble
+WARMUP = os.environ.get("BORZOI_WARMUP", "1") != "0"
+# Sliced heads kept per unique track set; 0 always runs the full 7611-track heads
+SLICE_CACHE_SIZE = int(os.environ.get("BORZOI_SLICE_CACHE_SIZE", 16))
+# Set BORZOI_FUSED_AGGREGATION=0 to average folds, tracks and bins on the host instead
+FUSED_AGGREGATION = os.environ.get("BORZOI_FUSED_AGGREGATION", "1") != "0"
+# Sequences longer than seq_len are predicted in overlapping tiles and stitched;
+# set BORZOI_TILE_LONG_SEQUENCES=0 to center trim them to seq_len instead
+TILE_LONG_SEQUENCES = os.environ.get("BORZOI_TILE_LONG_SEQUENCES", "1") != "0"
+# Overlap (bp) between consecutive tiles; half of it is dropped from each tile edge.
+# Tiles must overlap by at least their cropped edges, or their output bins leave gaps
+MIN_TILE_OVERLAP = 2 * target_crop * bin_size
+TILE_OVERLAP = max(MIN_TILE_OVERLAP, int(os.environ.get("BORZOI_TILE_OVERLAP", 131072)))
+# Inference precision of the folds: "float32", "bfloat16" or "float16" (weights
+# stored and computed in half precision, half the float32 weight memory) or
+# "int8" (TFLite dynamic-range quantized weights for CPU nodes, see `QuantizedFold`)
+PRECISION = os.environ.get("BORZOI_PRECISION", "float32").lower()
+PRECISIONS = ("float32", "bfloat16", "float16", "int8")
+# Directory of the exported int8 folds; must be writable the first time they are exported
+QUANTIZED_DIR = os.environ.get("BORZOI_QUANTIZED_DIR", "")
+
 # 1. Load model parameters
 def load_model_parameters():
     with open(params_file) as params_open:
         params = json.load(params_open)
     return params['model'], params['train']
 
-# 2. Load target files
+# 2. Load target files (read once per process; callers must not modify them)
+@functools.lru_cache(maxsize=None)
 def load_targets():
     targets_df = pd.read_csv(targets_file, index_col=0, sep='\t')
     simplified_targets_df = pd.read_csv(simplified_targets_file, index_col=0, sep='\t')
     return targets_df, simplified_targets_df
 
+# Track selection index over the simplified targets (built once per process)
+@functools.lru_cache(maxsize=None)
+def load_track_index():
+    _, simplified_targets_df = load_targets()
+    return TrackIndex(simplified_targets_df)
+
+def check_output_geometry(seqnn_model):
+    """Check that the output bins of a restored fold match `bin_size`, `target_crop` and `target_length`."""
+    geometry = (seqnn_model.model_strides[0], seqnn_model.target_crops[0],
+                seqnn_model.target_lengths[0])
+    if geometry != (bin_size, target_crop, target_length):
+        raise ValueError(f"Unexpected Borzoi output geometry (stride, crop, length): {geometry}")
+
 # 3. Not filtering target index and slice_pair (Same as OG Borzoi codebase)
-def load_target_index():
-    targets_df, _ = load_targets()
+def load_target_index(targets_df=None):
+    if targets_df is None:
+        targets_df, _ = load_targets()
     target_index = targets_df.index
     
     # Load strand pairing for reverse complement predictions
@@ -62,23 +116,417 @@ def load_target_index():
     return target_index, slice_pair
 
 # 4. Initialize model ensemble
-def initilize_model_ensemble(target_index, slice_pair, params_model):
-    models = []
-    for fold_ix in range(n_folds) :
+def fold_model_file(fold_ix):
+    return f"{saved_models_path}/f3c{str(fold_ix)}/train/model0_best.h5"
+
+def quantized_fold_file(fold_ix):
+    directory = QUANTIZED_DIR or os.path.dirname(fold_model_file(fold_ix))
+    return f"{directory}/f3c{fold_ix}_model0_best.int8.tflite"
+
+class QuantizedFold:
+    """
+    One fold exported as a TFLite model with int8 (dynamic-range quantized) weights.
+
+    The exported graph is the fold's reverse complement ensemble, so it is
+    called like a restored `SeqNN` (float32 numpy predictions of all 7611
+    tracks) while keeping a quarter of the float32 weights in memory. It has
+    no Keras graph, so requests use the full heads and host aggregation;
+    `track_columns` slices the output of each sequence as it is predicted.
+
+    Args:
+        seqnn_model (SeqNN): Fold built by `build_fold`; restored only if
+            `tflite_file` has not been exported yet.
+        tflite_file (str): Exported model (see `quantized_fold_file`).
+    """
+
+    def __init__(self, seqnn_model, tflite_file):
+        if not os.path.isfile(tflite_file):
+            print(f"Exporting the int8 fold to {tflite_file}...")
+            quantize_model(seqnn_model.ensemble if seqnn_model.ensemble is not None
+                           else seqnn_model.model, tflite_file)
+        self.seq_length = seqnn_model.seq_length
+        self.model_strides = seqnn_model.model_strides
+        self.target_crops = seqnn_model.target_crops
+        self.target_lengths = seqnn_model.target_lengths
+        self.model = QuantizedModel(tflite_file)
+
+    def num_targets(self):
+        return self.model.output_shape[-1]
 
-        model_file = f"{saved_models_path}/f3c{str(fold_ix)}/train/model0_best.h5"
+    def __call__(self, x, track_columns=None):
+        return self.model(x, track_columns)
 
+def build_fold(fold_ix, target_index, slice_pair, params_model, precision=PRECISION):
+    """
+    Restore one fold with its reverse complement ensemble at an inference precision.
+
+    Args:
+        fold_ix (int): Fold (model replicate) index.
+        target_index (pd.Index): Tracks of the heads (see `load_target_index`).
+        slice_pair (np.ndarray): Strand partner of every track.
+        params_model (dict): Model parameters (see `load_model_parameters`).
+        precision (str): One of PRECISIONS (see `PRECISION`).
+
+    Returns:
+        SeqNN or QuantizedFold: The fold, ready for `predict_tracks`.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown Borzoi precision '{precision}'. Please choose from {list(PRECISIONS)}")
+    quantized_file = quantized_fold_file(fold_ix) if precision == "int8" else None
+
+    previous_policy = tf.keras.mixed_precision.global_policy()
+    if precision in ("bfloat16", "float16"):
+        # A plain (not "mixed_") policy creates the variables in half precision;
+        # restoring casts the float32 weights of the .h5 file into them
+        tf.keras.mixed_precision.set_global_policy(precision)
+    try:
         seqnn_model = seqnn.SeqNN(params_model)
-        seqnn_model.restore(model_file, 0)
-        seqnn_model.build_slice(target_index)
-        if rc:
-            seqnn_model.strand_pair.append(slice_pair)
-        #seqnn_model.build_ensemble(rc, '0')
-        seqnn_model.build_ensemble(rc, [0])
-        models.append(seqnn_model)
+        # Already exported int8 folds only need the model geometry
+        if quantized_file is None or not os.path.isfile(quantized_file):
+            seqnn_model.restore(fold_model_file(fold_ix), 0)
+            seqnn_model.build_slice(target_index)
+            if rc:
+                seqnn_model.strand_pair.append(slice_pair)
+            #seqnn_model.build_ensemble(rc, '0')
+            seqnn_model.build_ensemble(rc, [0])
+    finally:
+        tf.keras.mixed_precision.set_global_policy(previous_policy)
+
+    if quantized_file is not None:
+        fold = QuantizedFold(seqnn_model, quantized_file)
+        # Free the float32 graph before the next fold is built
+        del seqnn_model
+        tf.keras.backend.clear_session()
+        return fold
+    return seqnn_model
+
+def initilize_model_ensemble(target_index, slice_pair, params_model, precision=PRECISION):
+    models = []
+    for fold_ix in range(n_folds) :
+        models.append(build_fold(fold_ix, target_index, slice_pair, params_model, precision))
         
     return models
 
+class BorzoiEnsemble:
+    """
+    Borzoi fold ensemble, targets tables and strand pairs, loaded once per process.
+
+    Restoring the folds builds four 524 kb Keras graphs, which takes minutes,
+    so the Predictor loads one `BorzoiEnsemble` at start-up and reuses it for
+    every request (see `get_borzoi_ensemble`). `ready` is set once loading
+    (and the warmup pass) has finished, or has failed with `load_error`.
+
+    Args:
+        precision (str): Inference precision of the folds (see `PRECISION`).
+    """
+
+    def __init__(self, precision=PRECISION):
+        self.precision = precision
+        self.ready = threading.Event()
+        self.load_error = None
+        self.params_model = None
+        self.targets_df = None
+        self.simplified_targets_df = None
+        self.target_index = None
+        self.track_index = None
+        self.slice_pair = None
+        self.models = None
+        # {track indices: (sliced fold models, track columns)}, least recently used first
+        self.sliced_models = OrderedDict()
+        # {(task tracks, readout): (aggregation head, averaged tasks, full tasks)}
+        self.aggregation_heads = OrderedDict()
+        self.slice_lock = threading.Lock()
+
+    def load(self, warmup=WARMUP):
+        """
+        Restore all folds, then optionally run a warmup pass, and set `ready`.
+
+        Args:
+            warmup (bool): If True, predict one empty sequence with every fold
+                so the first request does not pay for graph tracing.
+        """
+        try:
+            print("Loading the Borzoi model ensemble...")
+            self.params_model, _ = load_model_parameters()
+            self.targets_df, self.simplified_targets_df = load_targets()
+            self.target_index, self.slice_pair = load_target_index(self.targets_df)
+            self.track_index = load_track_index()
+            print(f"Inference precision: {self.precision}")
+            self.models = initilize_model_ensemble(self.target_index, self.slice_pair,
+                                                   self.params_model, self.precision)
+            check_output_geometry(self.models[0])
+            if warmup:
+                self.warmup()
+            print("Borzoi model ensemble is ready.")
+        except Exception as e:
+            self.load_error = f"The Borzoi model ensemble could not be loaded: {e}"
+            print(self.load_error)
+        finally:
+            self.ready.set()
+
+    @property
+    def quantized(self):
+        """int8 folds are TFLite models: no sliced heads or fused aggregation."""
+        return self.precision == "int8"
+
+    def warmup(self):
+        """Predict one all-N sequence with every fold."""
+        print("Warming up the Borzoi model ensemble...")
+        predict_tracks(self.models, np.zeros((seq_len, 4), dtype="float32"))
+
+    def track_models(self, track_indices):
+        """
+        Fold models that predict `track_indices`, sliced once per unique track set.
+
+        Up to SLICE_CACHE_SIZE sliced ensembles are cached. Track sets that
+        cover most tracks (e.g. "all_tracks") and int8 folds use the full heads.
+
+        Args:
+            track_indices (list): Sorted unique track indices of a request.
+
+        Returns:
+            tuple: (models, track_columns), where `track_columns` selects the
+                requested tracks, in order, from the last axis of the predictions.
+        """
+        track_slice, slice_strand_pair, track_columns = strand_closed_slice(track_indices,
+                                                                            self.slice_pair)
+        if (self.quantized or SLICE_CACHE_SIZE <= 0
+                or 2 * len(track_slice) > len(self.target_index)):
+            return self.models, list(track_indices)
+
+        key = tuple(track_indices)
+        with self.slice_lock:
+            if key in self.sliced_models:
+                self.sliced_models.move_to_end(key)
+                return self.sliced_models[key]
+            print(f"Building sliced heads for {len(track_slice)} tracks...")
+            sliced = ([build_sliced_fold(seqnn_model, track_slice, slice_strand_pair)
+                       for seqnn_model in self.models], track_columns)
+            self.sliced_models[key] = sliced
+            if len(self.sliced_models) > SLICE_CACHE_SIZE:
+                self.sliced_models.popitem(last=False)
+            return sliced
+
+    def aggregation_head(self, task_to_indices, unique_track_indices, is_point_readout=False):
+        """
+        Fused averaging head (see `build_aggregation_head`) for a track selection and readout.
+
+        Built on the sliced heads of `unique_track_indices` and cached like them.
+
+        Args:
+            task_to_indices (dict): Track indices of each task (see `collect_task_tracks`).
+            unique_track_indices (list): Sorted union of all task track indices.
+            is_point_readout (bool): If True, average bins to a single value.
+
+        Returns:
+            tuple: (head, mean_tasks, full_tasks): the tf.keras.Model, the
+                track-averaged task keys in output column order and the
+                "all_tracks" task keys in output order.
+        """
+        key = (tuple((task_key, tuple(indices)) for task_key, indices in task_to_indices.items()),
+               is_point_readout)
+        with self.slice_lock:
+            if key in self.aggregation_heads:
+                self.aggregation_heads.move_to_end(key)
+                return self.aggregation_heads[key]
+
+        models, track_columns = self.track_models(unique_track_indices)
+        column_of = dict(zip(unique_track_indices, track_columns))
+        mean_tasks = [task_key for task_key in task_to_indices if not is_all_tracks_task(task_key)]
+        full_tasks = [task_key for task_key in task_to_indices if is_all_tracks_task(task_key)]
+
+        task_weights = None
+        if mean_tasks:
+            task_weights = np.zeros((models[0].num_targets(), len(mean_tasks)), dtype='float32')
+            for k, task_key in enumerate(mean_tasks):
+                indices = task_to_indices[task_key]
+                for index in indices:
+                    task_weights[column_of[index], k] += 1 / len(indices)
+        full_task_columns = [[column_of[index] for index in task_to_indices[task_key]]
+                             for task_key in full_tasks]
+
+        print(f"Building fused averaging head for tasks: {list(task_to_indices)}")
+        aggregation = (build_aggregation_head(models, task_weights, full_task_columns,
+                                              is_point_readout),
+                       mean_tasks, full_tasks)
+        with self.slice_lock:
+            self.aggregation_heads[key] = aggregation
+            if len(self.aggregation_heads) > max(SLICE_CACHE_SIZE, 1):
+                self.aggregation_heads.popitem(last=False)
+        return aggregation
+
+    def wait_ready(self, timeout=None):
+        """
+        Wait until the ensemble is loaded.
+
+        Args:
+            timeout (float, optional): Seconds to wait. Defaults to no limit.
+
+        Returns:
+            BorzoiEnsemble: self, ready to predict.
+
+        Raises:
+            RuntimeError: If loading failed or did not finish within `timeout`.
+        """
+        if not self.ready.wait(timeout):
+            raise RuntimeError("The Borzoi model ensemble is still loading.")
+        if self.load_error:
+            raise RuntimeError(self.load_error)
+        return self
+
+# The resident ensemble of this process
+_borzoi_ensemble = BorzoiEnsemble()
+_borzoi_ensemble_lock = threading.Lock()
+_borzoi_ensemble_loading = False
+
+def get_borzoi_ensemble(timeout=None):
+    """
+    Return the resident Borzoi ensemble, loading it on first use.
+
+    Threads calling this while the ensemble loads wait for it to be ready.
+
+    Args:
+        timeout (float, optional): Seconds to wait for loading to finish.
+
+    Returns:
+        BorzoiEnsemble: The loaded ensemble.
+
+    Raises:
+        RuntimeError: If loading failed or did not finish within `timeout`.
+    """
+    global _borzoi_ensemble_loading
+    with _borzoi_ensemble_lock:
+        load = not _borzoi_ensemble_loading
+        _borzoi_ensemble_loading = True
+    if load:
+        _borzoi_ensemble.load()
+    return _borzoi_ensemble.wait_ready(timeout)
+
+def borzoi_ensemble_ready():
+    """
+    Returns:
+        bool: True once the resident ensemble is loaded and can predict.
+    """
+    return _borzoi_ensemble.ready.is_set() and _borzoi_ensemble.load_error is None
+
+# 4.1. Sliced heads that only compute the requested tracks
+def strand_closed_slice(track_indices, slice_pair):
+    """
+    Close a track selection under strand pairing.
+
+    Reverse complement predictions swap every stranded track with its
+    partner, so a sliced head must also compute the partners of the
+    requested tracks.
+
+    Args:
+        track_indices (list): Requested track indices.
+        slice_pair (np.ndarray): Strand partner of every track (see `load_target_index`).
+
+    Returns:
+        tuple: (track_slice, slice_strand_pair, track_columns), where
+            track_slice is the sorted list of requested tracks and their partners,
+            slice_strand_pair is the strand partner of every sliced track as a
+            position in the slice, and track_columns is the position of each
+            requested track in the slice.
+    """
+    track_slice = sorted(set(track_indices).union(int(slice_pair[t]) for t in track_indices))
+    slice_position = {track: i for i, track in enumerate(track_slice)}
+    slice_strand_pair = np.array([slice_position[int(slice_pair[t])] for t in track_slice],
+                                 dtype='int32')
+    track_columns = [slice_position[t] for t in track_indices]
+    return track_slice, slice_strand_pair, track_columns
+
+def build_sliced_fold(seqnn_model, track_slice, slice_strand_pair):
+    """
+    Build a copy of one restored fold whose head only computes `track_slice`.
+
+    Like `SeqNN.build_slice`, but the kernel and bias of the final Dense layer
+    are sliced instead of gathering its output, so the head, the reverse
+    complement switch and the host transfer only handle the sliced tracks.
+    The trunk and its weights are shared with `seqnn_model`.
+
+    Args:
+        seqnn_model (SeqNN): Restored fold (see `initilize_model_ensemble`).
+        track_slice (list): Track indices computed by the sliced head.
+        slice_strand_pair (np.ndarray): Strand partners within the slice.
+
+    Returns:
+        SeqNN: Sliced fold with its own reverse complement ensemble.
+    """
+    head_dense = [layer for layer in seqnn_model.models[0].layers
+                  if isinstance(layer, tf.keras.layers.Dense)][-1]
+    kernel, bias = head_dense.get_weights()
+
+    sequence = tf.keras.Input(shape=(seqnn_model.seq_length, 4), name="sequence")
+    # Same dtype policy as the full head, so half-precision folds keep half-precision weights
+    sliced_dense = tf.keras.layers.Dense(len(track_slice), activation=head_dense.activation,
+                                         dtype=head_dense.dtype_policy)
+    predictions = sliced_dense(seqnn_model.model_trunk(sequence))
+    sliced_dense.set_weights([kernel[:, track_slice], bias[track_slice]])
+
+    sliced_model = copy.copy(seqnn_model)
+    sliced_model.model = tf.keras.Model(inputs=sequence, outputs=predictions)
+    sliced_model.strand_pair = [slice_strand_pair] if rc else []
+    sliced_model.ensemble = None
+    sliced_model.build_ensemble(rc, [0])
+    return sliced_model
+
+# 4.2. Fold, track and bin averaging in one graph
+def is_all_tracks_task(task_key):
+    """"all_tracks" tasks return every track instead of their mean."""
+    return task_key[0].lower() == "all_tracks"
+
+def build_aggregation_head(fold_models, task_weights=None, full_task_columns=(),
+                           is_point_readout=False):
+    """
+    Build one graph that averages the folds, then each task's tracks, then optionally the bins.
+
+    Like `SeqNN.build_sad`, the reductions run in the graph, so only the final
+    per-task arrays are copied to the host. Track means of all tasks are
+    computed at once as a product with the (tracks x tasks) `task_weights`.
+
+    Args:
+        fold_models (list): SeqNN folds, full or sliced (see `BorzoiEnsemble.track_models`).
+        task_weights (np.ndarray, optional): (fold outputs, tasks) averaging weights.
+        full_task_columns (list): Output columns of each task that is not track averaged.
+        is_point_readout (bool): If True, also average the bins of the averaged tasks.
+
+    Returns:
+        tf.keras.Model: float16 outputs: the track means (B, 16352, tasks), or
+            (B, tasks) for point readouts, if `task_weights` is given, then one
+            (B, 16352, columns) output per entry of `full_task_columns`.
+    """
+    sequence = tf.keras.Input(shape=(fold_models[0].seq_length, 4), name="sequence")
+    fold_preds = [(fold.ensemble if fold.ensemble is not None else fold.model)(sequence)
+                  for fold in fold_models]
+    if len(fold_preds) > 1:
+        preds = tf.keras.layers.Average()(fold_preds)
+    else:
+        preds = fold_preds[0]
+
+    outputs = []
+    if task_weights is not None:
+        task_means = tf.tensordot(preds, tf.constant(task_weights, dtype=preds.dtype), axes=1)
+        if is_point_readout:
+            task_means = tf.reduce_mean(task_means, axis=1)
+        outputs.append(tf.cast(task_means, tf.float16))
+    for columns in full_task_columns:
+        if list(columns) != list(range(preds.shape[-1])):
+            task_preds = tf.gather(preds, columns, axis=-1)
+        else:
+            task_preds = preds
+        outputs.append(tf.cast(task_preds, tf.float16))
+    return tf.keras.Model(inputs=sequence, outputs=outputs)
+
+def load_model_ensemble():
+    """
+    Return the fold models of the resident ensemble (see `get_borzoi_ensemble`).
+
+    Returns:
+        list: `n_folds` SeqNN models ready for `predict_tracks`.
+    """
+    return get_borzoi_ensemble().models
+
 # 5. Prediction Function -- Runs Once and Filters Predictions Based on Request Type
 def predict_borzoi(sequences, request_tasks, is_point_readout=False):
     """
@@ -96,17 +544,44 @@ def predict_borzoi(sequences, request_tasks, is_point_readout=False):
             {task_key: {sequence_id, [16352 predictions, averaged across desired tracks]}}
             
             For "all_tracks" tasks, predictions are not averaged over tracks
-            and the full prediction matrix is returned (shape [1, 16352, 7611 tracks]).
+            and the full prediction matrix is returned (shape [16352, 7611 tracks]).
+
+            Sequences longer than 524288 bp are tiled, so their track
+            predictions have more bins (see `stitch_tiles`).
+
+            Predictions are float16 numpy arrays (0-d for "point" readouts);
+            use `round_predictions` to convert them to JSON lists.
     
     """
     print("Running Borzoi Model Predictions on ALL tracks before filtering...")
     
-    # Load parameters, target indices, and models
-    params_model, _ = load_model_parameters()
-    target_index, slice_pair = load_target_index()
-    models = initilize_model_ensemble(target_index, slice_pair, params_model)
-    
+    # Resident ensemble, loaded once per process
+    ensemble = get_borzoi_ensemble()
+
     # 5.1. Collect all required track indices
+    task_tracks = collect_task_tracks(request_tasks)
+    if isinstance(task_tracks, str):
+        return task_tracks
+    task_to_indices, unique_track_indices = task_tracks
+
+    # 5.2. Process each sequence and run prediction, on heads sliced to the required tracks
+    return predict_ensemble(ensemble, sequences, task_to_indices,
+                            unique_track_indices, is_point_readout)
+
+# 5.1. Collect all required track indices
+def collect_task_tracks(request_tasks):
+    """
+    Select the tracks needed by each requested (type, cell type) task.
+
+    Args:
+        request_tasks (set): A set of strings (request_type, cell_type) pairs.
+
+    Returns:
+        tuple or str: (task_to_indices, unique_track_indices), where
+            task_to_indices maps each task to its track indices and
+            unique_track_indices is the sorted union of them; or an
+            error message string if no tracks could be selected.
+    """
     print("Collecting track indices for required tasks...")
     task_to_indices = {} # Dictionary to store required track indices from each task
     # Example: {('expression', 'H1'): [1, 3], 
@@ -126,20 +601,20 @@ def predict_borzoi(sequences, request_tasks, is_point_readout=False):
     
     # --- ADDITION: Early bail-out on no-matches ---
 
+    # Indexed, memoized track selection (see `TrackIndex`)
+    track_index = load_track_index()
     for request_type, cell_type in request_tasks:
         print(f"Performing track selection for {request_type} and {cell_type}...")
         # Get track indices of desired tracks for filtering predictions
-        targets_df, simplified_targets_df = load_targets()
-        filtered_tracks = filter_evaluator_request(simplified_targets_df,
-                                                request_type, cell_type)
+        filtered_tracks = track_index.resolve(request_type, cell_type)
         
         # NEW: if filtered_tracks returns a string, it is an error message -- bail-out!
         if isinstance(filtered_tracks, str):
             # Just return the error as a string
             return filtered_tracks
             
-        # Otherwise, proceed as before -- knowing filtered_tracks is a DataFrame
-        track_indices = filtered_tracks.index.tolist()
+        # Otherwise, proceed as before -- knowing filtered_tracks is a tuple of track ids
+        track_indices = list(filtered_tracks)
     
         if not track_indices:
             print(f"No matching tracks found for {request_type} and {cell_type}. Skipping...")
@@ -169,54 +644,478 @@ def predict_borzoi(sequences, request_tasks, is_point_readout=False):
         print(f"Unique required track indices for this task: ALL {len(unique_track_indices)} tracks.")
     else:
         print(f"Unique required track indices for all tasks: {unique_track_indices}")
-    
-    # 5.2. Process each sequence and run prediction
+
+    return task_to_indices, unique_track_indices
+
+# 5.2. Encode sequences into batches ahead of the model
+def iter_encoded_batches(sequences, batch_size=BATCH_SIZE, max_prefetch=PREFETCH_BATCHES,
+                         memory_limit_mb=ENCODE_MEMORY_MB):
+    """
+    One-hot encode and pad sequences into batches in a background thread.
+
+    Up to `max_prefetch` encoded batches wait in a bounded queue while the
+    model predicts the current one, so encoding overlaps with inference.
+    The batch size and prefetch depth are lowered so that the batches in
+    flight (queued plus the one being predicted) fit in `memory_limit_mb`;
+    at least one batch is always prefetched.
+
+    Args:
+        sequences (dict): {sequence_id: sequence}.
+        batch_size (int): Sequences per batch.
+        max_prefetch (int): Maximum number of encoded batches waiting for the model.
+        memory_limit_mb (int): Memory ceiling for the encoded batches, in MiB.
+
+    Yields:
+        tuple: (seq_ids, encoded_batch), encoded_batch being a
+            (len(seq_ids), 524288, 4) one-hot array.
+    """
+    # Number of sequences that fit under the ceiling (1 byte per base and channel)
+    seqs_in_memory = max(1, (memory_limit_mb << 20) // (seq_len * 4))
+    batch_size = max(1, min(batch_size, seqs_in_memory))
+    max_prefetch = max(1, min(max_prefetch, seqs_in_memory // batch_size - 1))
+
+    seq_ids = list(sequences)
+    batches = queue.Queue(maxsize=max_prefetch)
+    stop = threading.Event()
+
+    def encode():
+        try:
+            for start in range(0, len(seq_ids), batch_size):
+                if stop.is_set():
+                    return
+                batch_ids = seq_ids[start:start + batch_size]
+                batches.put((batch_ids, dna.dna_1hot_batch([sequences[seq_id] for seq_id in batch_ids],
+                                                           seq_len=seq_len)))
+            batches.put(None)
+        except Exception as e:
+            batches.put(e)
+
+    encoder = threading.Thread(target=encode, name="borzoi-encoder", daemon=True)
+    encoder.start()
+    try:
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+    finally:
+        # Unblock the encoder if the consumer stopped early
+        stop.set()
+        while encoder.is_alive():
+            try:
+                batches.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+def predict_tracks_batch(models, encoded_batch, track_columns=None):
+    """
+    Batched `predict_tracks`: run every fold on a batch of encoded sequences.
+
+    Args:
+        models (list): Fold models (see `BorzoiEnsemble.track_models`).
+        encoded_batch (np.ndarray): (B, seq_len, 4) encoded sequences.
+        track_columns (list, optional): Output columns to keep. Each fold's
+            output is sliced before the folds are stacked, so the full heads
+            never hold more than one fold's 7611 tracks. Defaults to all columns.
+
+    Returns:
+        np.ndarray: float16 predictions of shape (B, n_folds, 16352, tracks).
+    """
+    fold_predictions = []
+    for model in models:
+        if isinstance(model, QuantizedFold):
+            # int8 folds always run the full heads; slice sequence by sequence
+            prediction = model(encoded_batch, track_columns)
+        else:
+            prediction = model(encoded_batch)
+            if track_columns is not None:
+                prediction = prediction[..., track_columns]
+        fold_predictions.append(prediction[:, None, ...].astype("float16"))
+    return np.concatenate(fold_predictions, axis=1)
+
+# 5.3. Predict each distinct model input once
+def final_input_key(sequence):
+    """
+    Key of the model input a sequence is encoded to.
+
+    `dna.dna_1hot` center trims sequences longer than 524288 bp (unless they
+    are tiled) and ignores case, so sequences with the same key get the same
+    prediction.
+    """
+    if len(sequence) > seq_len and not TILE_LONG_SEQUENCES:
+        seq_trim = (len(sequence) - seq_len) // 2
+        sequence = sequence[seq_trim:seq_trim + seq_len]
+    return sequence.upper()
+
+def dedup_sequences(sequences):
+    """
+    Keep one sequence ID per distinct model input.
+
+    Args:
+        sequences (dict): {sequence_id: sequence}.
+
+    Returns:
+        unique_sequences (dict): {sequence_id: sequence} for the first ID of every input.
+        representative (dict): {sequence_id: ID in `unique_sequences` with the same input}.
+    """
+    first_id = {}
+    unique_sequences = {}
+    representative = {}
+    for seq_id, sequence in sequences.items():
+        key = final_input_key(sequence)
+        if key not in first_id:
+            first_id[key] = seq_id
+            unique_sequences[seq_id] = sequence
+        representative[seq_id] = first_id[key]
+    return unique_sequences, representative
+
+def tile_sequence(sequence, overlap=TILE_OVERLAP):
+    """
+    Split a sequence longer than the model window into overlapping windows.
+
+    The sequence is padded (with N, encoded as zeros) to a whole number of
+    bins, and tiles start every `seq_len - overlap` bp (rounded down to the
+    bin size), the last one ending at the end of the sequence, so the outputs
+    of all tiles fall on one grid of 32 bp bins.
+
+    Args:
+        sequence (str): Sequence longer than 524288 bp.
+        overlap (int): Overlap between consecutive tiles, in bp; raised to
+            MIN_TILE_OVERLAP, so the output bins of consecutive tiles meet.
+
+    Returns:
+        tiles (list): 524288 bp tile sequences.
+        tile_starts (list): Start of each tile in the (padded) sequence.
+    """
+    padded_len = -(-len(sequence) // bin_size) * bin_size
+    sequence = sequence.ljust(padded_len, "N")
+    stride = max(bin_size, (seq_len - max(MIN_TILE_OVERLAP, overlap)) // bin_size * bin_size)
+    tile_starts = list(range(0, padded_len - seq_len, stride)) + [padded_len - seq_len]
+    tiles = [sequence[start:start + seq_len] for start in tile_starts]
+    return tiles, tile_starts
+
+def stitch_tiles(tile_predictions, tile_starts):
+    """
+    Stitch the bin predictions of overlapping tiles into one continuous track.
+
+    Like `snps.stitch_preds`, predictions are concatenated at a split point:
+    each overlap is split at its midpoint, so every bin comes from the tile
+    in which it is furthest from the window edge.
+
+    Args:
+        tile_predictions (list): (16352, ...) predictions of each tile.
+        tile_starts (list): Tile starts from `tile_sequence`.
+
+    Returns:
+        np.ndarray: (n_bins, ...) predictions, bin i covering bp
+            512 + 32 * i to 512 + 32 * (i + 1) of the sequence (see `range_output_bins`).
+    """
+    tile_bins = tile_predictions[0].shape[0]
+    bin_starts = [start // bin_size for start in tile_starts]
+    n_bins = bin_starts[-1] + tile_bins
+    splits = [0] + [(bin_starts[i + 1] + bin_starts[i] + tile_bins) // 2
+                    for i in range(len(bin_starts) - 1)] + [n_bins]
+    return np.concatenate([prediction[splits[i] - bin_starts[i]:splits[i + 1] - bin_starts[i]]
+                           for i, prediction in enumerate(tile_predictions)], axis=0)
+
+def range_output_bins(start, end, sequence_length):
+    """
+    Output bins of a sequence's predictions that overlap a base pair range.
+
+    The sequence is placed in the model window the way `dna.dna_1hot` does
+    (centered padding, or center trimming), or tiled (see `tile_sequence`);
+    output bin i then covers window bp (target_crop + i) * bin_size to
+    (target_crop + i + 1) * bin_size.
+
+    Args:
+        start (int): First bp of the range (0 indexed, in the final sequence).
+        end (int): Last bp of the range (inclusive).
+        sequence_length (int): Length of the final sequence.
+
+    Returns:
+        tuple: (first_bin, end_bin) slice of the predictions; empty if the range
+            only covers cropped or trimmed positions.
+    """
+    if sequence_length > seq_len and TILE_LONG_SEQUENCES:
+        offset = 0
+        padded_len = -(-sequence_length // bin_size) * bin_size
+        n_bins = (padded_len - seq_len) // bin_size + target_length
+    elif sequence_length > seq_len:
+        offset = -((sequence_length - seq_len) // 2)
+        n_bins = target_length
+    else:
+        offset = (seq_len - sequence_length) // 2
+        n_bins = target_length
+    crop_bp = target_crop * bin_size
+    first_bin = max(0, (start + offset - crop_bp) // bin_size)
+    end_bin = min(n_bins, (end + offset - crop_bp) // bin_size + 1)
+    return first_bin, max(first_bin, end_bin)
+
+def predict_inputs(ensemble, sequences, task_to_indices, unique_track_indices,
+                   is_point_readout, batch_size):
+    # Fused (on device) or host aggregation of the ensemble predictions
+    if FUSED_AGGREGATION and not ensemble.quantized:
+        head = ensemble.aggregation_head(task_to_indices, unique_track_indices, is_point_readout)
+        return predict_sequences_fused(head, sequences, batch_size)
+    models, track_columns = ensemble.track_models(unique_track_indices)
+    return predict_sequences(models, sequences, task_to_indices, unique_track_indices,
+                             is_point_readout, track_columns, batch_size)
+
+def predict_tiled(ensemble, sequences, task_to_indices, unique_track_indices,
+                  is_point_readout, batch_size):
+    """
+    Predict sequences longer than the model window tile by tile and stitch them.
+
+    The tiles of all sequences are batched through the ensemble together with
+    the "track" readout; "point" readouts average the stitched bins.
+
+    Returns:
+        task_predictions (dict): {task_key: {sequence_id: np.ndarray}} (see `predict_borzoi`).
+    """
+    tiles = {}
+    tile_starts = {}
+    for seq_id, sequence in sequences.items():
+        seq_tiles, tile_starts[seq_id] = tile_sequence(sequence)
+        for tile_ix, tile in enumerate(seq_tiles):
+            tiles[(seq_id, tile_ix)] = tile
+    print(f"Tiling {len(sequences)} sequence(s) longer than {seq_len} bp into {len(tiles)} windows")
+
+    tile_predictions = predict_inputs(ensemble, tiles, task_to_indices, unique_track_indices,
+                                      False, batch_size)
+    task_predictions = {}
+    for task_key, predictions in tile_predictions.items():
+        task_predictions[task_key] = {}
+        for seq_id, starts in tile_starts.items():
+            stitched = stitch_tiles([predictions[(seq_id, tile_ix)]
+                                     for tile_ix in range(len(starts))], starts)
+            if is_point_readout and not is_all_tracks_task(task_key):
+                stitched = np.mean(stitched, axis=0, dtype=np.float32).astype(stitched.dtype)
+            task_predictions[task_key][seq_id] = stitched
+    return task_predictions
+
+def predict_ensemble(ensemble, sequences, task_to_indices, unique_track_indices,
+                     is_point_readout=False):
+    """
+    Predict sequences with the resident ensemble, on heads sliced to the required tracks.
+
+    Uses the fused averaging head (`predict_sequences_fused`) unless
+    BORZOI_FUSED_AGGREGATION=0 or the folds are int8, which average on the
+    host (`predict_sequences`).
+    Sequence IDs sharing a model input are predicted once (see `dedup_sequences`),
+    and sequences longer than the model window are tiled (see `predict_tiled`).
+
+    Args:
+        ensemble (BorzoiEnsemble): Resident ensemble (see `get_borzoi_ensemble`).
+        sequences (dict): {sequence_id: sequence}.
+        task_to_indices (dict): Track indices of each task (see `collect_task_tracks`).
+        unique_track_indices (list): Sorted union of all task track indices.
+        is_point_readout (bool): If True, average 16352 bin predictions to single value.
+
+    Returns:
+        task_predictions (dict): {task_key: {sequence_id: np.ndarray}} (see `predict_borzoi`).
+    """
+    # "all_tracks" outputs are ~1 GB per sequence and fold, predict them one at a time
+    batch_size = 1 if any(is_all_tracks_task(task_key) for task_key in task_to_indices) \
+        else BATCH_SIZE
+    unique_sequences, representative = dedup_sequences(sequences)
+    if len(unique_sequences) < len(sequences):
+        print(f"Predicting {len(unique_sequences)} unique inputs for {len(sequences)} sequence IDs")
+
+    long_sequences = {seq_id: sequence for seq_id, sequence in unique_sequences.items()
+                      if TILE_LONG_SEQUENCES and len(sequence) > seq_len}
+    window_sequences = {seq_id: sequence for seq_id, sequence in unique_sequences.items()
+                        if seq_id not in long_sequences}
+    task_predictions = {task_key: {} for task_key in task_to_indices}
+    if window_sequences:
+        for task_key, predictions in predict_inputs(ensemble, window_sequences, task_to_indices,
+                                                    unique_track_indices, is_point_readout,
+                                                    batch_size).items():
+            task_predictions[task_key].update(predictions)
+    if long_sequences:
+        for task_key, predictions in predict_tiled(ensemble, long_sequences, task_to_indices,
+                                                   unique_track_indices, is_point_readout,
+                                                   batch_size).items():
+            task_predictions[task_key].update(predictions)
+
+    # Fan the predictions back out to every sequence ID (in request order)
+    return {task_key: {seq_id: predictions[representative[seq_id]] for seq_id in sequences}
+            for task_key, predictions in task_predictions.items()}
+
+def predict_sequences_fused(aggregation_head, sequences, batch_size=BATCH_SIZE):
+    """
+    Run a fused averaging head on sequences and split its outputs per task.
+
+    Args:
+        aggregation_head (tuple): (head, mean_tasks, full_tasks) from
+            `BorzoiEnsemble.aggregation_head`.
+        sequences (dict): {sequence_id: sequence}.
+        batch_size (int): Sequences per model call (see `iter_encoded_batches`).
+
+    Returns:
+        task_predictions (dict): {task_key: {sequence_id: np.ndarray}} (see `predict_borzoi`).
+    """
+    head, mean_tasks, full_tasks = aggregation_head
+    task_predictions = {task_key: {} for task_key in mean_tasks + full_tasks}
+
+    progress = tqdm.tqdm(desc="Predictions in progress", unit="sequence",
+                         total=len(sequences), dynamic_ncols=True)
+    for seq_ids, encoded_batch in iter_encoded_batches(sequences, batch_size):
+        print(f"Predicting on sequence IDs: {seq_ids} 🧬")
+        outputs = head(encoded_batch)
+        if not isinstance(outputs, (list, tuple)):
+            outputs = [outputs]
+        outputs = [output.numpy() for output in outputs]
+
+        for i, seq_id in enumerate(seq_ids):
+            if mean_tasks:
+                # (B, 16352, tasks), or (B, tasks) for point readouts
+                task_means = outputs[0][i]
+                for k, task_key in enumerate(mean_tasks):
+                    task_predictions[task_key][seq_id] = task_means[..., k]
+            for task_key, output in zip(full_tasks, outputs[1:] if mean_tasks else outputs):
+                task_predictions[task_key][seq_id] = output[i]
+        progress.update(len(seq_ids))
+    progress.close()
+    return task_predictions
+
+def predict_sequences(models, sequences, task_to_indices, unique_track_indices,
+                      is_point_readout=False, track_columns=None, batch_size=BATCH_SIZE):
+    """
+    Run the model ensemble on sequences and assign the predictions to each task.
+
+    Args:
+        models (list): Model ensemble from `load_model_ensemble`.
+        sequences (dict): {sequence_id: sequence}.
+        task_to_indices (dict): Track indices of each task (see `collect_task_tracks`).
+        unique_track_indices (list): Sorted union of all task track indices.
+        is_point_readout (bool): If True, average 16352 bin predictions to single value.
+        track_columns (list, optional): Columns of the model output holding
+            `unique_track_indices` (see `BorzoiEnsemble.track_models`).
+            Defaults to `unique_track_indices`, for the full heads.
+        batch_size (int): Sequences per model call (see `iter_encoded_batches`).
+
+    Returns:
+        task_predictions (dict): {task_key: {sequence_id: np.ndarray}} (see `predict_borzoi`).
+    """
     #    - Iterate over sequences and run model prediction only for the required tracks
     print("Processing sequences and storing predictions only for required tracks...")
     task_predictions = {task: {} for task in task_to_indices}
+    if track_columns is None:
+        track_columns = unique_track_indices
+    track_position = {index: i for i, index in enumerate(unique_track_indices)}
     
-    # Process each sequence
-    for seq_id, sequence in tqdm.tqdm(sequences.items(),
-                                      desc="Predictions in progress", 
-                                      unit="sequence",
-                                      total=len(sequences),
-                                      dynamic_ncols=True):
-        print(f"Predicting on sequence ID: {seq_id} 🧬")
-        # Pad and encode sequence
-        encoded_seq = dna.dna_1hot(seq=sequence, seq_len=seq_len)
-        print(f"Shape of encoded sequence before predict_tracks: {encoded_seq.shape}")
-        
+    # Process each batch of sequences, encoded (padded) ahead of the model
+    progress = tqdm.tqdm(desc="Predictions in progress", unit="sequence",
+                         total=len(sequences), dynamic_ncols=True)
+    for seq_ids, encoded_batch in iter_encoded_batches(sequences, batch_size):
+        print(f"Shape of encoded batch before predict_tracks_batch: {encoded_batch.shape}")
+
         # Run model prediction once for all required tracks
-        raw_predictions = predict_tracks(models, encoded_seq)[:, :, :, unique_track_indices]
-        print(f"Shape of raw predictions: {raw_predictions.shape}")
-        
-        # Average across model folds to reduce (1, n_folds, 16352, num_tracks) -> (1, 16352, num_tracks)
-        fold_averaged_predictions = np.mean(raw_predictions, axis=1)
-        print(f"Shape of predictions after averaging model folds: {fold_averaged_predictions.shape}")
-        
-        # Now assign filtered predictions to each task to be averaged
-        for task_key, indices in task_to_indices.items():
-            # Extract relevant track predictions per task
-            # Special case: for "all_tracks" request, return full predictions without averaging over tracks
-            if task_key[0].lower() == "all_tracks":
-                print(f"Assigning prediction for tasks: {task_key} (All tracks: [1, {len(indices)}])")
-                task_predictions[task_key][seq_id] = np.vectorize(lambda x: float(f"{x:.7f}"))(fold_averaged_predictions).squeeze().tolist()
-            else:
-                print(f"Assigning prediction for tasks: {task_key} (Tracks: {indices})")
-                selected_tracks = fold_averaged_predictions[:, :, 
-                                [unique_track_indices.index(idx) for idx in indices]]
-                # Average duplicate tracks per task
-                print(f"Averaging duplicate track predictions for task {task_key} (Tracks: {indices})")
-                avg_prediction = np.mean(selected_tracks, axis=-1, keepdims=True)
-                
-                if is_point_readout:
-                    # "point" readout: Average across 16352 bins to a single value per sequence
-                    print(f"Generating point readout for task: {task_key}")
-                    point_prediction = np.mean(avg_prediction, axis=1, keepdims=True)
-                    task_predictions[task_key][seq_id] = np.vectorize(lambda x: float(f"{x:.7f}"))(point_prediction).squeeze().tolist()
+        raw_batch = predict_tracks_batch(models, encoded_batch, track_columns)
+        progress.update(len(seq_ids))
+        for i, seq_id in enumerate(seq_ids):
+            print(f"Predicting on sequence ID: {seq_id} 🧬")
+            raw_predictions = raw_batch[i:i + 1]
+            print(f"Shape of raw predictions: {raw_predictions.shape}")
+
+            # Average across model folds to reduce (1, n_folds, 16352, num_tracks) -> (1, 16352, num_tracks)
+            fold_averaged_predictions = np.mean(raw_predictions, axis=1)
+            print(f"Shape of predictions after averaging model folds: {fold_averaged_predictions.shape}")
+
+            # Now assign filtered predictions to each task to be averaged
+            for task_key, indices in task_to_indices.items():
+                # Extract relevant track predictions per task
+                # Special case: for "all_tracks" request, return full predictions without averaging over tracks
+                if task_key[0].lower() == "all_tracks":
+                    print(f"Assigning prediction for tasks: {task_key} (All tracks: [1, {len(indices)}])")
+                    task_predictions[task_key][seq_id] = fold_averaged_predictions.squeeze()
                 else:
-                    # "track" readout: Return full 16352 bin predictions
-                    # Store predictions in task-specific dictionary
-                    task_predictions[task_key][seq_id] = np.vectorize(lambda x: float(f"{x:.7f}"))(avg_prediction).squeeze().tolist()
-    
+                    print(f"Assigning prediction for tasks: {task_key} (Tracks: {indices})")
+                    selected_tracks = fold_averaged_predictions[:, :, 
+                                    [track_position[idx] for idx in indices]]
+                    # Average duplicate tracks per task
+                    print(f"Averaging duplicate track predictions for task {task_key} (Tracks: {indices})")
+                    avg_prediction = np.mean(selected_tracks, axis=-1, keepdims=True)
+
+                    if is_point_readout:
+                        # "point" readout: Average across 16352 bins to a single value per sequence
+                        print(f"Generating point readout for task: {task_key}")
+                        point_prediction = np.mean(avg_prediction, axis=1, keepdims=True)
+                        task_predictions[task_key][seq_id] = point_prediction.squeeze()
+                    else:
+                        # "track" readout: Return full 16352 bin predictions
+                        # Store predictions in task-specific dictionary
+                        task_predictions[task_key][seq_id] = avg_prediction.squeeze()
+    progress.close()
+
     return task_predictions
+
+# 6. Convert predictions to JSON lists
+def round_predictions(predictions, decimals=7):
+    """
+    Round prediction arrays to `decimals` places and convert them to lists for JSON.
+
+    Args:
+        predictions (dict): {sequence_id: np.ndarray} as returned by `predict_borzoi`.
+        decimals (int): Number of decimal places to keep.
+
+    Returns:
+        dict: {sequence_id: list of floats (or a float for "point" readouts)}
+    """
+    return {seq_id: np.round(np.asarray(prediction, dtype=np.float64), decimals).tolist()
+            for seq_id, prediction in predictions.items()}
+
+# 7. Accuracy of a reduced-precision backend
+def precision_deviation(sequences, precision, folds=None):
+    """
+    Per-track deviation of reduced-precision folds from float32 folds on reference sequences.
+
+    Folds are compared one at a time, so only one float32 and one
+    reduced-precision fold are in memory. The mean absolute deviation of the
+    fold average is at most the mean of the per-fold deviations reported here.
+
+    Args:
+        sequences (dict): {sequence_id: sequence} reference set.
+        precision (str): Precision to check (see `PRECISION`).
+        folds (list, optional): Fold indices to compare. Defaults to all `n_folds`.
+
+    Returns:
+        pd.DataFrame: One row per track (indexed like the targets table) with
+            its identifier and description, the maximum and mean absolute
+            deviation over all folds, sequences and bins, and the mean absolute
+            float32 prediction for scale.
+    """
+    params_model, _ = load_model_parameters()
+    targets_df, _ = load_targets()
+    target_index, slice_pair = load_target_index(targets_df)
+    if folds is None:
+        folds = range(n_folds)
+
+    n_tracks = len(target_index)
+    max_deviation = np.zeros(n_tracks, dtype=np.float64)
+    sum_deviation = np.zeros(n_tracks, dtype=np.float64)
+    sum_reference = np.zeros(n_tracks, dtype=np.float64)
+    n_values = 0
+    for fold_ix in folds:
+        print(f"Comparing {precision} and float32 predictions of fold {fold_ix}...")
+        reduced_fold = build_fold(fold_ix, target_index, slice_pair, params_model, precision)
+        reference_fold = build_fold(fold_ix, target_index, slice_pair, params_model, "float32")
+        for seq_ids, encoded_batch in iter_encoded_batches(sequences, batch_size=1):
+            reference = reference_fold(encoded_batch).reshape(-1, n_tracks)
+            deviation = np.abs(np.asarray(reduced_fold(encoded_batch), dtype=np.float32)
+                               .reshape(-1, n_tracks) - reference)
+            np.maximum(max_deviation, deviation.max(axis=0), out=max_deviation)
+            sum_deviation += deviation.sum(axis=0, dtype=np.float64)
+            sum_reference += np.abs(reference).sum(axis=0, dtype=np.float64)
+            n_values += reference.shape[0]
+        del reference_fold, reduced_fold
+        tf.keras.backend.clear_session()
+
+    return pd.DataFrame({'identifier': targets_df['identifier'].values,
+                         'description': targets_df['description'].values,
+                         'max_abs_deviation': max_deviation,
+                         'mean_abs_deviation': sum_deviation / max(1, n_values),
+                         'mean_abs_float32': sum_reference / max(1, n_values)},
+                        index=targets_df.index)
@@ -1,5 +1,8 @@
 # borzoi_utils.py
+import re
+import threading
 import pandas as pd
+from collections import defaultdict
 
 # Function to handle Evaluator request
 # Fed into the model by Predictor
@@ -103,4 +106,150 @@ def filter_evaluator_request(simplified_targets_df, request_type, cell_type, mol
     
     # Invalid request type
     else:
-        raise ValueError(f"Invalid request type {request_type}")
\ No newline at end of file
+        raise ValueError(f"Invalid request type {request_type}")
+
+
+# Indexed version of `filter_evaluator_request`, built once per Predictor process
+
+# Cell type names are split into lowercase alphanumeric tokens for the inverted index
+CELL_TYPE_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+class TrackIndex:
+    """
+    In-memory index of the simplified targets table for fast track selection.
+
+    Tracks are indexed by assay -> molecule -> lowercase cell type, and an
+    inverted index maps every cell type token to the cell types containing
+    it, so a cell type substring query only checks the cell types sharing
+    a token with it instead of scanning every track. `(type, cell_type)`
+    lookups are memoized.
+
+    Selects the same tracks, in the same order, as `filter_evaluator_request`;
+    cell types are matched as plain case-insensitive substrings.
+
+    Args:
+        simplified_targets_df (pd.DataFrame): DataFrame containing simplified target data.
+    """
+
+    def __init__(self, simplified_targets_df):
+        self.all_tracks = tuple(simplified_targets_df.index.tolist())
+        # {assay: {molecule: {cell_type: [row positions]}}}, lowercase molecules and cell types
+        self.positions = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        # {token: {cell_type}}
+        self.token_index = defaultdict(set)
+        self.cell_types = set()
+        rows = zip(simplified_targets_df['Assay'], simplified_targets_df['Cell Type'],
+                   simplified_targets_df['Molecule'])
+        for position, (assay, cell_type, molecule) in enumerate(rows):
+            # Tracks without a cell type never match (na=False)
+            if not isinstance(cell_type, str):
+                continue
+            cell_type = cell_type.lower()
+            molecule = molecule.lower() if isinstance(molecule, str) else None
+            self.positions[assay][molecule][cell_type].append(position)
+            if cell_type not in self.cell_types:
+                self.cell_types.add(cell_type)
+                for token in CELL_TYPE_TOKEN_RE.findall(cell_type):
+                    self.token_index[token].add(cell_type)
+        self.lookups = {}
+        self.cell_type_lookups = {}
+        self.lock = threading.Lock()
+
+    def matching_cell_types(self, cell_type):
+        """
+        Find the indexed cell types containing `cell_type` (lowercase).
+
+        Every token of `cell_type` is part of a token of a matching cell type,
+        so only the cell types holding a token that contains the longest query
+        token are checked.
+
+        Returns:
+            frozenset: Matching lowercase cell types.
+        """
+        with self.lock:
+            if cell_type in self.cell_type_lookups:
+                return self.cell_type_lookups[cell_type]
+        query_tokens = CELL_TYPE_TOKEN_RE.findall(cell_type)
+        if query_tokens:
+            longest = max(query_tokens, key=len)
+            candidates = set()
+            for token, token_cell_types in self.token_index.items():
+                if longest in token:
+                    candidates.update(token_cell_types)
+        else:
+            candidates = self.cell_types
+        matches = frozenset(candidate for candidate in candidates if cell_type in candidate)
+        with self.lock:
+            self.cell_type_lookups[cell_type] = matches
+        return matches
+
+    def assay_tracks(self, assay, cell_type, molecule=None):
+        """
+        Track ids of an assay whose cell type contains `cell_type`, in table order.
+
+        Args:
+            assay (str): Assay name, e.g. "ATAC".
+            cell_type (str): Lowercase cell type query.
+            molecule (str, optional): Lowercase ChIP-Seq molecule; any molecule if None.
+
+        Returns:
+            list: Track ids (index of the simplified targets table).
+        """
+        cell_types = self.matching_cell_types(cell_type)
+        molecules = self.positions.get(assay, {})
+        by_cell_type = [molecules.get(molecule, {})] if molecule is not None else molecules.values()
+        positions = []
+        for cell_type_positions in by_cell_type:
+            for matched in cell_types.intersection(cell_type_positions):
+                positions.extend(cell_type_positions[matched])
+        return [self.all_tracks[position] for position in sorted(positions)]
+
+    def resolve(self, request_type, cell_type):
+        """
+        Select the tracks of a (type, cell type) task.
+
+        Args:
+            request_type (str): Requested type of prediction (see `filter_evaluator_request`).
+            cell_type (str): Requested cell type for prediction.
+
+        Returns:
+            tuple or str: Track ids, or an error message string if no tracks are found.
+        """
+        key = (request_type, cell_type)
+        with self.lock:
+            if key in self.lookups:
+                return self.lookups[key]
+        tracks = self._resolve(request_type, cell_type)
+        with self.lock:
+            self.lookups[key] = tracks
+        return tracks
+
+    def _resolve(self, request_type, cell_type):
+        request_error_msg = f"Request Error: No requested tracks in the requested type: {request_type} and cell type: {cell_type} found."
+
+        # Normalize inputs to lowercase for case-insensitive handling
+        request_type = request_type.lower() if request_type else None
+        if request_type == "all_tracks":
+            return self.all_tracks
+        if request_type is None:
+            raise ValueError(f"Invalid request type {request_type}")
+        if not cell_type:
+            raise ValueError(f"Missing cell type for request type {request_type}")
+        cell_type = cell_type.lower()
+
+        # 1. Accessibility (ATAC and DNASE tracks, concatenated)
+        if request_type == "accessibility":
+            tracks = self.assay_tracks('ATAC', cell_type) + self.assay_tracks('DNASE', cell_type)
+        # 2. Expression (RNA for all request_type, except "expression_pol2")
+        elif request_type in ["expression", "expression_mrna", "expression_pol1", "expression_pol3"]:
+            tracks = self.assay_tracks('RNA', cell_type)
+        # 3. Expression Pol2 (CAGE with RNA as fallback)
+        elif request_type == "expression_pol2":
+            tracks = self.assay_tracks('CAGE', cell_type) or self.assay_tracks('RNA', cell_type)
+        # 4. Binding -- binding_{molecule}
+        elif request_type.startswith("binding_"):
+            tracks = self.assay_tracks('CHIP', cell_type, molecule=request_type.split("_")[1])
+        # Invalid request type
+        else:
+            raise ValueError(f"Invalid request type {request_type}")
+        return tuple(tracks) if tracks else request_error_msg
@@ -0,0 +1,75 @@
+# check_precision.py
+"""
+Compare a reduced-precision Borzoi backend with float32 on a reference set.
+
+Writes the per-track maximum and mean absolute deviation (see
+`precision_deviation`) to a TSV and prints a summary. Checking "int8" also
+exports the quantized folds (see `BORZOI_QUANTIZED_DIR`), so run it once
+before serving the int8 backend.
+
+Usage:
+    python check_precision.py --precision int8 --fasta reference.fa --output int8_deviation.tsv
+"""
+import os
+import sys
+import argparse
+import numpy as np
+
+sys.path.append(os.path.dirname(__file__))
+from borzoi_predict_codebase import *
+
+def read_fasta(fasta_file):
+    """
+    Returns:
+        dict: {sequence_id: sequence} of every record in `fasta_file`.
+    """
+    sequences = {}
+    seq_id = None
+    with open(fasta_file) as fasta_open:
+        for line in fasta_open:
+            line = line.strip()
+            if line.startswith(">"):
+                seq_id = line[1:].split()[0]
+                sequences[seq_id] = []
+            elif seq_id is not None:
+                sequences[seq_id].append(line)
+    return {seq_id: "".join(lines) for seq_id, lines in sequences.items()}
+
+def random_sequences(n_sequences, seed=0):
+    """
+    Returns:
+        dict: {sequence_id: sequence} of `n_sequences` random 524288 bp sequences.
+    """
+    rng = np.random.default_rng(seed)
+    return {f"random_{i}": "".join(rng.choice(list("ACGT"), seq_len)) for i in range(n_sequences)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--precision", default=PRECISION, choices=PRECISIONS[1:],
+                        help="Backend to compare with float32 (default: BORZOI_PRECISION).")
+    parser.add_argument("--fasta", help="Reference sequences (default: random sequences).")
+    parser.add_argument("--n_random", type=int, default=2,
+                        help="Number of random reference sequences without --fasta.")
+    parser.add_argument("--folds", type=int, nargs="+", help="Folds to compare (default: all).")
+    parser.add_argument("--output", default="precision_deviation.tsv", help="Per-track TSV.")
+    args = parser.parse_args()
+
+    if args.fasta:
+        sequences = read_fasta(args.fasta)
+    else:
+        sequences = random_sequences(args.n_random)
+    print(f"Reference set: {len(sequences)} sequence(s)")
+
+    deviation = precision_deviation(sequences, args.precision, args.folds)
+    deviation.to_csv(args.output, sep="\t")
+
+    worst = deviation.sort_values("max_abs_deviation", ascending=False).head(10)
+    print(f"Largest {args.precision} deviations from float32:")
+    print(worst[['description', 'max_abs_deviation', 'mean_abs_deviation', 'mean_abs_float32']])
+    print(f"Over all tracks: max {deviation['max_abs_deviation'].max():.4g}, "
+          f"mean {deviation['mean_abs_deviation'].mean():.4g} "
+          f"(mean float32 prediction {deviation['mean_abs_float32'].mean():.4g})")
+    print(f"Per-track deviations written to {args.output}")
+
+if __name__ == "__main__":
+    main()
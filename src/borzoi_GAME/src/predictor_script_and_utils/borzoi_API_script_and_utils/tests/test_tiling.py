@@ -0,0 +1,39 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Run from borzoi_API_script_and_utils inside the predictor container:
+#   python -m pytest -q tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import borzoi_predict_codebase as bpc
+
+# Long enough for three tiles with the default overlap, not a multiple of the bin size
+SEQUENCE_LENGTH = 2 * bpc.seq_len + 1000
+
+
+def stitch_bin_indices(overlap):
+    """Tile and stitch a long sequence whose tile outputs are their global bin indices."""
+    sequence = "A" * SEQUENCE_LENGTH
+    tiles, tile_starts = bpc.tile_sequence(sequence, overlap)
+    assert all(len(tile) == bpc.seq_len for tile in tiles)
+    tile_predictions = [start // bpc.bin_size + np.arange(bpc.target_length)
+                        for start in tile_starts]
+    return bpc.stitch_tiles(tile_predictions, tile_starts)
+
+
+@pytest.mark.parametrize("overlap", [bpc.TILE_OVERLAP, 0, bpc.MIN_TILE_OVERLAP - bpc.bin_size])
+def test_stitch_tiles_contiguous(overlap):
+    stitched = stitch_bin_indices(overlap)
+    padded_len = -(-SEQUENCE_LENGTH // bpc.bin_size) * bpc.bin_size
+    n_bins = (padded_len - bpc.seq_len) // bpc.bin_size + bpc.target_length
+    # every output bin once and in order, so range_output_bins indexes the stitched track
+    np.testing.assert_array_equal(stitched, np.arange(n_bins))
+    first_bin, end_bin = bpc.range_output_bins(0, SEQUENCE_LENGTH - 1, SEQUENCE_LENGTH)
+    assert first_bin == 0 and end_bin <= len(stitched)
+
+
+def test_tile_overlap_minimum():
+    assert bpc.TILE_OVERLAP >= bpc.MIN_TILE_OVERLAP
+    assert bpc.MIN_TILE_OVERLAP == 2 * bpc.target_crop * bpc.bin_size
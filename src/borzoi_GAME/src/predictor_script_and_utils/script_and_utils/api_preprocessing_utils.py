@@ -1,4 +1,5 @@
 # api_preprocessing_utils.py
+import numpy as np
 
 ## model specific checks that cause a "prediction_request_failed" error
 def check_seqs_specifications(sequences, json_return_error_model):
@@ -7,7 +8,8 @@ def check_seqs_specifications(sequences, json_return_error_model):
 
     Checks for invalid characters ('N') in sequences and logs errors if found.
     The Borzoi model does not impose a maximum sequence length; 
-    sequences longer than 524,288 bases will be truncated internally.
+    sequences longer than 524,288 bases are predicted in overlapping
+    windows and stitched (or center trimmed with BORZOI_TILE_LONG_SEQUENCES=0).
 
     Args:
         sequences (dict): A dictionary with sequence IDs as keys and DNA sequences as values.
@@ -79,6 +81,25 @@ def add_adapters(seq, upstream_adapter, downstream_adapter):
     seq_with_adapters = upstream_adapter + seq + downstream_adapter
     return seq_with_adapters
 
+# One-hot lookup table indexed by the ASCII byte of each base ('A', 'G', 'C', 'T'
+# in that column order). Every other byte, including 'N', maps to all zeros.
+ONE_HOT_TABLE = np.zeros((256, 4), dtype=np.uint8)
+for base_index, base in enumerate("AGCT"):
+    ONE_HOT_TABLE[ord(base), base_index] = 1
+
+def sequence_to_bytes(seq):
+    """
+    View a sequence as a uint8 array of ASCII codes without copying per base.
+
+    Args:
+        seq (str): DNA sequence.
+
+    Returns:
+        np.ndarray: uint8 array of length len(seq). Non-ASCII characters are
+                    replaced by '?' and therefore encode as all zeros.
+    """
+    return np.frombuffer(seq.encode("ascii", "replace"), dtype=np.uint8)
+
 # One-hot encode sequences
 def one_hot_encode(seq):
     """
@@ -88,14 +109,9 @@ def one_hot_encode(seq):
         seq (str): Sequence consisting of 'A', 'T', 'G', 'C', and 'N'.
 
     Returns:
-        list: A one-hot encoded list for the sequence.
+        np.ndarray: uint8 array of shape (len(seq), 4) with the one-hot encoding.
     """
-    mapping = {'A': [1, 0, 0, 0],
-               'G': [0, 1, 0, 0],
-               'C': [0, 0, 1, 0],
-               'T': [0, 0, 0, 1],
-               'N': [0, 0, 0, 0]}
-    return [mapping.get(base, [0, 0, 0, 0]) for base in seq]
+    return np.take(ONE_HOT_TABLE, sequence_to_bytes(seq), axis=0)
 
 # Full preprocessing pipeline for a sequence
 def process_sequence(seq, target_length, seq_size,
@@ -105,13 +121,13 @@ def process_sequence(seq, target_length, seq_size,
 
     Args:
         seq (str): The input sequence.
-        target_length (int): Length of the sequence before adding adapters (200 for Dream-RNN).
-        seq_size (int): Model-specific final sequence size (230 for Dream-RNN)
+        target_length (int): Model-dependent length of the sequence before adding adapters.
+        seq_size (int): Model-specific final sequence size.
         upstream_adapter (str): Upstream adapter sequence to prepend.
         downstream_adapter (str): Downstream adapter sequence to append.
 
     Returns:
-        list: A one-hot encoded list with padding and adapters applied.
+        np.ndarray: A (seq_size, 4) one-hot encoded array with padding and adapters applied.
     """
     # Step 1: Pad the sequence
     padded_seq = pad_sequence(seq, target_length)
@@ -122,4 +138,4 @@ def process_sequence(seq, target_length, seq_size,
     # Step 3: One-hot encode the sequence
     encoded_seq = one_hot_encode(seq_with_adapters)
     
-    return encoded_seq
\ No newline at end of file
+    return encoded_seq
@@ -3,11 +3,15 @@ import os
 import sys
 import json
 import tqdm
-import struct
 import socket
+import threading
+import numpy as np
 
 from error_message_functions_updated import *
 from api_preprocessing_utils import *
+from tcp_framing_utils import *
+from predictor_server_utils import *
+from prediction_cache import *
 
 # Get the absolute path of the script's directory
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -31,68 +35,403 @@ if BORZOI_DIR not in sys.path:
 
 from borzoi_predict_codebase import *
 
-# Set buffer size for TCP
-BUFFER_SIZE = 65536
+# Predictions reused across requests (and restarts, with PREDICTOR_CACHE_DIR),
+# keyed on the weights of every fold, the model parameters, the targets, the
+# inference precision and the tiling of long sequences
+prediction_cache = PredictionCache(f"borzoi_human:{PRECISION}:tile{TILE_OVERLAP if TILE_LONG_SEQUENCES else 'off'}",
+                                   [params_file, targets_file] +
+                                   [fold_model_file(fold_ix) for fold_ix in range(n_folds)])
+
+# Default number of sequences per frame of a streamed response. A single
+# "all_tracks" prediction is 16352 x 7611 values, so stream one at a time.
+RESPONSE_BATCH_SIZE = 1
+
+def prepare_sequences(sequences, prediction_ranges, upstream_seq, downstream_seq,
+                      json_return_error_model, bin_ranges=None):
+    """
+    Add flanking sequences, check model specifications and trim to prediction ranges.
+
+    `sequences` is modified in place. With `bin_ranges` ("prediction_range_mode":
+    "crop_output"), sequences are not trimmed: the whole sequence is the model
+    context and only the output bins overlapping each range are kept later
+    (see `predict_with_ranges`).
+
+    Args:
+        sequences (dict): {seq_id: sequence}.
+        prediction_ranges (dict): {seq_id: [start, end]} (inclusive), may be empty.
+        upstream_seq (str): Upstream flanking sequence ("" for none).
+        downstream_seq (str): Downstream flanking sequence ("" for none).
+        json_return_error_model (dict): {'prediction_request_failed': [...]}.
+        bin_ranges (dict, optional): Filled with {seq_id: (first_bin, end_bin)}
+            instead of trimming the sequences.
+
+    Returns:
+        dict: json_return_error_model with any errors appended.
+    """
+    # --- Add upstream and downstream flanking sequences, if provided by the evaluator ---
+    if upstream_seq or downstream_seq:
+        print(
+            f"Applying flanking:\
+                \n+{len(upstream_seq)} bases upstream,\
+                \n+{len(downstream_seq)} bases downstream"
+                )
+        for seq_id, sequence in tqdm.tqdm(
+            sequences.items(),
+            desc="Flanking sequences", 
+            unit="sequence",
+            total=len(sequences),
+            dynamic_ncols=True
+        ):
+            flanked = f"{upstream_seq}{sequence}{downstream_seq}"
+            sequences[seq_id] = flanked
+               
+    json_return_error_model = check_seqs_specifications(sequences, json_return_error_model)
+    
+    # --- Process prediction_ranges if provided ---
+    if prediction_ranges:
+        for seq_id, pr in prediction_ranges.items():
+            # Only process non-empty ranges
+            if pr:
+                # Unpack start and end indices
+                start, end = pr
+                # Check that the end index does not exceed sequence length
+                if end >= len(sequences[seq_id]):
+                    json_return_error_model['prediction_request_failed'].append(
+                        f"Prediction range for '{seq_id}' exceeds the sequence length!"
+                    )
+                elif bin_ranges is not None:
+                    # Keep the full sequence as context; crop the predicted bins instead
+                    first_bin, end_bin = range_output_bins(start, end, len(sequences[seq_id]))
+                    if first_bin == end_bin:
+                        json_return_error_model['prediction_request_failed'].append(
+                            f"Prediction range for '{seq_id}' only covers bases outside of the predicted bins."
+                        )
+                    else:
+                        bin_ranges[seq_id] = (first_bin, end_bin)
+                        print(f"Sequence '{seq_id}' predictions cropped to bins [{first_bin}, {end_bin}).")
+                else:
+                    # Slice the sequence. `prediction_range` is start, end inclusive
+                    sequences[seq_id] = sequences[seq_id][start:end+1]
+                    print(f"Sequence '{seq_id}' trimmed to prediction range [{start}, {end}].")
+
+    return json_return_error_model
+
+def track_group(task_to_indices, is_point_readout=False):
+    """
+    DynamicBatcher group of a track selection: only sequences predicted for the
+    same tasks, tracks and readout share a batch.
+
+    Returns:
+        tuple: Hashable ((task_key, track indices), ...), is_point_readout.
+    """
+    return (tuple((task_key, tuple(indices)) for task_key, indices in task_to_indices.items()),
+            is_point_readout)
+
+def predict_borzoi_items(items, group):
+    """
+    Predict one shared batch of (seq_id, sequence) items with the resident ensemble.
+
+    Items may come from different requests, so each gets its own key.
+
+    Args:
+        items (list): (seq_id, sequence) pairs.
+        group (tuple): Track selection and readout (see `track_group`).
+
+    Returns:
+        list: One {task_key: np.ndarray} per item, in order.
+    """
+    task_tracks, is_point_readout = group
+    task_to_indices = {task_key: list(indices) for task_key, indices in task_tracks}
+    unique_track_indices = sorted(set().union(*task_to_indices.values()))
+    batch = {f"{i}:{seq_id}": sequence for i, (seq_id, sequence) in enumerate(items)}
+    # Heads sliced to the tracks of this group, with fold, track and bin
+    # averaging fused on the device; cached per track set and readout
+    task_predictions = predict_ensemble(get_borzoi_ensemble(), batch, task_to_indices,
+                                        unique_track_indices, is_point_readout)
+    return [{task_key: task_predictions[task_key][key] for task_key in task_predictions}
+            for key in batch]
+
+def predict_with_batcher(batcher, sequences, task_to_indices, is_point_readout=False,
+                         cache_stats=None):
+    """
+    Predict sequences in batches shared with other requests, reusing cached predictions.
+
+    Each task prediction is cached under the final (flanked) sequence, the
+    task's track indices and the readout. Sequences missing any of their
+    task predictions are predicted for all tasks.
+
+    Args:
+        batcher (DynamicBatcher): Shared batches on the resident ensemble.
+        sequences (dict): {seq_id: sequence} to predict.
+        task_to_indices (dict): Track indices of each task (see `collect_task_tracks`).
+        is_point_readout (bool): If True, average bins to a single value.
+        cache_stats (dict, optional): Hit/miss counters of the request, updated in place.
+
+    Returns:
+        task_predictions (dict): {task_key: {seq_id: np.ndarray}}, as `predict_sequences`.
+    """
+    group = track_group(task_to_indices, is_point_readout)
+    if not prediction_cache.enabled:
+        predictions = batcher.predict_dict(sequences, group)
+    else:
+        readout = "point" if is_point_readout else "track"
+        keys = {seq_id: {task_key: prediction_cache.key(sequence, indices, readout)
+                         for task_key, indices in task_to_indices.items()}
+                for seq_id, sequence in sequences.items()}
+        cached_predictions = {}
+        missing = {}
+        for seq_id, sequence in sequences.items():
+            cached = {task_key: prediction_cache.get(key) for task_key, key in keys[seq_id].items()}
+            if any(prediction is None for prediction in cached.values()):
+                missing[seq_id] = sequence
+            else:
+                cached_predictions[seq_id] = cached
+        if missing:
+            for seq_id, prediction in batcher.predict_dict(missing, group).items():
+                for task_key, key in keys[seq_id].items():
+                    prediction_cache.put(key, prediction[task_key])
+                cached_predictions[seq_id] = prediction
+        if cache_stats is not None:
+            cache_stats['hits'] += len(sequences) - len(missing)
+            cache_stats['misses'] += len(missing)
+        predictions = {seq_id: cached_predictions[seq_id] for seq_id in sequences}
+    return {task_key: {seq_id: prediction[task_key] for seq_id, prediction in predictions.items()}
+            for task_key in task_to_indices}
+
+def predict_with_ranges(batcher, sequences, task_to_indices, is_point_readout=False,
+                        bin_ranges=None, cache_stats=None):
+    """
+    Predict sequences and keep only the output bins of their prediction ranges.
+
+    Sequences with a range are predicted with the "track" readout on their
+    full sequence, cropped to the bins overlapping the range, and averaged
+    over those bins for "point" readouts.
+
+    Args:
+        batcher (DynamicBatcher): Shared batches on the resident ensemble.
+        sequences (dict): {seq_id: sequence} to predict.
+        task_to_indices (dict): Track indices of each task (see `collect_task_tracks`).
+        is_point_readout (bool): If True, average bins to a single value.
+        bin_ranges (dict, optional): {seq_id: (first_bin, end_bin)} from `prepare_sequences`.
+        cache_stats (dict, optional): Hit/miss counters of the request, updated in place.
+
+    Returns:
+        task_predictions (dict): {task_key: {seq_id: np.ndarray}}, as `predict_sequences`.
+    """
+    if not bin_ranges:
+        return predict_with_batcher(batcher, sequences, task_to_indices, is_point_readout,
+                                    cache_stats)
+    task_predictions = predict_with_batcher(batcher, sequences, task_to_indices, False,
+                                            cache_stats)
+    for task_key, predictions in task_predictions.items():
+        for seq_id, prediction in predictions.items():
+            if seq_id in bin_ranges:
+                first_bin, end_bin = bin_ranges[seq_id]
+                prediction = prediction[first_bin:end_bin]
+            if is_point_readout and not is_all_tracks_task(task_key):
+                prediction = np.mean(prediction, axis=0, dtype=np.float32).astype(prediction.dtype)
+            predictions[seq_id] = prediction
+    return task_predictions
+
+def cache_metadata(cache_stats):
+    """Response metadata reporting the cache hits and misses of a request."""
+    return {'cache': cache_stats} if prediction_cache.enabled else {}
+
+def task_predictions_for(prediction_task, task_predictions, response_encoding="json"):
+    """
+    Look up the predictions of one Evaluator prediction task.
+
+    Args:
+        prediction_task (dict): Prediction task of the Evaluator request.
+        task_predictions (dict): {(type, cell_type): {seq_id: np.ndarray}}.
+        response_encoding (str): "json" rounds the arrays to lists, "binary" keeps them.
+
+    Returns:
+        dict: {seq_id: prediction} for this task.
+    """
+    task_key = (prediction_task['type'], prediction_task['cell_type'])
+    predictions = task_predictions.get(task_key, {})
+    if response_encoding == "json":
+        predictions = round_predictions(predictions)
+    return predictions
+
+def send_task_batches(client_socket, prediction_tasks, task_predictions, response_encoding="json"):
+    """
+    Send one batch frame per prediction task for a batch of predicted sequences.
+
+    Returns:
+        int: Number of batch frames sent.
+    """
+    for prediction_task in prediction_tasks:
+        send_stream_batch(client_socket, prediction_task['name'],
+                          task_predictions_for(prediction_task, task_predictions, response_encoding),
+                          response_encoding)
+    return len(prediction_tasks)
+
+def predict_streamed_request(client_socket, json_return, evaluator_json, task_to_indices,
+                             unique_track_indices, batcher, is_point_readout=False,
+                             response_encoding="json", response_streaming=False):
+    """
+    Receive the sequence batches of a streamed request and predict each batch as it arrives.
+
+    The next batches are received in the background while the current one is
+    predicted (see tcp_framing_utils.iter_stream_prefetch). Predictions are
+    returned in one message, or batch by batch if `response_streaming` is set.
+
+    Args:
+        client_socket (socket.socket): Connected Evaluator socket.
+        json_return (dict): Return message without predictions.
+        evaluator_json (dict): Request header.
+        task_to_indices (dict): Track indices of each task (see `collect_task_tracks`).
+        unique_track_indices (list): Sorted union of all task track indices.
+        batcher (DynamicBatcher): Shared batches on the resident ensemble.
+        is_point_readout (bool): If True, average bins to a single value.
+        response_encoding (str): "json" or "binary".
+        response_streaming (bool): If True, send a streamed response.
+
+    Returns:
+        bool: True if the response was sent, False if the socket failed.
+    """
+    prediction_tasks = evaluator_json['prediction_tasks']
+    crop_output = evaluator_json.get('prediction_range_mode', "trim_sequence") == "crop_output"
+    json_return_error = {'bad_prediction_request': []}
+    json_return_error_model = {'prediction_request_failed': []}
+    task_predictions = {task_key: {} for task_key in task_to_indices}
+    seen_ids = set()
+    n_batches = 0
+    cache_stats = new_cache_stats()
+    try:
+        if response_streaming:
+            send_stream_header(client_socket, json_return, response_encoding)
+        for frame in iter_stream_prefetch(client_socket, desc="Receiving Evaluator Sequences"):
+            # Skip the trailer, and drain the remaining batches once an error was found
+            if frame.get(STREAM_KEY) != "batch" or any(json_return_error.values()) \
+                    or any(json_return_error_model.values()):
+                continue
+            sequences = frame['sequences']
+            duplicated = seen_ids.intersection(sequences)
+            if duplicated:
+                json_return_error['bad_prediction_request'].append(
+                    "Duplicate sequence ID keys across batches: " + ' '.join(sorted(duplicated)))
+                continue
+            seen_ids.update(sequences)
+            prediction_ranges = frame.get('prediction_ranges', {})
+            if prediction_ranges:
+                json_return_error = check_seq_ids(prediction_ranges, sequences, json_return_error)
+                json_return_error = check_prediction_ranges(prediction_ranges, json_return_error)
+                if any(json_return_error.values()):
+                    continue
+            bin_ranges = {} if crop_output else None
+            json_return_error_model = prepare_sequences(sequences, prediction_ranges,
+                                                        evaluator_json.get('upstream_seq', ""),
+                                                        evaluator_json.get('downstream_seq', ""),
+                                                        json_return_error_model, bin_ranges)
+            if any(json_return_error_model.values()):
+                continue
 
-def recv_message_loop(client_socket):
+            batch_predictions = predict_with_ranges(batcher, sequences, task_to_indices,
+                                                    is_point_readout, bin_ranges, cache_stats)
+            if response_streaming:
+                n_batches += send_task_batches(client_socket, prediction_tasks, batch_predictions,
+                                               response_encoding)
+            else:
+                for task_key, predictions in batch_predictions.items():
+                    task_predictions[task_key].update(predictions)
+    except (ConnectionError, socket.error) as e:
+        print("server_error: Error during streamed request: %s" % e)
+        return False
+
+    try:
+        # An error message also ends a streamed response
+        if any(json_return_error.values()):
+            send_json(client_socket, json_return_error)
+        elif any(json_return_error_model.values()):
+            send_json(client_socket, json_return_error_model)
+        elif response_streaming:
+            send_stream_trailer(client_socket, n_batches, response_encoding,
+                                **cache_metadata(cache_stats))
+        else:
+            for prediction_task, current_prediction_task in zip(prediction_tasks,
+                                                                json_return['prediction_tasks']):
+                current_prediction_task['predictions'] = task_predictions_for(
+                    prediction_task, task_predictions, response_encoding)
+            json_return.update(cache_metadata(cache_stats))
+            send_message(client_socket, json_return, response_encoding)
+        return True
+    except socket.error as e:
+        print("server_error: Error sending prediction response: %s" % e)
+        return False
+
+def send_streamed_predictions(client_socket, json_return, prediction_tasks, sequences,
+                              task_to_indices, unique_track_indices, batcher,
+                              is_point_readout=False, response_encoding="json",
+                              batch_size=RESPONSE_BATCH_SIZE, bin_ranges=None):
+    """
+    Predict and send the response one batch of sequences at a time.
+
+    The Evaluator receives a header frame, one frame per batch and prediction
+    task, then a trailer (see tcp_framing_utils). Only one batch of track
+    predictions is held in memory at a time.
+
+    Args:
+        client_socket (socket.socket): Connected Evaluator socket.
+        json_return (dict): Return message without predictions.
+        prediction_tasks (list): Prediction tasks of the Evaluator request.
+        sequences (dict): {seq_id: sequence} to predict.
+        task_to_indices (dict): Track indices of each task (see `collect_task_tracks`).
+        unique_track_indices (list): Sorted union of all task track indices.
+        batcher (DynamicBatcher): Shared batches on the resident ensemble.
+        is_point_readout (bool): If True, average bins to a single value.
+        response_encoding (str): "json" or "binary".
+        batch_size (int): Number of sequences per batch frame.
+        bin_ranges (dict, optional): Output bins to keep (see `predict_with_ranges`).
+
+    Returns:
+        bool: True if the whole response was sent, False if the socket failed.
+    """
+    seq_ids = list(sequences.keys())
+    n_batches = 0
+    cache_stats = new_cache_stats()
+    try:
+        send_stream_header(client_socket, json_return, response_encoding)
+        for start in range(0, len(seq_ids), batch_size):
+            batch = {seq_id: sequences[seq_id] for seq_id in seq_ids[start:start + batch_size]}
+            task_predictions = predict_with_ranges(batcher, batch, task_to_indices,
+                                                   is_point_readout, bin_ranges, cache_stats)
+            n_batches += send_task_batches(client_socket, prediction_tasks, task_predictions,
+                                           response_encoding)
+        send_stream_trailer(client_socket, n_batches, response_encoding,
+                            **cache_metadata(cache_stats))
+        return True
+    except socket.error as e:
+        print("server_error: Error sending streamed response: %s" % e)
+        return False
+
+def recv_message_loop(client_socket, batcher):
     # Step 1: Receive total bytes (length) of the Evaluator's request 
     # Step 2: Receive file from Evaluator
+    # Runs on its own thread per Evaluator connection. Sequences of all connections
+    # are predicted in shared batches by `batcher` on the resident ensemble.
 
     # ---------------------- Receive Evaluator JSON ----------------------
     while True:
-        # Initialize data to store a new message on each iteration
-        json_data_recv = b''
-        # Before receiving JSON from Evaluator
-        # Receive length of the incoming JSON message (4-byte integer)
-        # Can change to 8-byte integer by changing .recv(4) to .recv(8)
-        # and replacing format string '>I' to '>Q'
-        # Step 1
+        # Receive the length prefix and then the JSON into one preallocated buffer
         try:
-            msg_length = client_socket.recv(4)
-            if not msg_length:
-                print("Failed to receive message length. Closing connection.")
-                client_socket.close()
-                break # Exit the loop if no message length is received
-
-            # Unpack message length from 4 bytes
-            msglen = struct.unpack('>I', msg_length)[0]
-            print(f"Expecting {msglen} bytes of data from the Evaluator.")
-            
-            # Initialize the progress bar
-            progress = tqdm.tqdm(range(msglen), unit="B", 
-                                 desc="Receiving Evaluator Request(s)",
-                                 unit_scale=True, unit_divisor=1024)
-
-            # Step 2
-            # Now we want to receive the actual JSON in packets
-            while len(json_data_recv) < msglen:
-                packet = client_socket.recv(BUFFER_SIZE)
-                if not packet:
-                    print("Connection closed unexpectedly.")
-                    break
-                json_data_recv += packet
-                progress.update(len(packet))
-                # print(f"Received packet of {len(packet)} bytes, total received: {len(data)} bytes")
-            
-            # Close the progress bar when done
-            progress.close()
-            
-            # Decode and display the received data if all of it is received
-            if len(json_data_recv) == msglen:
-                print("Evaluator request received completely")
-                pass
-            else:
-                print("Data received was incomplete or corrupted.")
-                break
-        except Exception as e:
+            evaluator_request_full = recv_frame(client_socket, desc="Receiving Evaluator Request(s)")
+        except (ConnectionError, socket.error) as e:
             print(f"Error while receiving data: {e}")
             client_socket.close()
             break  # Break the loop on exception
-        
+
+        if evaluator_request_full is None:
+            print("Failed to receive message length. Closing connection.")
+            client_socket.close()
+            break # Exit the loop if no message length is received
+        print("Evaluator request received completely")
+
         # ---------------------- Process Received JSON ----------------------
-        evaluator_request_full = json_data_recv
-        evaluator_json = evaluator_request_full.decode("utf-8")
-        evaluator_json = json.loads(evaluator_json)
+        # Parse straight from the receive buffer
+        evaluator_json = json.loads(evaluator_request_full)
 
         # group these functions
         json_return_error = {'bad_prediction_request': []}
@@ -104,13 +443,11 @@ def recv_message_loop(client_socket):
             help_file = HELP_FILE
             print(f"Help requested! Sending {HELP_FILE}...")
             jsonResult_help = json.load(open(help_file))
+            # Readiness signal: False while the ensemble is still loading at start-up
+            jsonResult_help['predictor_ready'] = borzoi_ensemble_ready()
 
-            jsonResult_help = json.dumps(jsonResult_help)
             try:
-                jsonResult_help_bytes = jsonResult_help.encode("utf-8")
-                jsonResult_help_total_bytes = len(jsonResult_help_bytes)
-                client_socket.sendall(struct.pack('>I', jsonResult_help_total_bytes))
-                client_socket.sendall(jsonResult_help_bytes)
+                send_json(client_socket, jsonResult_help)
                 continue
             except socket.error as e:
                 print("server_error: Error sending help response: %s" % e)
@@ -123,17 +460,17 @@ def recv_message_loop(client_socket):
         # --- MODEL-SPECIFIC: Determine readout type ---
         readout_type = evaluator_json.get('readout', "track")
         is_point_readout = readout_type == "point"
+        # "binary" ships predictions as raw float16 buffers instead of JSON lists
+        response_encoding = evaluator_json.get('response_encoding', "json")
         
         # Handle unsupported `interaction_matrix` readout
         if readout_type == "interaction_matrix":
             print("Borzoi cannot handle 'interaction_matrix' readout type. Exiting gracefully!")
             json_return_error = {'bad_prediction_request': ["Borzoi cannot process 'interaction_matrix' readout type."]}
-            json_string = json.dumps(json_return_error)
             try:
-                json_bytes = json_string.encode("utf-8")
-                total_bytes = len(json_bytes)
-                client_socket.sendall(struct.pack('>I', total_bytes))
-                client_socket.sendall(json_bytes)
+                # Drop the sequence batches of a rejected streamed request first
+                discard_stream_request(client_socket, evaluator_json, desc="Discarding Evaluator Sequences")
+                send_json(client_socket, json_return_error)
                 continue
             except socket.error as e:
                 print("server_error: Error sending error response: %s" % e)
@@ -150,12 +487,9 @@ def recv_message_loop(client_socket):
         json_return_error = check_prediction_task_mandatory_keys(evaluator_json['prediction_tasks'], json_return_error)
         # if any of the mandatory keys are missing immediately return an error to the evaluator
         if any(json_return_error.values()) == True:
-            json_string = json.dumps(json_return_error)
             try:
-                jsonResult_error_bytes = json_string.encode("utf-8")
-                jsonResult_error_total_bytes = len(jsonResult_error_bytes)
-                client_socket.sendall(struct.pack('>I', jsonResult_error_total_bytes))
-                client_socket.sendall(jsonResult_error_bytes)
+                discard_stream_request(client_socket, evaluator_json, desc="Discarding Evaluator Sequences")
+                send_json(client_socket, json_return_error)
                 continue
             except socket.error as e:
                 print("server_error: Error sending error response: %s" % e)
@@ -179,6 +513,16 @@ def recv_message_loop(client_socket):
                 json_return_error = check_key_values_upstream_flank(evaluator_json['upstream_seq'], json_return_error)
             if 'downstream_seq' in evaluator_json.keys():
                 json_return_error = check_key_values_downstream_flank(evaluator_json['downstream_seq'], json_return_error)
+            if 'response_encoding' in evaluator_json.keys():
+                json_return_error = check_key_values_response_encoding(evaluator_json['response_encoding'], json_return_error)
+            if 'response_streaming' in evaluator_json.keys():
+                json_return_error = check_key_values_response_streaming(evaluator_json['response_streaming'], json_return_error)
+            if 'response_batch_size' in evaluator_json.keys():
+                json_return_error = check_key_values_response_batch_size(evaluator_json['response_batch_size'], json_return_error)
+            if 'request_streaming' in evaluator_json.keys():
+                json_return_error = check_key_values_request_streaming(evaluator_json['request_streaming'], json_return_error)
+            if 'prediction_range_mode' in evaluator_json.keys():
+                json_return_error = check_key_values_prediction_range_mode(evaluator_json['prediction_range_mode'], json_return_error)
 
             # --- MODEL SPECIFIC: Ensure this Borzoi Predictor only supports homo_sapiens ---
             for task in evaluator_json['prediction_tasks']:
@@ -190,12 +534,9 @@ def recv_message_loop(client_socket):
             
             # if any errors were caught return them all to evaluator
             if any(json_return_error.values()) == True:
-                json_string = json.dumps(json_return_error)
                 try:
-                    jsonResult_error_bytes = json_string.encode("utf-8")
-                    jsonResult_error_total_bytes = len(jsonResult_error_bytes)
-                    client_socket.sendall(struct.pack('>I', jsonResult_error_total_bytes))
-                    client_socket.sendall(jsonResult_error_bytes)
+                    discard_stream_request(client_socket, evaluator_json, desc="Discarding Evaluator Sequences")
+                    send_json(client_socket, json_return_error)
                     continue
                 except socket.error as e:
                     print("server_error: Error sending error response: %s" % e)
@@ -212,56 +553,23 @@ def recv_message_loop(client_socket):
         # Otherwise do any other formatting required for the model
         sequences = evaluator_json['sequences']
         
-        # --- Add upstream and downstream flanking sequences, if provided by the evaluator ---
-        # Default to empty string if not provided
-        upstream_seq = evaluator_json.get('upstream_seq', "")
-        downstream_seq = evaluator_json.get('downstream_seq', "")
-        if upstream_seq or downstream_seq:
-            print(
-                f"Applying flanking:\
-                    \n+{len(upstream_seq)} bases upstream,\
-                    \n+{len(downstream_seq)} bases downstream"
-                    )
-            for seq_id, sequence in tqdm.tqdm(
-                sequences.items(),
-                desc="Flanking sequences", 
-                unit="sequence",
-                total=len(sequences),
-                dynamic_ncols=True
-            ):
-                flanked = f"{upstream_seq}{sequence}{downstream_seq}"
-                sequences[seq_id] = flanked
-                   
+        # --- Add flanking sequences and trim to prediction_ranges, if provided by the evaluator ---
         # Can add any additional error checking functions here
+        # ("crop_output" keeps the full sequences and crops their predicted bins instead)
         json_return_error_model = {'prediction_request_failed': []}
-        json_return_error_model = check_seqs_specifications(sequences, json_return_error_model)
-        
-        # --- Process prediction_ranges if provided ---
-        if 'prediction_ranges' in evaluator_json:
-            prediction_ranges = evaluator_json['prediction_ranges']
-            for seq_id, pr in prediction_ranges.items():
-                # Only process non-empty ranges
-                if pr:
-                    # Unpack start and end indices
-                    start, end = pr
-                    # Check that the end index does not exceed sequence length
-                    if end >= len(sequences[seq_id]):
-                        json_return_error_model['prediction_request_failed'].append(
-                            f"Prediction range for '{seq_id}' exceeds the sequence length!"
-                        )
-                    else:
-                        # Slice the sequence. `prediction_range` is start, end inclusive
-                        sequences[seq_id] = sequences[seq_id][start:end+1]
-                        print(f"Sequence '{seq_id}' trimmed to prediction range [{start}, {end}].")
+        crop_output = evaluator_json.get('prediction_range_mode', "trim_sequence") == "crop_output"
+        bin_ranges = {} if crop_output else None
+        json_return_error_model = prepare_sequences(sequences,
+                                                    evaluator_json.get('prediction_ranges', {}),
+                                                    evaluator_json.get('upstream_seq', ""),
+                                                    evaluator_json.get('downstream_seq', ""),
+                                                    json_return_error_model, bin_ranges)
 
         # if anything is caught don't run the model and return to evaluator to fix
         if any(json_return_error_model.values()) == True:
-            json_string = json.dumps(json_return_error_model)
             try:
-                jsonResult_bytes = json_string.encode("utf-8")
-                jsonResults_total_bytes = len(jsonResult_bytes)
-                client_socket.sendall(struct.pack('>I', jsonResults_total_bytes))
-                client_socket.sendall(jsonResult_bytes)
+                discard_stream_request(client_socket, evaluator_json, desc="Discarding Evaluator Sequences")
+                send_json(client_socket, json_return_error_model)
                 continue
             except socket.error as e:
                 print("server_error: Error sending error response: %s" % e)
@@ -282,6 +590,7 @@ def recv_message_loop(client_socket):
         # sense that it can perform track predictions.
         # Therefore, the first step is to collect all unique tasks
         request_tasks = set()  # Store unique (request_type, cell_type) pairs
+        cache_stats = new_cache_stats()
 
         for prediction_task in evaluator_json['prediction_tasks']:
             request_type = prediction_task['type']
@@ -290,9 +599,22 @@ def recv_message_loop(client_socket):
 
         print(f"Unique tasks extracted: {request_tasks}") 
         
-        # Then run Borzoi Model ONCE for all required tracks
-        print("Running Borzoi model on collected tasks...")
-        task_predictions = predict_borzoi(sequences, request_tasks, is_point_readout)
+        response_streaming = evaluator_json.get('response_streaming', False)
+        request_streaming = evaluator_json.get('request_streaming', False)
+        try:
+            # Wait for the resident ensemble (loaded once at start-up)
+            get_borzoi_ensemble()
+        except RuntimeError as e:
+            task_predictions = str(e)
+        else:
+            task_predictions = collect_task_tracks(request_tasks)
+        if not isinstance(task_predictions, str) and not (response_streaming or request_streaming):
+            # Then run Borzoi Model ONCE for all required tracks
+            # (streamed requests and responses are predicted batch by batch below)
+            print("Running Borzoi model on collected tasks...")
+            task_to_indices, unique_track_indices = task_predictions
+            task_predictions = predict_with_ranges(batcher, sequences, task_to_indices,
+                                                   is_point_readout, bin_ranges, cache_stats)
         
         # --- ADDITION: Early bail-out if model returns error ---
         # Send the error to client and close this client
@@ -300,12 +622,9 @@ def recv_message_loop(client_socket):
             # Wrap the error string into error payload 
             json_return_error_model[
                 'prediction_request_failed'].append(task_predictions)
-            json_string = json.dumps(json_return_error_model)
             try:
-                json_bytes = json_string.encode("utf-8")
-                total_bytes = len(json_bytes)
-                client_socket.sendall(struct.pack('>I', total_bytes))
-                client_socket.sendall(json_bytes)
+                discard_stream_request(client_socket, evaluator_json, desc="Discarding Evaluator Sequences")
+                send_json(client_socket, json_return_error_model)
                 print("Sent prediction error back; closing connection with this Evaluator")
                 continue
             except socket.error as e:
@@ -329,8 +648,6 @@ def recv_message_loop(client_socket):
             request_type = prediction_task['type']
             cell_type = prediction_task['cell_type']
             
-            task_key = (request_type, cell_type)
-            
             # Cell type predictor container is running, send the predictor's cell type and evaluator cell type to it
             # If you want to override the cell type container you can remove the following code
             # Send the predictor and evaluator cell type
@@ -341,9 +658,6 @@ def recv_message_loop(client_socket):
             # Sample point prediction model
             # Model builders need to add the appropriate returns here
             
-            # Retrieve the predictions for this task
-            predictions = task_predictions.get(task_key, {})
-
             # Create structured response for the evaluator
             current_prediction_task = {
                 'name': prediction_task['name'],
@@ -357,19 +671,46 @@ def recv_message_loop(client_socket):
                 'scale_prediction_actual': prediction_task.get('scale', "linear"),
                 'aggregation_replicates': "mean",  # Since we average over tracks
                 'aggregation_bins': "mean",        # Ensure track models are aggregated correctly
-                'predictions': predictions
             }
             
             # Append results for current prediction task to the main JSON object
             json_return['prediction_tasks'].append(current_prediction_task)
 
-        # Convert dictionary to JSON object and send back to evaluator
-        json_string = json.dumps(json_return)
+        if request_streaming:
+            # Sequences follow the request header in batches; predict each as it arrives
+            task_to_indices, unique_track_indices = task_predictions
+            if predict_streamed_request(client_socket, json_return, evaluator_json,
+                                        task_to_indices, unique_track_indices, batcher,
+                                        is_point_readout, response_encoding, response_streaming):
+                continue
+            client_socket.close()
+            print("Connection to client closed")
+            break
+
+        if response_streaming:
+            # Send a header, one frame per batch of sequences and task, and a trailer
+            task_to_indices, unique_track_indices = task_predictions
+            batch_size = evaluator_json.get('response_batch_size', RESPONSE_BATCH_SIZE)
+            if send_streamed_predictions(client_socket, json_return, evaluator_json['prediction_tasks'],
+                                         sequences, task_to_indices, unique_track_indices,
+                                         batcher, is_point_readout, response_encoding,
+                                         batch_size, bin_ranges):
+                continue
+            client_socket.close()
+            print("Connection to client closed")
+            break
+
+        for prediction_task, current_prediction_task in zip(evaluator_json['prediction_tasks'],
+                                                            json_return['prediction_tasks']):
+            # Retrieve the predictions for this task
+            current_prediction_task['predictions'] = task_predictions_for(
+                prediction_task, task_predictions, response_encoding)
+        # Cache hits and misses of this request
+        json_return.update(cache_metadata(cache_stats))
+
+        # Convert dictionary to JSON object (or binary tensor payload) and send back to evaluator
         try:
-            jsonResult_bytes = json_string.encode("utf-8")
-            jsonResults_total_bytes = len(jsonResult_bytes)
-            client_socket.sendall(struct.pack('>I', jsonResults_total_bytes))
-            client_socket.sendall(jsonResult_bytes)
+            send_message(client_socket, json_return, response_encoding)
             continue
         except socket.error as e:
             print("server_error: Error sending prediction response: %s" % e)
@@ -393,30 +734,21 @@ def run_predictor():
     # cell_type_matcher_ip = sys.argv[3]
     # cell_type_matcher_port = sys.argv[4]
 
-    #create error object
-    json_return_error = {}
+    # Load the ensemble ONCE, in the background so the Predictor can answer
+    # "help" requests (with "predictor_ready") while the folds are restored
+    threading.Thread(target=get_borzoi_ensemble, name="borzoi-loader", daemon=True).start()
 
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    # Inference requests from all Evaluator connections share this queue and its workers
+    inference_pool = InferencePool()
+    # Sequences of concurrent requests are coalesced into shared model batches
+    batcher = DynamicBatcher(predict_borzoi_items, inference_pool, max_batch_size=BATCH_SIZE)
 
-    # bind the socket to a specific address and port
-    server.bind((predictor_ip, predictor_port))
-    # listen for incoming connections
-    server.listen(0)
-    print(f"Listening on {predictor_ip}:{predictor_port}")
-    
     # We want to have multiple evaluators to connect so predictor
-    # can take multiple requests (and not just multiple tasks per evaluator)
-    
-    # This loop allows the Predictor server to stay running so that different Evaluators can connect
-    while True:
-        try:
-            print("Waiting for an Evaluator to connect")
-            # accept incoming connections
-            client_socket, client_address = server.accept()
-            print(f"Accepted connection from {client_address[0]}:{client_address[1]}")
-            # Once connected, receive request
-            recv_message_loop(client_socket)
-        except Exception as e:
-            print(f"Error accepting client: {e}")
+    # can take multiple requests (and not just multiple tasks per evaluator).
+    # Each Evaluator connection is served on its own thread.
+    serve_predictor(predictor_ip, predictor_port,
+                    lambda client_socket: recv_message_loop(client_socket, batcher))
+    batcher.shutdown()
+    inference_pool.shutdown()
     
-run_predictor()
\ No newline at end of file
+run_predictor()
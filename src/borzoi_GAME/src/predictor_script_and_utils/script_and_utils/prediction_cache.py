@@ -0,0 +1,229 @@
+# prediction_cache.py
+"""
+Content-addressed cache of model predictions shared across requests.
+
+Evaluators often resend identical sequences (the same MPRA libraries
+across Evaluator runs, reverse complement variants, controls). Every
+prediction is stored under a hash of the model (its name and a hash of
+its weights), the final model input (after flanks and padding), the
+predicted tracks and the readout, so a cached prediction is only reused
+for exactly the same computation.
+
+Two tiers:
+- memory: an LRU bounded by PREDICTOR_CACHE_MB (0 disables it).
+- disk (optional): one .npy file per prediction in PREDICTOR_CACHE_DIR,
+  read back memory-mapped and evicted oldest first above
+  PREDICTOR_CACHE_DISK_MB. The key includes the weights hash, so the disk
+  tier is reused safely across Predictor restarts.
+"""
+import os
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+
+# In-memory cache size (MiB); 0 disables the memory tier
+CACHE_MB = float(os.environ.get("PREDICTOR_CACHE_MB", 256))
+# Directory of the on-disk tier; unset or empty disables it
+CACHE_DIR = os.environ.get("PREDICTOR_CACHE_DIR", "")
+# On-disk cache size (MiB)
+CACHE_DISK_MB = float(os.environ.get("PREDICTOR_CACHE_DISK_MB", 10240))
+# Predictions larger than this fraction of a tier are not stored in it
+MAX_ENTRY_FRACTION = 0.25
+# Read size when hashing model weights
+HASH_CHUNK_BYTES = 1 << 20
+
+def weights_fingerprint(paths):
+    """
+    Hash the contents of model weight (and configuration) files.
+
+    Args:
+        paths (list): File paths, hashed in order.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as weights_file:
+            for chunk in iter(lambda: weights_file.read(HASH_CHUNK_BYTES), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def new_cache_stats():
+    """Per-request hit/miss counters, reported under "cache" in the response."""
+    return {'hits': 0, 'misses': 0}
+
+class PredictionCache:
+    """
+    Two-tier (memory LRU and optional disk) cache of prediction arrays.
+
+    Thread-safe: all Evaluator connection threads share one instance.
+    Cached arrays are read-only; callers must copy them before modifying.
+
+    Args:
+        model_name (str): Name of the model, part of every key.
+        weights_files (list): Model weight files; their contents are hashed
+            (once, on first use) into every key.
+        memory_mb (float): Size of the memory tier in MiB.
+        cache_dir (str): Directory of the disk tier; empty disables it.
+        disk_mb (float): Size of the disk tier in MiB.
+    """
+
+    def __init__(self, model_name, weights_files=(), memory_mb=CACHE_MB, cache_dir=CACHE_DIR,
+                 disk_mb=CACHE_DISK_MB):
+        self.model_name = model_name
+        self.weights_files = list(weights_files)
+        self._model_id = None
+        self.memory_limit = int(max(0.0, memory_mb) * (1 << 20))
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.cache_dir = cache_dir or None
+        self.disk_limit = int(max(0.0, disk_mb) * (1 << 20))
+        # {key: file size}, least recently used first
+        self.disk = OrderedDict()
+        self.disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._scan_disk()
+
+    @property
+    def enabled(self):
+        return self.memory_limit > 0 or self.cache_dir is not None
+
+    @property
+    def model_id(self):
+        """Model name and weights hash, computed on first use."""
+        with self.lock:
+            if self._model_id is None:
+                print(f"Hashing {len(self.weights_files)} weight file(s) for the prediction cache")
+                self._model_id = f"{self.model_name}:{weights_fingerprint(self.weights_files)}"
+            return self._model_id
+
+    def key(self, sequence, tracks=(), readout="", variant=""):
+        """
+        Content address of one prediction.
+
+        Args:
+            sequence (str): Final model input sequence (after flanks and padding).
+            tracks (tuple): Predicted track indices (or output names).
+            readout (str): Readout of the prediction, e.g. "point".
+            variant (str): Any other model input, e.g. a reverse complement flag.
+
+        Returns:
+            str: Hex SHA-256 digest.
+        """
+        digest = hashlib.sha256()
+        for part in (self.model_id, repr(tuple(tracks)), readout, variant):
+            digest.update(part.encode())
+            digest.update(b'\0')
+        digest.update(sequence.encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Look up a prediction, memory tier first.
+
+        Returns:
+            np.ndarray or None: Read-only cached prediction, or None on a miss.
+        """
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return self.memory[key]
+            on_disk = key in self.disk
+            if on_disk:
+                self.disk.move_to_end(key)
+        if on_disk:
+            path = self._disk_path(key)
+            try:
+                prediction = np.load(path, mmap_mode='r')
+                os.utime(path)
+            except (OSError, ValueError):
+                with self.lock:
+                    self._forget_disk(key)
+            else:
+                self._put_memory(key, prediction)
+                with self.lock:
+                    self.hits += 1
+                return prediction
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, prediction):
+        """Store a prediction in both tiers (a read-only copy is kept in memory)."""
+        prediction = np.array(prediction)
+        prediction.setflags(write=False)
+        self._put_memory(key, prediction)
+        if self.cache_dir and prediction.nbytes <= MAX_ENTRY_FRACTION * self.disk_limit:
+            self._put_disk(key, prediction)
+
+    def _put_memory(self, key, prediction):
+        if prediction.nbytes > MAX_ENTRY_FRACTION * self.memory_limit:
+            return
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return
+            self.memory[key] = prediction
+            self.memory_bytes += prediction.nbytes
+            while self.memory_bytes > self.memory_limit:
+                _, evicted = self.memory.popitem(last=False)
+                self.memory_bytes -= evicted.nbytes
+
+    def _put_disk(self, key, prediction):
+        with self.lock:
+            if key in self.disk:
+                return
+        path = self._disk_path(key)
+        # Write to a temporary file first so readers never see a partial file
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as tmp_file:
+                np.save(tmp_file, prediction)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"Error writing to the prediction cache: {e}")
+            return
+        evicted = []
+        with self.lock:
+            if key not in self.disk:
+                self.disk[key] = size
+                self.disk_bytes += size
+            while self.disk_bytes > self.disk_limit and len(self.disk) > 1:
+                evicted_key, _ = next(iter(self.disk.items()))
+                self._forget_disk(evicted_key)
+                evicted.append(evicted_key)
+        for evicted_key in evicted:
+            try:
+                os.remove(self._disk_path(evicted_key))
+            except OSError:
+                pass
+
+    def _forget_disk(self, key):
+        # Caller holds the lock
+        self.disk_bytes -= self.disk.pop(key, 0)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def _scan_disk(self):
+        # Rebuild the disk index from a previous run, least recently used first
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+            elif name.endswith(".npy"):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, name[:-len(".npy")], stat.st_size))
+        for _, key, size in sorted(entries):
+            self.disk[key] = size
+            self.disk_bytes += size
+        print(f"Prediction cache: {len(self.disk)} prediction(s) on disk in {self.cache_dir}")
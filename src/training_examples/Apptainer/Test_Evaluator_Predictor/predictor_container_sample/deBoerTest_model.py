@@ -1,7 +1,7 @@
 import numpy as np
 import random
-import base64
 import tqdm
+from interaction_matrix_utils import *
 
 
 ## model specific checks that cause a "prediction_request_failed" error
@@ -39,14 +39,15 @@ def fake_model_track(sequences, json_dict):
     json_dict['predictions'] = predictions
     return json_dict
 
-def fake_model_interaction_matrix(sequences, json_dict):
-    predictions = {}
+def fake_model_interaction_matrix(sequences, json_dict, encoding="upper_triangle"):
+    matrices = {}
     # Iterate over sequences with a progress bar.
     for sequence in tqdm.tqdm(sequences,
                               desc="Processing sequences (interaction matrix)",
                               unit="seq"):
         interaction_matrix = np.random.randint(10, size=(3, 3))
-        # Convert the matrix to bytes then to a base64-encoded string.
-        predictions[sequence] = base64.b64encode(interaction_matrix.tobytes()).decode('utf-8')
-    json_dict['predictions'] = [predictions]
+        # Contact maps are symmetric
+        matrices[sequence] = np.maximum(interaction_matrix, interaction_matrix.T)
+    # Send the upper triangle of each matrix (see interaction_matrix_utils) as JSON lists
+    json_dict['predictions'] = encode_interaction_matrices(matrices, json_dict, encoding, as_lists=True)
     return json_dict